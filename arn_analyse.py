@@ -0,0 +1,344 @@
+"""
+arn_analyse.py - Extraction en flux des KPI de simulation
+Lit tripinfo.xml et edge_data.xml avec un parseur incrémental (les éléments
+sont libérés au fur et à mesure: mémoire constante quelle que soit la taille)
+et exporte des fichiers colonnes compacts.
+
+Exemple:
+  python arn_analyse.py --tripinfo tripinfo.xml --edgedata edge_data.xml -o analyse/
+"""
+import argparse
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Histogrammes de temps de parcours: pas de 1 s jusqu'à 2 h (au-delà: dernière case)
+HISTOGRAM_BIN_WIDTH = 1.0
+HISTOGRAM_MAX_VALUE = 7200.0
+
+
+# =============== LECTURE EN FLUX ===============
+
+def iter_elements(path: str, tag: str) -> Iterator[Tuple[Dict[str, str], ET.Element]]:
+    """Produit (attributs du parent, élément) pour chaque <tag>, puis le libère.
+
+    Les attributs du parent immédiat (ex. <interval begin=... end=...> autour
+    des <edge>) sont fournis pour les fichiers imbriqués. Chaque élément
+    terminé est détaché de son parent: la mémoire ne dépend pas de la taille
+    du fichier.
+    """
+    stack: List[ET.Element] = []
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        if elem.tag == tag:
+            yield (stack[-1].attrib if stack else {}), elem
+        if stack:
+            stack[-1].remove(elem)
+        elem.clear()
+
+
+class StreamingHistogram:
+    """Histogramme à cases fixes: percentiles approchés en mémoire constante"""
+    def __init__(self, bin_width: float = HISTOGRAM_BIN_WIDTH,
+                 max_value: float = HISTOGRAM_MAX_VALUE):
+        self.bin_width = bin_width
+        self.counts = array('L', [0]) * (int(max_value / bin_width) + 1)
+        self.total = 0
+
+    def add(self, value: float):
+        index = min(len(self.counts) - 1, max(0, int(value / self.bin_width)))
+        self.counts[index] += 1
+        self.total += 1
+
+    def percentile(self, q: float) -> float:
+        """Borne haute de la case contenant le q-ième percentile (0-100)"""
+        if not self.total:
+            return 0.0
+        target = q / 100.0 * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return (index + 1) * self.bin_width
+        return len(self.counts) * self.bin_width
+
+
+# =============== EXPORT EN COLONNES ===============
+
+class ColumnarWriter:
+    """Un fichier binaire par colonne (<nom>.bin, typecodes du module array) + schema.json.
+
+    Les valeurs sont tamponnées puis ajoutées aux fichiers par blocs, sans
+    garder la table en mémoire.
+    """
+    def __init__(self, directory: str, columns: Dict[str, str], chunk_rows: int = 65536):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.columns = columns
+        self.chunk_rows = chunk_rows
+        self.buffers = {name: array(code) for name, code in columns.items()}
+        self.files = {name: open(os.path.join(directory, f"{name}.bin"), "wb") for name in columns}
+        self.rows = 0
+        self.dictionaries: Dict[str, List[str]] = {}
+
+    def append(self, row: Tuple):
+        for buffer, value in zip(self.buffers.values(), row):
+            buffer.append(value)
+        self.rows += 1
+        if self.rows % self.chunk_rows == 0:
+            self.flush()
+
+    def flush(self):
+        for name, buffer in self.buffers.items():
+            buffer.tofile(self.files[name])
+            self.buffers[name] = array(self.columns[name])
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+        schema = {
+            "rows": self.rows,
+            "byteorder": sys.byteorder,
+            "columns": self.columns,
+            "dictionaries": self.dictionaries,
+        }
+        with open(os.path.join(self.directory, "schema.json"), "w", encoding="utf-8") as f:
+            json.dump(schema, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_columns(directory: str) -> Dict[str, array]:
+    """Relit un export ColumnarWriter (les colonnes codées gardent leurs indices)"""
+    with open(os.path.join(directory, "schema.json"), encoding="utf-8") as f:
+        schema = json.load(f)
+    columns = {}
+    for name, code in schema["columns"].items():
+        values = array(code)
+        with open(os.path.join(directory, f"{name}.bin"), "rb") as f:
+            values.frombytes(f.read())
+        if schema["byteorder"] != sys.byteorder:
+            values.byteswap()
+        columns[name] = values
+    return columns
+
+
+class _Dictionary:
+    """Encode des chaînes répétées (types, tronçons) en indices entiers"""
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.index)
+        return code
+
+    @property
+    def values(self) -> List[str]:
+        return list(self.index)
+
+
+# =============== KPI TRIPINFO ===============
+
+class TripStats:
+    """Agrégats d'un type de véhicule (mémoire fixe)"""
+    def __init__(self):
+        self.count = 0
+        self.waiting_time = 0.0
+        self.time_loss = 0.0
+        self.max_time_loss = 0.0
+        self.duration = 0.0
+        self.travel_times = StreamingHistogram()
+
+    def add(self, duration: float, waiting_time: float, time_loss: float):
+        self.count += 1
+        self.waiting_time += waiting_time
+        self.time_loss += time_loss
+        self.max_time_loss = max(self.max_time_loss, time_loss)
+        self.duration += duration
+        self.travel_times.add(duration)
+
+    def summary(self) -> Dict[str, float]:
+        n = max(1, self.count)
+        return {
+            "trips": self.count,
+            "mean_waiting_time": self.waiting_time / n,
+            "mean_time_loss": self.time_loss / n,
+            "max_time_loss": self.max_time_loss,
+            "mean_travel_time": self.duration / n,
+            "p50_travel_time": self.travel_times.percentile(50),
+            "p90_travel_time": self.travel_times.percentile(90),
+            "p99_travel_time": self.travel_times.percentile(99),
+        }
+
+
+def analyse_tripinfo(path: str, output_dir: Optional[str] = None) -> Dict[str, TripStats]:
+    """KPI par type de véhicule; exporte aussi un trajet par ligne si output_dir est donné"""
+    stats: Dict[str, TripStats] = {}
+    writer = None
+    vtypes = _Dictionary()
+    if output_dir:
+        writer = ColumnarWriter(os.path.join(output_dir, "trips"), {
+            "depart": "d", "duration": "f", "waiting_time": "f",
+            "time_loss": "f", "route_length": "f", "vtype": "H",
+        })
+    try:
+        for _parent, elem in iter_elements(path, "tripinfo"):
+            vtype = elem.get("vType", "")
+            duration = float(elem.get("duration", 0))
+            waiting_time = float(elem.get("waitingTime", 0))
+            time_loss = float(elem.get("timeLoss", 0))
+            if vtype not in stats:
+                stats[vtype] = TripStats()
+            stats[vtype].add(duration, waiting_time, time_loss)
+            if writer:
+                writer.append((float(elem.get("depart", 0)), duration, waiting_time, time_loss,
+                               float(elem.get("routeLength", 0)), vtypes.code(vtype)))
+    finally:
+        if writer:
+            writer.dictionaries["vtype"] = vtypes.values
+            writer.close()
+    return stats
+
+
+# =============== KPI EDGE DATA ===============
+
+class EdgeStats:
+    """Agrégats d'un tronçon sur toute la simulation (mémoire fixe)"""
+    def __init__(self):
+        self.intervals = 0
+        self.duration = 0.0
+        self.sampled_seconds = 0.0
+        self.waiting_time = 0.0
+        self.time_loss = 0.0
+        self.density_time = 0.0  # somme densité x durée d'intervalle
+        self.max_density = 0.0
+        self.speed_weighted = 0.0  # somme vitesse x sampledSeconds
+
+    def add(self, interval: float, sampled_seconds: float, waiting_time: float,
+            time_loss: float, density: float, speed: float):
+        self.intervals += 1
+        self.duration += interval
+        self.sampled_seconds += sampled_seconds
+        self.waiting_time += waiting_time
+        self.time_loss += time_loss
+        self.density_time += density * interval
+        self.max_density = max(self.max_density, density)
+        self.speed_weighted += speed * sampled_seconds
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "intervals": self.intervals,
+            "sampled_seconds": self.sampled_seconds,
+            "waiting_time": self.waiting_time,
+            "time_loss": self.time_loss,
+            "mean_density": self.density_time / self.duration if self.duration else 0.0,
+            "max_density": self.max_density,
+            "mean_speed": self.speed_weighted / self.sampled_seconds if self.sampled_seconds else 0.0,
+        }
+
+
+def analyse_edge_data(path: str, output_dir: Optional[str] = None) -> Dict[str, EdgeStats]:
+    """KPI par tronçon; exporte aussi la série temporelle (densité...) si output_dir est donné"""
+    stats: Dict[str, EdgeStats] = {}
+    writer = None
+    edges = _Dictionary()
+    if output_dir:
+        writer = ColumnarWriter(os.path.join(output_dir, "edge_timeseries"), {
+            "begin": "d", "edge": "I", "density": "f", "waiting_time": "f",
+            "time_loss": "f", "speed": "f", "sampled_seconds": "f",
+        })
+    try:
+        for interval, elem in iter_elements(path, "edge"):
+            begin = float(interval.get("begin", 0))
+            length = float(interval.get("end", begin)) - begin
+            edge_id = elem.get("id")
+            sampled_seconds = float(elem.get("sampledSeconds", 0))
+            waiting_time = float(elem.get("waitingTime", 0))
+            time_loss = float(elem.get("timeLoss", 0))
+            density = float(elem.get("density", 0))
+            speed = float(elem.get("speed", 0))
+            if edge_id not in stats:
+                stats[edge_id] = EdgeStats()
+            stats[edge_id].add(length, sampled_seconds, waiting_time, time_loss, density, speed)
+            if writer:
+                writer.append((begin, edges.code(edge_id), density, waiting_time,
+                               time_loss, speed, sampled_seconds))
+    finally:
+        if writer:
+            writer.dictionaries["edge"] = edges.values
+            writer.close()
+    return stats
+
+
+def _write_summary(directory: str, key_name: str, summaries: Dict[str, Dict[str, float]]):
+    """Table des agrégats (petite) au même format colonnes"""
+    if not summaries:
+        return
+    names = list(next(iter(summaries.values())))
+    columns = {key_name: "I", **{name: "d" for name in names}}
+    with ColumnarWriter(directory, columns) as writer:
+        writer.dictionaries[key_name] = list(summaries)
+        for code, summary in enumerate(summaries.values()):
+            writer.append((code, *(float(summary[name]) for name in names)))
+
+
+# =============== MAIN ===============
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Extraction en flux des KPI de simulation SUMO")
+    parser.add_argument("--tripinfo", help="Fichier tripinfo.xml")
+    parser.add_argument("--edgedata", help="Fichier edgeData (edge_data.xml)")
+    parser.add_argument("-o", "--output", help="Dossier d'export des colonnes (optionnel)")
+    args = parser.parse_args(argv)
+    if not args.tripinfo and not args.edgedata:
+        parser.error("donner au moins --tripinfo ou --edgedata")
+
+    print("\n" + "="*75)
+    print("📊 ANALYSE DES SORTIES SUMO")
+    print("="*75)
+
+    if args.tripinfo:
+        stats = analyse_tripinfo(args.tripinfo, args.output)
+        summaries = {vtype: s.summary() for vtype, s in sorted(stats.items())}
+        print(f"\n🚗 Trajets par type ({args.tripinfo}):")
+        for vtype, summary in summaries.items():
+            print(f"  • {vtype:12s}: {summary['trips']:6d} trajets | "
+                  f"attente {summary['mean_waiting_time']:6.2f}s | "
+                  f"perte {summary['mean_time_loss']:6.2f}s | "
+                  f"parcours p50/p90/p99 {summary['p50_travel_time']:.0f}/"
+                  f"{summary['p90_travel_time']:.0f}/{summary['p99_travel_time']:.0f}s")
+        if args.output:
+            _write_summary(os.path.join(args.output, "vtype_summary"), "vtype", summaries)
+
+    if args.edgedata:
+        stats = analyse_edge_data(args.edgedata, args.output)
+        summaries = {edge: s.summary() for edge, s in sorted(stats.items())}
+        print(f"\n🛣️  Tronçons ({args.edgedata}):")
+        for edge, summary in summaries.items():
+            print(f"  • {edge:12s}: densité moy. {summary['mean_density']:7.2f} "
+                  f"(max {summary['max_density']:7.2f}) veh/km | "
+                  f"attente {summary['waiting_time']:8.1f}s | "
+                  f"vitesse {summary['mean_speed']:5.2f} m/s")
+        if args.output:
+            _write_summary(os.path.join(args.output, "edge_summary"), "edge", summaries)
+
+    if args.output:
+        print(f"\n📁 Colonnes exportées dans {args.output}/")
+    print("="*75 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+arn_benchmark.py - Mesures de performance du moteur de priorité ARN
+Chronomètre, pour des carrefours de 4 à 100k voies, l'ARN seul (insert,
+find_maximum) puis le cycle de contrôle (update_traffic_data,
+rebuild_priority_tree, run_cycle) face à un faux TraCI en mémoire.
+Les résultats sont enregistrés en JSON pour comparer deux commits.
+
+Exemples:
+  python arn_benchmark.py -o bench_avant.json
+  python arn_benchmark.py --lanes 4,1000,100000 --compact-tree -o bench_apres.json
+  python arn_benchmark.py --compare bench_avant.json bench_apres.json
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import arn_sumo_integration as arn
+from arn_sumo_integration import CompactRedBlackTree, Lane, RedBlackTree, TrafficLightSystem
+
+DEFAULT_LANE_COUNTS = [4, 16, 100, 1000, 10000, 100000]
+# Véhicules max par tronçon dans le faux TraCI (le dernier est une ambulance, l'avant-dernier un bus)
+FAKE_MAX_VEHICLES = 10
+PERCENTILES = (50, 90, 99)
+
+
+# =============== FAUX TRACI ===============
+
+class FakeTraCIError(Exception):
+    """Jamais levée: tient la place de traci.TraCIException"""
+
+
+class FakeTraCI:
+    """Backend en mémoire, même interface que traci pour ce que lit TrafficLightSystem.
+
+    Les mesures de chaque tronçon sont tirées au hasard dans simulationStep()
+    (hors chronométrage): les getters ne sont que des lectures de dict, le
+    temps mesuré est donc celui du contrôleur.
+    """
+    TraCIException = FakeTraCIError
+
+    def __init__(self, edge_ids: List[str], seed: int = 0):
+        self.rng = random.Random(seed)
+        self.edge_ids = edge_ids
+        self.state: Dict[str, tuple] = {}
+        self.vehicle_ids = {
+            edge_id: [f"{edge_id}.{i}" for i in range(FAKE_MAX_VEHICLES)] for edge_id in edge_ids
+        }
+        self.time = 0.0
+        self.set_phases = 0  # Appels à setPhase: un par cycle si la décision est appliquée
+        self.edge = SimpleNamespace(
+            getLastStepVehicleNumber=lambda edge_id: self.state[edge_id][0],
+            getWaitingTime=lambda edge_id: self.state[edge_id][1],
+            getLastStepHaltingNumber=lambda edge_id: self.state[edge_id][2],
+            getLastStepVehicleIDs=lambda edge_id: self.vehicle_ids[edge_id][:self.state[edge_id][0]],
+        )
+        self.vehicle = SimpleNamespace(getTypeID=self._type_id)
+        self.trafficlight = SimpleNamespace(setPhase=self._set_phase)
+        self.simulation = SimpleNamespace(
+            getTime=lambda: self.time,
+            getDeltaT=lambda: 1.0,
+            getMinExpectedNumber=lambda: 1,
+            getArrivedIDList=lambda: [],
+        )
+        self.simulationStep()
+
+    @staticmethod
+    def _type_id(vid: str) -> str:
+        index = int(vid.rsplit(".", 1)[1])
+        if index == FAKE_MAX_VEHICLES - 1:
+            return "ambulance"
+        return "bus" if index == FAKE_MAX_VEHICLES - 2 else "car"
+
+    def _set_phase(self, tls_id: str, phase: int):
+        self.set_phases += 1
+
+    def simulationStep(self, step: float = 0.0):
+        self.time += 1.0
+        rand = self.rng.random
+        for edge_id in self.edge_ids:
+            vcount = int(rand() * (FAKE_MAX_VEHICLES + 1))
+            halting = int(rand() * (vcount + 1))
+            self.state[edge_id] = (vcount, halting * rand() * 60.0, halting)
+
+    def close(self):
+        pass
+
+
+# =============== MESURES ===============
+
+def make_lanes(count: int) -> List[Lane]:
+    return [Lane(f"Voie {i}", f"e{i}") for i in range(count)]
+
+
+def make_system(count: int, compact_tree: bool = False, vectorized: bool = False,
+                seed: int = 0) -> TrafficLightSystem:
+    lanes = make_lanes(count)
+    edge_ids = [lane.sumo_edge_id for lane in lanes]
+    backend = FakeTraCI(edge_ids, seed)
+    # Une phase verte par tronçon: apply_green_to_sumo va jusqu'à setPhase, sans avertissement
+    green_phases = {edge_id: [i] for i, edge_id in enumerate(edge_ids)}
+    return TrafficLightSystem(lanes, compact_tree=compact_tree, vectorized=vectorized,
+                              backend=backend, green_phases=green_phases)
+
+
+def check_applied(system: TrafficLightSystem):
+    """Chaque cycle mesuré doit avoir appliqué sa décision (sinon run_cycle mesure un no-op)"""
+    if system.unmapped_edges or system.backend.set_phases != system.cycle_count:
+        raise RuntimeError(f"{system.cycle_count - system.backend.set_phases} cycle(s) sans "
+                           f"setPhase (tronçons sans phase: {len(system.unmapped_edges)})")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentile au rang le plus proche (valeurs déjà triées)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(q / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def repeat(run: Callable[[], None], prepare: Optional[Callable[[], None]] = None,
+           min_time: float = 1.0, min_iterations: int = 5,
+           max_iterations: int = 1000) -> List[float]:
+    """Latences (s) de run(); prepare() est appelé avant chaque mesure, hors chronomètre"""
+    latencies = []
+    budget_start = time.perf_counter()
+    while len(latencies) < max_iterations:
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+        if (len(latencies) >= min_iterations
+                and time.perf_counter() - budget_start >= min_time):
+            break
+    return latencies
+
+
+def summarize(name: str, lanes: int, latencies: List[float], ops_per_call: int,
+              peak_bytes: Optional[int] = None) -> Dict[str, object]:
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    result = {
+        "benchmark": name,
+        "lanes": lanes,
+        "iterations": len(ordered),
+        "ops_per_iteration": ops_per_call,
+        "throughput": ops_per_call * len(ordered) / total if total > 0 else 0.0,
+        "mean_ms": total / len(ordered) * 1e3,
+        "max_ms": ordered[-1] * 1e3,
+        "peak_kib": round(peak_bytes / 1024, 1) if peak_bytes is not None else None,
+    }
+    for q in PERCENTILES:
+        result[f"p{q}_ms"] = percentile(ordered, q) * 1e3
+    return result
+
+
+def peak_memory(build: Callable[[], object]) -> int:
+    """Pic d'allocation (octets) pendant build(), mesuré à part: tracemalloc ralentit tout"""
+    tracemalloc.start()
+    try:
+        kept = build()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+    return peak
+
+
+def bench_tree(count: int, compact_tree: bool, options: argparse.Namespace) -> List[Dict[str, object]]:
+    tree_class = CompactRedBlackTree if compact_tree else RedBlackTree
+    lanes = make_lanes(count)
+    rng = random.Random(options.seed)
+    scores = [rng.uniform(0, 1000) for _ in lanes]
+
+    def build():
+        tree = tree_class()
+        for score, lane in zip(scores, lanes):
+            tree.insert(score, lane)
+        return tree
+
+    trees = []
+    latencies = repeat(lambda: trees.append(build()), prepare=trees.clear,
+                       min_time=options.min_time, min_iterations=options.min_iterations,
+                       max_iterations=options.max_iterations)
+    results = [summarize("tree_insert", count, latencies, count, peak_memory(build))]
+
+    # find_maximum: O(1), mesuré par paquets pour dépasser la résolution de l'horloge
+    tree = trees[0]
+    batch = 10000
+    find_maximum = tree.find_maximum
+
+    def lookups():
+        for _ in range(batch):
+            find_maximum()
+
+    latencies = repeat(lookups, min_time=options.min_time, min_iterations=options.min_iterations,
+                       max_iterations=options.max_iterations)
+    results.append(summarize("find_maximum", count, latencies, batch))
+    return results
+
+
+def bench_cycle(count: int, compact_tree: bool, options: argparse.Namespace) -> List[Dict[str, object]]:
+    limits = dict(min_time=options.min_time, min_iterations=options.min_iterations,
+                  max_iterations=options.max_iterations)
+    system = make_system(count, compact_tree, options.vectorized, options.seed)
+    backend = system.backend
+
+    def step_and_measure():
+        backend.simulationStep()
+        system.update_traffic_data()
+
+    latencies = repeat(system.update_traffic_data, prepare=backend.simulationStep, **limits)
+    results = [summarize("update_traffic_data", count, latencies, count)]
+
+    # Premier passage: construction de l'arbre; ensuite mises à jour incrémentales
+    start = time.perf_counter()
+    system.rebuild_priority_tree()
+    results.append(summarize("rebuild_initial", count, [time.perf_counter() - start], count))
+    latencies = repeat(system.rebuild_priority_tree, prepare=step_and_measure, **limits)
+    results.append(summarize("rebuild_priority_tree", count, latencies, count))
+
+    def run_cycle():
+        system.run_cycle(display=False)
+
+    latencies = repeat(run_cycle, prepare=backend.simulationStep, **limits)
+    check_applied(system)
+
+    def build_and_cycle():
+        fresh = make_system(count, compact_tree, options.vectorized, options.seed)
+        fresh.run_cycle(display=False)
+        return fresh
+
+    del system
+    results.append(summarize("run_cycle", count, latencies, 1, peak_memory(build_and_cycle)))
+    return results
+
+
+# =============== RÉSULTATS ===============
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(options: argparse.Namespace) -> Dict[str, object]:
+    results = []
+    for count in options.lanes:
+        print(f"⏱️  {count} voies...")
+        for result in bench_tree(count, options.compact_tree, options) + \
+                bench_cycle(count, options.compact_tree, options):
+            results.append(result)
+            print_result(result)
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "compact_tree": options.compact_tree,
+            "vectorized": options.vectorized,
+            "seed": options.seed,
+        },
+        "results": results,
+    }
+
+
+def print_result(result: Dict[str, object]):
+    peak = f" | pic {result['peak_kib']:10.1f} KiB" if result["peak_kib"] is not None else ""
+    print(f"   {result['benchmark']:22s} {result['lanes']:7d} voies | "
+          f"{result['throughput']:12.0f} op/s | "
+          f"p50 {result['p50_ms']:9.3f} ms | p99 {result['p99_ms']:9.3f} ms{peak}")
+
+
+def compare(baseline: Dict[str, object], current: Dict[str, object]):
+    """Rapport de ratios (p50 et débit) pour chaque mesure présente dans les deux fichiers"""
+    before = {(r["benchmark"], r["lanes"]): r for r in baseline["results"]}
+    print("\n" + "="*75)
+    print(f"📊 COMPARAISON {baseline['meta'].get('git')} -> {current['meta'].get('git')}")
+    print("="*75)
+    for result in current["results"]:
+        old = before.get((result["benchmark"], result["lanes"]))
+        if old is None or not old["p50_ms"] or not old["throughput"]:
+            continue
+        p50_ratio = result["p50_ms"] / old["p50_ms"]
+        icon = "🟢" if p50_ratio < 0.95 else ("🔴" if p50_ratio > 1.05 else "⚪")
+        print(f"{icon} {result['benchmark']:22s} {result['lanes']:7d} voies | "
+              f"p50 {old['p50_ms']:9.3f} -> {result['p50_ms']:9.3f} ms (x{p50_ratio:5.2f}) | "
+              f"débit x{result['throughput'] / old['throughput']:5.2f}")
+    print("="*75 + "\n")
+
+
+def load_results(path: str) -> Dict[str, object]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmarks de l'ARN et du cycle de contrôle")
+    parser.add_argument("--lanes", default=",".join(map(str, DEFAULT_LANE_COUNTS)),
+                        help="Nombres de voies, séparés par des virgules")
+    parser.add_argument("--compact-tree", action="store_true", help="Mesure CompactRedBlackTree")
+    parser.add_argument("--vectorized", action="store_true", help="Scores via LaneTable (NumPy)")
+    parser.add_argument("--min-time", type=float, default=1.0,
+                        help="Durée minimale de chaque mesure (s)")
+    parser.add_argument("--min-iterations", type=int, default=5)
+    parser.add_argument("--max-iterations", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="Fichier JSON des résultats")
+    parser.add_argument("--compare", nargs="+", metavar="JSON",
+                        help="Référence à comparer au run courant, ou deux fichiers à comparer")
+    args = parser.parse_args(argv)
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare attend un ou deux fichiers JSON")
+    if args.compare and len(args.compare) == 2:
+        compare(load_results(args.compare[0]), load_results(args.compare[1]))
+        return
+    if args.vectorized and arn.np is None:
+        parser.error("--vectorized nécessite numpy")
+    args.lanes = [int(v) for v in args.lanes.split(",")]
+
+    print("\n" + "="*75)
+    print(f"⏱️  BENCHMARKS ARN ({'compact' if args.compact_tree else 'RBNode'}"
+          f"{', vectorisé' if args.vectorized else ''}) - Python {platform.python_version()}")
+    print("="*75)
+    report = run_benchmarks(args)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Résultats: {args.output}")
+    if args.compare:
+        compare(load_results(args.compare[0]), report)
+
+
+if __name__ == "__main__":
+    main()
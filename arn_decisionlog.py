@@ -0,0 +1,281 @@
+"""
+arn_decisionlog.py - Journal binaire des décisions du contrôleur ARN
+Un enregistrement de taille fixe par décision: pas, carrefour, voie choisie,
+puis score et métriques de chaque voie du carrefour. L'écriture passe par un
+tampon vidé par blocs; la lecture projette le fichier en mémoire (mmap) et
+expose les enregistrements comme un tableau NumPy structuré, sans analyse de
+texte. Deux journaux d'un même réseau se comparent décision par décision.
+
+Format: en-tête (MAGIC, taille du JSON, taille d'un enregistrement, JSON des
+carrefours et de leurs tronçons, aligné sur 8 octets) puis les enregistrements,
+petit-boutiste, sans alignement:
+  step u32 | junction u32 | chosen i16 | flags u8 | lanes u8 |
+  score f32[L] | vehicles u16[L] | wait_time f32[L] | congestion u8[L] | lane_flags u8[L]
+L = nombre de voies du plus grand carrefour (les carrefours plus petits sont complétés par des zéros).
+
+Exemples:
+  python arn_sumo_integration.py --batch --auto-discover --decision-log run_a.arnlog
+  python arn_decisionlog.py run_a.arnlog --diff run_b.arnlog
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np  # requis pour la lecture seulement
+except ImportError:
+    np = None
+
+MAGIC = b"ARNLOG1\0"
+HEADER = struct.Struct("<8sII")  # magic, taille du JSON, taille d'un enregistrement
+BUFFER_SIZE = 1 << 20  # Octets accumulés avant écriture
+
+# flags de l'enregistrement
+FLAG_HOLD = 1  # Voie imposée par une réservation urgence (emergency_hold)
+FLAG_PREEMPTION = 2  # Préemption immédiate par EmergencyWatcher, hors cycle
+# lane_flags
+LANE_BUS = 1
+LANE_EMERGENCY = 2
+
+
+def _record_format(max_lanes: int) -> str:
+    lanes = max_lanes
+    return f"<IIhBB{lanes}f{lanes}H{lanes}f{lanes}B{lanes}B"
+
+
+def record_dtype(max_lanes: int) -> "np.dtype":
+    """dtype NumPy d'un enregistrement (même disposition que _record_format)"""
+    return np.dtype([
+        ("step", "<u4"), ("junction", "<u4"), ("chosen", "<i2"), ("flags", "u1"), ("lanes", "u1"),
+        ("score", "<f4", (max_lanes,)), ("vehicles", "<u2", (max_lanes,)),
+        ("wait_time", "<f4", (max_lanes,)), ("congestion", "u1", (max_lanes,)),
+        ("lane_flags", "u1", (max_lanes,)),
+    ])
+
+
+class DecisionLogWriter:
+    """Ajoute une décision par appel à append(); à passer à TrafficLightSystem/NetworkController
+    via set_decision_log(). step est tenu à jour par la boucle de simulation."""
+    def __init__(self, path: str, systems, buffer_size: int = BUFFER_SIZE):
+        systems = getattr(systems, "systems", None) or systems
+        if not isinstance(systems, dict):
+            systems = {systems.tls_id: systems}
+        self.path = path
+        self.junctions = list(systems)
+        self.lanes = {tls_id: [lane.sumo_edge_id for lane in system.lanes]
+                      for tls_id, system in systems.items()}
+        self.max_lanes = max((len(edges) for edges in self.lanes.values()), default=0)
+        if self.max_lanes > 255:
+            raise ValueError("au plus 255 voies par carrefour")
+        self._struct = struct.Struct(_record_format(self.max_lanes))
+        self._index = {tls_id: index for index, tls_id in enumerate(self.junctions)}
+        self._rows = {tls_id: {edge_id: row for row, edge_id in enumerate(edges)}
+                      for tls_id, edges in self.lanes.items()}
+        self._padding = {n: [0] * (self.max_lanes - n) for n in
+                         {len(edges) for edges in self.lanes.values()}}
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self.step = 0
+        self.records = 0
+
+        header = json.dumps({"junctions": self.junctions, "lanes": self.lanes,
+                             "max_lanes": self.max_lanes}).encode("utf-8")
+        header += b" " * (-(HEADER.size + len(header)) % 8)
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, len(header), self._struct.size))
+        self._file.write(header)
+
+    def append(self, system, preemption: bool = False):
+        """Enregistre l'état du carrefour et sa voie verte (system.current_green)"""
+        lanes = system.lanes
+        flags = FLAG_PREEMPTION if preemption else 0
+        pad = self._padding[len(lanes)]
+        green = system.current_green
+        chosen = self._rows[system.tls_id].get(green.sumo_edge_id, -1) if green is not None else -1
+        if system.emergency_hold is not None:
+            flags |= FLAG_HOLD
+        table = system.table
+        if table is not None:
+            scores = table.priority_score.tolist()
+            vehicles = table.num_vehicles.tolist()
+            waits = table.wait_time.tolist()
+            congestion = table.congestion_level.tolist()
+            lane_flags = (table.has_bus * LANE_BUS + table.has_emergency * LANE_EMERGENCY).tolist()
+        else:
+            scores = [lane.priority_score for lane in lanes]
+            vehicles = [lane.num_vehicles for lane in lanes]
+            waits = [lane.wait_time for lane in lanes]
+            congestion = [lane.congestion_level for lane in lanes]
+            lane_flags = [lane.has_bus * LANE_BUS + lane.has_emergency * LANE_EMERGENCY
+                          for lane in lanes]
+        self._buffer += self._struct.pack(
+            self.step, self._index[system.tls_id], chosen, flags, len(lanes),
+            *scores, *pad, *vehicles, *pad, *waits, *pad, *congestion, *pad, *lane_flags, *pad,
+        )
+        self.records += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class DecisionLog:
+    """Lecture d'un journal par projection mémoire: records est un tableau structuré NumPy
+    (vue sur le fichier, pas de copie). Un dernier enregistrement incomplet est ignoré."""
+    def __init__(self, path: str):
+        if np is None:
+            raise ImportError("DecisionLog nécessite numpy (pip install numpy)")
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_size, record_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: pas un journal de décisions ARN")
+        header = json.loads(self._mmap[HEADER.size:HEADER.size + header_size])
+        self.junctions: List[str] = header["junctions"]
+        self.lanes: Dict[str, List[str]] = header["lanes"]
+        self.max_lanes: int = header["max_lanes"]
+        dtype = record_dtype(self.max_lanes)
+        if dtype.itemsize != record_size:
+            raise ValueError(f"{path}: taille d'enregistrement {record_size}, attendu {dtype.itemsize}")
+        offset = HEADER.size + header_size
+        count = (len(self._mmap) - offset) // record_size
+        self.records = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __enter__(self) -> "DecisionLog":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.records = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Des vues sur records sont encore tenues: la projection sera libérée avec elles
+            pass
+
+    def junction(self, tls_id: str) -> "np.ndarray":
+        """Enregistrements d'un carrefour (copie filtrée)"""
+        return self.records[self.records["junction"] == self.junctions.index(tls_id)]
+
+    def chosen_edge(self, index: int) -> Optional[str]:
+        record = self.records[index]
+        chosen = int(record["chosen"])
+        if chosen < 0:
+            return None
+        return self.lanes[self.junctions[int(record["junction"])]][chosen]
+
+
+def _decision_keys(log: DecisionLog) -> "np.ndarray":
+    """Clé (pas, carrefour, rang de la décision dans ce pas): une préemption et un cycle
+    peuvent tomber au même pas pour un même carrefour"""
+    records = log.records
+    keys = (records["step"].astype(np.int64) * len(log.junctions) + records["junction"]) << 8
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    positions = np.arange(len(keys))
+    starts = np.maximum.accumulate(
+        np.where(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]], positions, 0)
+    )
+    keys[order] += np.minimum(positions - starts, 255)
+    return keys
+
+
+def diff_logs(a: DecisionLog, b: DecisionLog) -> Dict[str, object]:
+    """Compare deux journaux d'un même réseau, décision par décision (même pas, même carrefour)"""
+    if a.junctions != b.junctions or a.lanes != b.lanes:
+        raise ValueError("les journaux ne portent pas sur les mêmes carrefours/voies")
+    keys_a = _decision_keys(a)
+    keys_b = _decision_keys(b)
+    _keys, index_a, index_b = np.intersect1d(keys_a, keys_b, return_indices=True)
+    records_a, records_b = a.records[index_a], b.records[index_b]
+    differs = np.flatnonzero(records_a["chosen"] != records_b["chosen"])
+    result = {
+        "common": len(index_a),
+        "only_a": len(a) - len(index_a),
+        "only_b": len(b) - len(index_b),
+        "chosen_differs": len(differs),
+        "max_score_delta": float(np.abs(records_a["score"] - records_b["score"]).max())
+        if len(index_a) else 0.0,
+        "first_divergence": None,
+    }
+    if len(differs):
+        first = int(differs[0])
+        result["first_divergence"] = {
+            "step": int(records_a[first]["step"]),
+            "junction": a.junctions[int(records_a[first]["junction"])],
+            "a": a.chosen_edge(int(index_a[first])),
+            "b": b.chosen_edge(int(index_b[first])),
+        }
+    return result
+
+
+def print_summary(log: DecisionLog, top: int = 20):
+    records = log.records
+    size = os.path.getsize(log.path)
+    print(f"📒 {log.path}: {len(log)} décisions, {len(log.junctions)} carrefour(s), "
+          f"{records.dtype.itemsize} octets/décision ({size / 1024:.1f} Kio)")
+    if not len(log):
+        return
+    print(f"   Pas {int(records['step'].min())} → {int(records['step'].max())}, "
+          f"{int(np.count_nonzero(records['flags'] & FLAG_PREEMPTION))} préemption(s), "
+          f"{int(np.count_nonzero(records['flags'] & FLAG_HOLD))} décision(s) sous réservation urgence")
+    counts = np.bincount(records["junction"], minlength=len(log.junctions))
+    for index in np.argsort(-counts, kind="stable")[:top].tolist():
+        tls_id = log.junctions[index]
+        chosen = records["chosen"][records["junction"] == index]
+        chosen = chosen[chosen >= 0]
+        share = ""
+        if len(chosen):
+            lane_counts = np.bincount(chosen)
+            best = int(lane_counts.argmax())
+            share = (f", voie la plus servie {log.lanes[tls_id][best]} "
+                     f"({100.0 * lane_counts[best] / len(chosen):.0f}%)")
+        print(f"  • {tls_id}: {int(counts[index])} décisions{share}")
+    if len(log.junctions) > top:
+        print(f"  … et {len(log.junctions) - top} autres carrefours")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Lecture et comparaison des journaux de décisions ARN")
+    parser.add_argument("log", help="Journal écrit avec --decision-log")
+    parser.add_argument("--diff", metavar="AUTRE", help="Compare avec un second journal du même réseau")
+    parser.add_argument("--top", type=int, default=20, help="Carrefours listés dans le résumé")
+    args = parser.parse_args(argv)
+
+    with DecisionLog(args.log) as log:
+        print_summary(log, args.top)
+        if args.diff:
+            with DecisionLog(args.diff) as other:
+                try:
+                    result = diff_logs(log, other)
+                except ValueError as e:
+                    parser.error(str(e))
+                print(f"\n🔍 Comparaison avec {args.diff}: {result['common']} décisions communes, "
+                      f"{result['only_a']} / {result['only_b']} sans équivalent")
+                print(f"   Voie choisie différente: {result['chosen_differs']}, "
+                      f"écart de score max: {result['max_score_delta']:.3f}")
+                first = result["first_divergence"]
+                if first:
+                    print(f"   Première divergence au pas {first['step']} [{first['junction']}]: "
+                          f"{first['a']} ≠ {first['b']}")
+
+
+if __name__ == "__main__":
+    main()
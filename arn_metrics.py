@@ -0,0 +1,281 @@
+"""
+arn_metrics.py - Instrumentation du cycle de contrôle ARN
+Durée de chaque étape (update_traffic_data, rebuild_priority_tree, ...),
+appels TraCI par cycle, erreurs et cadence de simulation, dans des
+histogrammes à cases fixes exportés périodiquement en JSON lines ou au
+format texte Prometheus (collecteur textfile de node_exporter).
+
+Exemple:
+  python arn_sumo_integration.py --batch --metrics metrics.prom --metrics-every 5
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from functools import partial
+from typing import Dict, List, Optional, Sequence
+
+# Bornes hautes des cases (secondes), la dernière case va jusqu'à +Inf
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000)
+
+# Lectures de résultats d'abonnement: locales côté client, pas d'aller-retour TraCI
+LOCAL_CALLS = {"getSubscriptionResults", "getContextSubscriptionResults",
+               "getAllSubscriptionResults", "getAllContextSubscriptionResults"}
+
+
+class Histogram:
+    """Histogramme à bornes fixes (cumulatif à l'export, comme Prometheus)"""
+    def __init__(self, bounds: Sequence[float] = STAGE_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = array('L', [0]) * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = 0
+        for bound in self.bounds:
+            if value <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q: float) -> float:
+        """Borne haute de la case contenant le q-ième percentile (0-100)"""
+        if not self.count:
+            return 0.0
+        target = q / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return self.bounds[index] if index < len(self.bounds) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "bounds": list(self.bounds),
+            "buckets": list(self.counts),
+        }
+
+
+def _prometheus_histogram(name: str, data: Dict[str, object], labels: str = "") -> List[str]:
+    """Lignes Prometheus d'un histogramme sérialisé par Histogram.to_dict()"""
+    prefix = labels + "," if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(data["bounds"], data["buckets"]):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {data["count"]}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {data['sum']:.6f}")
+    lines.append(f"{name}_count{suffix} {data['count']}")
+    return lines
+
+
+# =============== COMPTAGE DES APPELS TRACI ===============
+
+class _CountingDomain:
+    def __init__(self, domain, owner: "CountingBackend"):
+        self._domain = domain
+        self._owner = owner
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._domain, name)
+        if not callable(attr) or name in LOCAL_CALLS:
+            return attr
+        owner = self._owner
+
+        def counted(*args, **kwargs):
+            owner.calls += 1
+            return attr(*args, **kwargs)
+        # Mis en cache: __getattr__ n'est plus appelé pour ce nom
+        setattr(self, name, counted)
+        return counted
+
+
+class CountingBackend:
+    """Enveloppe un backend (traci, ReplayBackend...) et compte les appels TraCI.
+
+    Se passe à TrafficLightSystem / NetworkController à la place du backend.
+    """
+    def __init__(self, backend):
+        self._backend = backend
+        self.calls = 0
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._backend, name)
+        if (isinstance(attr, type) and issubclass(attr, BaseException)) or name.startswith("_"):
+            # Classes d'exception (TraCIException) et attributs internes
+            return attr
+        if callable(attr) and not isinstance(attr, type):
+            def counted(*args, **kwargs):
+                self.calls += 1
+                return attr(*args, **kwargs)
+            wrapped = counted
+        elif hasattr(attr, "__dict__"):
+            # Domaine TraCI: edge, vehicle, trafficlight, simulation... (classes avec libsumo)
+            wrapped = _CountingDomain(attr, self)
+        else:
+            return attr
+        setattr(self, name, wrapped)
+        return wrapped
+
+
+# =============== MÉTRIQUES ===============
+
+class Metrics:
+    """Compteurs et histogrammes du contrôleur, exportés toutes les export_every secondes.
+
+    export_format: "jsonl" (une ligne par export, ajoutée au fichier) ou
+    "prometheus" (fichier réécrit atomiquement à chaque export).
+    Avec un reporter (arn_pipeline.Reporter), l'écriture se fait sur son thread.
+    """
+    def __init__(self, backend=None, path: Optional[str] = None,
+                 export_format: str = "jsonl", export_every: float = 10.0):
+        if export_format not in ("jsonl", "prometheus"):
+            raise ValueError(f"format d'export inconnu: {export_format}")
+        self.backend = backend
+        self.path = path
+        self.export_format = export_format
+        self.export_every = export_every
+        self.stages: Dict[str, Histogram] = {}
+        self.traci_calls = Histogram(CALL_BUCKETS)
+        self.errors: Dict[str, int] = {}
+        self.cycles = 0
+        self.steps = 0
+        self.start_time = time.perf_counter()
+        self.last_export = self.start_time
+        self._steps_at_export = 0
+        self._calls_at_cycle = self._backend_calls()
+        self.reporter = None
+        # Les décisions peuvent tourner sur un pool de threads (arn_pipeline.DecisionPool)
+        self._lock = threading.Lock()
+
+    def _backend_calls(self) -> int:
+        return getattr(self.backend, "calls", 0)
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def error(self, kind: str):
+        with self._lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def add_steps(self, count: int):
+        self.steps += count
+
+    def end_cycle(self):
+        """Clôt un cycle de décision: appels TraCI du cycle, export si l'intervalle est écoulé"""
+        self.cycles += 1
+        calls = self._backend_calls()
+        self.traci_calls.observe(calls - self._calls_at_cycle)
+        self._calls_at_cycle = calls
+        if self.path and time.perf_counter() - self.last_export >= self.export_every:
+            if self.reporter is not None:
+                # Instantané pris ici, mise en forme et écriture sur le thread du reporter
+                self.reporter.submit(partial(self._write, self._mark_export()))
+            else:
+                self.export()
+
+    def snapshot(self) -> Dict[str, object]:
+        now = time.perf_counter()
+        since_export = now - self.last_export
+        with self._lock:
+            stages = {stage: h.to_dict() for stage, h in self.stages.items()}
+            errors = dict(self.errors)
+        return {
+            "timestamp": time.time(),
+            "uptime": now - self.start_time,
+            "cycles": self.cycles,
+            "steps": self.steps,
+            "step_rate": self.steps / max(now - self.start_time, 1e-9),
+            "recent_step_rate": (self.steps - self._steps_at_export) / max(since_export, 1e-9),
+            "traci_calls_total": self._backend_calls(),
+            "traci_calls_per_cycle": self.traci_calls.to_dict(),
+            "errors": errors,
+            "stages": stages,
+        }
+
+    @staticmethod
+    def prometheus_text(snapshot: Dict[str, object]) -> str:
+        lines = [
+            "# HELP arn_stage_seconds Durée des étapes du cycle ARN",
+            "# TYPE arn_stage_seconds histogram",
+        ]
+        for stage, data in snapshot["stages"].items():
+            lines += _prometheus_histogram("arn_stage_seconds", data, f'stage="{stage}"')
+        lines += [
+            "# HELP arn_traci_calls_per_cycle Appels TraCI par cycle de décision",
+            "# TYPE arn_traci_calls_per_cycle histogram",
+            *_prometheus_histogram("arn_traci_calls_per_cycle", snapshot["traci_calls_per_cycle"]),
+            "# HELP arn_errors_total Erreurs par type",
+            "# TYPE arn_errors_total counter",
+            *(f'arn_errors_total{{kind="{kind}"}} {count}'
+              for kind, count in snapshot["errors"].items()),
+            "# TYPE arn_cycles_total counter",
+            f"arn_cycles_total {snapshot['cycles']}",
+            "# TYPE arn_simulation_steps_total counter",
+            f"arn_simulation_steps_total {snapshot['steps']}",
+            "# TYPE arn_traci_calls_total counter",
+            f"arn_traci_calls_total {snapshot['traci_calls_total']}",
+            "# HELP arn_step_rate Pas de simulation par seconde depuis le dernier export",
+            "# TYPE arn_step_rate gauge",
+            f"arn_step_rate {snapshot['recent_step_rate']:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def _mark_export(self) -> Dict[str, object]:
+        snapshot = self.snapshot()
+        self.last_export = time.perf_counter()
+        self._steps_at_export = self.steps
+        return snapshot
+
+    def export(self):
+        if self.path:
+            self._write(self._mark_export())
+
+    def _write(self, snapshot: Dict[str, object]):
+        if self.export_format == "jsonl":
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(snapshot) + "\n")
+        else:
+            # Écriture atomique: le collecteur ne lit jamais un fichier à moitié écrit
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text(snapshot))
+            os.replace(tmp_path, self.path)
+
+    def print_summary(self):
+        print(f"⏱️  Étapes du cycle (p50 / p99, {self.cycles} cycles):")
+        for stage, histogram in self.stages.items():
+            print(f"  • {stage:22s}: {histogram.percentile(50) * 1e3:8.2f} / "
+                  f"{histogram.percentile(99) * 1e3:8.2f} ms "
+                  f"(total {histogram.sum:.2f}s)")
+        if self.traci_calls.count:
+            print(f"📡 Appels TraCI: {self._backend_calls()} "
+                  f"(~{self.traci_calls.sum / self.traci_calls.count:.0f} par cycle)")
+        if self.errors:
+            print("⚠️  Erreurs: " + ", ".join(f"{kind}={n}" for kind, n in self.errors.items()))
@@ -0,0 +1,231 @@
+"""
+arn_multiclient.py - Un réseau piloté par plusieurs processus TraCI
+SUMO est lancé avec --num-clients N: chaque processus client se connecte au
+même port, fixe son rang avec traci.setOrder et pilote son groupe de
+carrefours (acquisition, décisions, préemption). Les groupes sont équilibrés
+en nombre de voies (arn_pipeline.partition_junctions).
+
+Synchronisation: SUMO n'avance d'un pas que lorsque tous les clients ont
+envoyé simulationStep; les commandes de chaque pas sont exécutées dans
+l'ordre des clients. Chaque client garde donc son propre cache des classes
+de véhicules et ses propres abonnements.
+
+Exemple:
+  python arn_sumo_integration.py --batch --num-clients 4 --config grille_20x50.sumocfg
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Tuple
+
+import arn_sumo_integration as arn
+from arn_pipeline import partition_junctions
+
+CLIENT_JOIN_TIMEOUT = 30.0  # Attente de la fin des clients puis de SUMO (s)
+
+
+def net_file_from_config(config_file: str) -> str:
+    """Premier <net-file> du .sumocfg, relatif au dossier de la configuration"""
+    for elem in ET.parse(config_file).getroot().iter("net-file"):
+        net_file = elem.get("value", "").split(",")[0].strip()
+        if net_file:
+            return os.path.join(os.path.dirname(os.path.abspath(config_file)), net_file)
+    raise ValueError(f"{config_file}: pas de <net-file>")
+
+
+def client_path(path: str, client: int) -> str:
+    """Fichier propre à un client: metrics.prom -> metrics.2.prom"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{client}{ext}"
+
+
+def client_tables(junctions: Dict[str, List[str]], phase_table: Dict[str, Dict[str, List[int]]],
+                  groups: List[List[str]]) -> List[Tuple[Dict[str, List[str]], Dict[str, Dict[str, List[int]]]]]:
+    """Carrefours et table des phases de chaque client (un carrefour sans phase connue est gardé)"""
+    return [
+        ({tls_id: junctions[tls_id] for tls_id in group},
+         {tls_id: phase_table[tls_id] for tls_id in group if tls_id in phase_table})
+        for group in groups
+    ]
+
+
+def run_client(client: int, port: int, junctions: Dict[str, List[str]],
+               phase_table: Dict[str, Dict[str, List[int]]], args: argparse.Namespace,
+               results: multiprocessing.Queue):
+    """Processus client: pilote ses carrefours jusqu'à la fin de la simulation"""
+    traci = arn.traci
+    row = {"client": client, "junctions": {}, "cycles": 0, "step": 0,
+           "preemptions": 0, "decisions": 0, "metrics": "", "error": ""}
+    metrics = decision_log = None
+    try:
+        traci.init(port, label=f"arn-client-{client}")
+        # Rang du client dans chaque pas: doit précéder toute autre commande
+        traci.setOrder(client + 1)
+        backend = traci
+        if args.metrics:
+            from arn_metrics import CountingBackend, Metrics
+            backend = CountingBackend(traci)
+            row["metrics"] = client_path(args.metrics, client)
+            metrics = Metrics(backend, row["metrics"], args.metrics_format, args.metrics_every)
+
+        system = arn.NetworkController(junctions, phase_table=phase_table,
+                                       vectorized=args.vectorized, backend=backend,
+                                       history_size=args.history)
+        if metrics is not None:
+            system.instrument(metrics)
+        if args.subscriptions:
+            system.subscribe()
+        watcher = arn.EmergencyWatcher(system) if args.preemption else None
+        if args.decision_log:
+            from arn_decisionlog import DecisionLogWriter
+            decision_log = DecisionLogWriter(client_path(args.decision_log, client), system)
+            system.set_decision_log(decision_log)
+
+        if args.adaptive:
+            scheduler = arn.DecisionScheduler(
+                system, base_interval=args.cycle_steps, min_green=args.min_green,
+                max_green=args.max_green, idle_steps=args.idle_steps,
+            )
+            row["step"] = arn.run_scheduled(
+                system, scheduler, max_steps=args.steps, display_every=args.display_every,
+                realtime=args.realtime, watcher=watcher,
+            )
+            row["decisions"] = scheduler.decisions
+        else:
+            row["step"] = arn.run_simulation(
+                system, max_steps=args.steps, cycle_steps=args.cycle_steps,
+                delay=args.delay, display_every=args.display_every,
+                realtime=args.realtime, watcher=watcher,
+            )
+        row["cycles"] = system.cycle_count
+        row["preemptions"] = watcher.preemptions if watcher is not None else 0
+        row["junctions"] = {tls_id: tls.state_dict() for tls_id, tls in system.systems.items()}
+    except KeyboardInterrupt:
+        row["error"] = "interrompu"
+    except Exception as e:
+        row["error"] = str(e)
+    finally:
+        # Un client qui se déconnecte ne bloque pas les autres: SUMO continue sans lui
+        try:
+            traci.close()
+        except Exception:
+            pass
+        if metrics is not None:
+            metrics.export()
+        if decision_log is not None:
+            decision_log.close()
+    results.put(row)
+
+
+def _collect(processes: List[multiprocessing.Process], results: multiprocessing.Queue) -> List[Dict]:
+    rows = []
+    while len(rows) < len(processes):
+        try:
+            rows.append(results.get(timeout=1.0))
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                break
+    return rows
+
+
+def run_multiclient(args: argparse.Namespace):
+    """Lance SUMO avec --num-clients et un processus par groupe de carrefours"""
+    traci = arn.traci
+    if traci is None:
+        print("❌ ERREUR: Module 'traci' non trouvé! (requis pour --num-clients)")
+        sys.exit(1)
+    if not os.path.exists(args.config):
+        print(f"❌ Configuration introuvable: {args.config}")
+        sys.exit(1)
+
+    net_file = net_file_from_config(args.config)
+    junctions = {tls_id: edges for tls_id, edges in arn.discover_junctions_from_net(net_file).items()
+                 if edges}
+    phase_table = arn.build_phase_table_from_net(net_file)
+    groups = partition_junctions({tls_id: len(edges) for tls_id, edges in junctions.items()},
+                                 args.num_clients)
+    if not groups:
+        print(f"❌ Aucun carrefour à feux dans {net_file}")
+        sys.exit(1)
+    print(f"🔎 {len(junctions)} carrefour(s) à feux répartis sur {len(groups)} client(s):")
+    for client, group in enumerate(groups):
+        lanes = sum(len(junctions[tls_id]) for tls_id in group)
+        print(f"  • client {client}: {len(group)} carrefour(s), {lanes} voies")
+
+    # SUMO attend que les len(groups) clients soient connectés avant le premier pas
+    port = traci.getFreeSocketPort()
+    sumo_binary = arn.SUMO_BINARY_NOGUI if args.nogui else arn.SUMO_BINARY
+    sumo_cmd = [sumo_binary, "-c", args.config, "--start", "--quit-on-end",
+                "--num-clients", str(len(groups)), "--remote-port", str(port)]
+    print(f"\n🔄 Lancement de SUMO (port {port})...")
+    try:
+        sumo = subprocess.Popen(sumo_cmd)
+    except OSError as e:
+        print(f"❌ Impossible de démarrer SUMO: {e}")
+        sys.exit(1)
+
+    results = multiprocessing.Queue()
+    tables = client_tables(junctions, phase_table, groups)
+    processes = [
+        multiprocessing.Process(
+            target=run_client, name=f"arn-client-{client}",
+            args=(client, port, client_junctions, client_phases, args, results),
+        )
+        for client, (client_junctions, client_phases) in enumerate(tables)
+    ]
+    print("🎬 Simulation démarrée...\n")
+    wall_start = time.perf_counter()
+    for process in processes:
+        process.start()
+
+    rows: List[Dict] = []
+    try:
+        rows = _collect(processes, results)
+        print("\n✅ Simulation terminée (fin naturelle)")
+    except KeyboardInterrupt:
+        print("\n\n⛔ Simulation interrompue par l'utilisateur")
+    finally:
+        for process in processes:
+            process.join(CLIENT_JOIN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        try:
+            sumo.wait(CLIENT_JOIN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            sumo.kill()
+        wall_time = time.perf_counter() - wall_start
+        print_multiclient_statistics(junctions, phase_table, rows, len(processes), wall_time,
+                                     args.adaptive)
+
+
+def print_multiclient_statistics(junctions: Dict[str, List[str]],
+                                 phase_table: Dict[str, Dict[str, List[int]]],
+                                 rows: List[Dict], clients: int, wall_time: float,
+                                 adaptive: bool = False):
+    """Bilan par client puis statistiques finales sur l'ensemble des carrefours"""
+    print("\n🧩 Clients TraCI:")
+    for row in sorted(rows, key=lambda row: row["client"]):
+        status = f"❌ {row['error']}" if row["error"] else "✅"
+        line = (f"  • client {row['client']}: {len(row['junctions'])} carrefour(s), "
+                f"{row['cycles']} cycles, {row['step']} pas, "
+                f"{row['preemptions']} préemption(s)")
+        if adaptive:
+            line += f", {row['decisions']} décisions"
+        print(f"{line} {status}")
+        if row["metrics"]:
+            print(f"    📈 Métriques: {row['metrics']}")
+    if len(rows) < clients:
+        print(f"  ⚠️  {clients - len(rows)} client(s) sans résultat (arrêt anormal)")
+
+    # Contrôleur de synthèse: l'état final de chaque carrefour, tel que renvoyé par son client
+    summary = arn.NetworkController(junctions, phase_table=phase_table)
+    for row in rows:
+        for tls_id, state in row["junctions"].items():
+            summary.systems[tls_id].load_state_dict(state)
+    summary.cycle_count = max((row["cycles"] for row in rows), default=0)
+    arn.print_final_statistics(summary, max((row["step"] for row in rows), default=0), wall_time)
@@ -0,0 +1,189 @@
+"""
+arn_pipeline.py - Exécution en pipeline de la boucle de contrôle ARN
+- Reporter: affichage et exports sur un thread dédié, alimenté par une file
+  bornée; si la file est pleine le message est abandonné, la simulation
+  n'attend jamais la console ni les fichiers.
+- DecisionPool: choix des voies prioritaires par groupes de carrefours, sur
+  un pool de processus (ou de threads, sans parallélisme réel à cause du
+  GIL); les appels TraCI restent sur le thread principal, seul propriétaire
+  de la connexion.
+
+Exemple:
+  python arn_sumo_integration.py --auto-discover --pipeline --decision-workers 4 \\
+      --decision-pool process
+"""
+import heapq
+import math
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from arn_sumo_integration import CompactRedBlackTree, RedBlackTree, TrafficLightSystem
+
+REPORT_QUEUE_SIZE = 256
+
+
+class Reporter:
+    """Thread d'affichage: submit() ne bloque jamais, les messages en trop sont comptés puis perdus"""
+    def __init__(self, maxsize: int = REPORT_QUEUE_SIZE):
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="arn-reporter", daemon=True)
+        self.thread.start()
+
+    def submit(self, message) -> bool:
+        """message: texte, ou fonction appelée sur le thread du reporter (None = rien à afficher)"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                break
+            try:
+                text = message() if callable(message) else message
+                if text:
+                    print(text, flush=True)
+            except Exception as e:
+                print(f"⚠️  Erreur du reporter: {e}")
+
+    def close(self, timeout: float = 10.0):
+        """Vide la file puis arrête le thread"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+
+def partition_junctions(lane_counts: Dict[str, int], parts: int) -> List[List[str]]:
+    """Répartit les carrefours en parts groupes de charge (nombre de voies) équilibrée.
+
+    Glouton du plus gros au plus petit, chaque carrefour va au groupe le moins chargé.
+    """
+    parts = max(1, min(parts, len(lane_counts)))
+    groups: List[List[str]] = [[] for _ in range(parts)]
+    loads: List[Tuple[int, int]] = [(0, index) for index in range(parts)]
+    for tls_id in sorted(lane_counts, key=lambda tls: (-lane_counts[tls], tls)):
+        load, index = heapq.heappop(loads)
+        groups[index].append(tls_id)
+        heapq.heappush(loads, (load + lane_counts[tls_id], index))
+    return [group for group in groups if group]
+
+
+# =============== MOTEUR DE DÉCISION (PROCESSUS) ===============
+
+class _JunctionEngine:
+    """ARN d'un carrefour tenu dans un processus de décision (les voies sont des tronçons)"""
+    def __init__(self, edge_ids: List[str], compact_tree: bool):
+        self.edge_ids = edge_ids
+        self.rbt = CompactRedBlackTree(len(edge_ids) + 1) if compact_tree else RedBlackTree()
+        self.nodes = [None] * len(edge_ids)
+
+    def choose(self, changes: List[Tuple[int, float]]) -> Optional[str]:
+        for row, score in changes:
+            node = self.nodes[row]
+            if node is None:
+                self.nodes[row] = self.rbt.insert(score, self.edge_ids[row])
+            else:
+                self.rbt.update_key(node, score)
+        max_node = self.rbt.find_maximum()
+        return max_node.lane if max_node else None
+
+
+_ENGINES: Dict[str, _JunctionEngine] = {}
+
+
+def _init_engines(specs: Dict[str, Tuple[List[str], bool]]):
+    _ENGINES.clear()
+    for tls_id, (edge_ids, compact_tree) in specs.items():
+        _ENGINES[tls_id] = _JunctionEngine(edge_ids, compact_tree)
+
+
+def _choose_in_process(changes: Dict[str, List[Tuple[int, float]]]) -> Dict[str, Optional[str]]:
+    return {tls_id: _ENGINES[tls_id].choose(rows) for tls_id, rows in changes.items()}
+
+
+def _choose_in_thread(systems: List[TrafficLightSystem]):
+    for system in systems:
+        system.choose_green()
+
+
+class DecisionPool:
+    """Choix des voies prioritaires par groupes de carrefours équilibrés en nombre de voies.
+
+    mode "process" (défaut): un processus par groupe garde ses propres ARN; il
+    ne reçoit que les scores modifiés depuis le cycle précédent et renvoie le
+    tronçon choisi par carrefour. L'ARN du processus principal est détaché
+    (TrafficLightSystem.detach_priority_tree): ni tenu à jour ni consulté.
+    mode "thread": chaque groupe appelle choose_green() sur ses systèmes; le
+    GIL sérialise ces appels, ce mode ne sert qu'à isoler les groupes.
+    """
+    def __init__(self, systems: Dict[str, TrafficLightSystem], workers: int, mode: str = "process"):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"mode de pool inconnu: {mode}")
+        self.mode = mode
+        self.groups = partition_junctions(
+            {tls_id: len(system.lanes) for tls_id, system in systems.items()}, workers
+        )
+        # Mode process: derniers scores envoyés (listes) et dernier choix de chaque carrefour
+        self._sent: Dict[str, List[float]] = {}
+        self._chosen: Dict[str, Optional[str]] = {}
+        if mode == "thread":
+            self.executors = [ThreadPoolExecutor(len(self.groups), thread_name_prefix="arn-decision")]
+        else:
+            for tls_id, system in systems.items():
+                system.detach_priority_tree()
+                self._sent[tls_id] = [math.nan] * len(system.lanes)
+            # Un exécuteur à un seul processus par groupe: les ARN restent dans le même processus
+            self.executors = [
+                ProcessPoolExecutor(1, initializer=_init_engines, initargs=({
+                    tls_id: ([lane.sumo_edge_id for lane in systems[tls_id].lanes],
+                             isinstance(systems[tls_id].rbt, CompactRedBlackTree))
+                    for tls_id in group
+                },))
+                for group in self.groups
+            ]
+
+    def choose(self, systems: Dict[str, TrafficLightSystem]):
+        """Met à jour current_green de chaque système"""
+        if self.mode == "thread":
+            executor = self.executors[0]
+            futures = [executor.submit(_choose_in_thread, [systems[tls_id] for tls_id in group])
+                       for group in self.groups]
+            for future in futures:
+                future.result()
+            return
+
+        futures = []
+        for executor, group in zip(self.executors, self.groups):
+            changes = {tls_id: self._changes(systems[tls_id]) for tls_id in group}
+            changes = {tls_id: rows for tls_id, rows in changes.items() if rows}
+            if changes:
+                # Aucun score modifié dans le groupe: le choix précédent reste valable
+                futures.append(executor.submit(_choose_in_process, changes))
+        for future in futures:
+            self._chosen.update(future.result())
+        for tls_id, system in systems.items():
+            system.current_green = system.edge_to_lane.get(self._chosen.get(tls_id))
+    
+    def _changes(self, system: TrafficLightSystem) -> List[Tuple[int, float]]:
+        """(ligne, score) des voies dont le score a changé depuis le dernier envoi"""
+        if system.table is not None:
+            rows = system.table.changed_rows()
+            return list(zip(rows.tolist(), system.table.priority_score[rows].tolist()))
+        sent = self._sent[system.tls_id]
+        changes = []
+        for row, lane in enumerate(system.lanes):
+            score = lane.priority_score
+            if score != sent[row]:
+                sent[row] = score
+                changes.append((row, score))
+        return changes
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown()
@@ -0,0 +1,273 @@
+"""
+arn_replay.py - Rejeu hors ligne des sorties SUMO enregistrées
+ReplayBackend expose la même interface que le module traci pour ce dont le
+contrôleur ARN a besoin (edge, vehicle, trafficlight, simulation...), mais
+les données viennent de edge_data.xml, tripinfo.xml et detectors.out.
+Les décisions de phase sont enregistrées au lieu d'être envoyées à SUMO.
+
+Exemple:
+  python arn_sumo_integration.py --replay edge_data.xml --replay-tripinfo tripinfo.xml \\
+      --record decisions.csv
+"""
+import csv
+import heapq
+from array import array
+from bisect import bisect_right
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from arn_analyse import iter_elements
+
+
+class ReplayError(Exception):
+    """Erreur du rejeu (équivalent de traci.TraCIException)"""
+
+
+class _IntervalSeries:
+    """Séries temporelles par objet (tronçon, détecteur): intervalles + colonnes de valeurs"""
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.begins: Dict[str, array] = {}
+        self.ends: Dict[str, array] = {}
+        self.values: Dict[str, Dict[str, array]] = {}
+
+    def append(self, object_id: str, begin: float, end: float, row: Dict[str, float]):
+        if object_id not in self.begins:
+            self.begins[object_id] = array('d')
+            self.ends[object_id] = array('d')
+            self.values[object_id] = {name: array('d') for name in self.columns}
+        self.begins[object_id].append(begin)
+        self.ends[object_id].append(end)
+        for name in self.columns:
+            self.values[object_id][name].append(row[name])
+
+    def lookup(self, object_id: str, time: float) -> Optional[Tuple[float, Dict[str, array], int]]:
+        """(durée de l'intervalle, colonnes, indice) de l'intervalle contenant le pas terminé à time"""
+        begins = self.begins.get(object_id)
+        if begins is None:
+            raise ReplayError(f"objet '{object_id}' absent des données enregistrées")
+        index = bisect_right(begins, time - 1e-9) - 1
+        if index < 0 or time - 1e-9 >= self.ends[object_id][index]:
+            return None
+        return self.ends[object_id][index] - begins[index], self.values[object_id], index
+
+
+class _Edge:
+    def __init__(self, replay: "ReplayBackend"):
+        self._replay = replay
+
+    def _interval(self, edge_id: str):
+        return self._replay.edge_series.lookup(edge_id, self._replay.time)
+
+    def getLastStepVehicleNumber(self, edge_id: str) -> int:
+        # Nombre moyen de véhicules présents sur l'intervalle
+        found = self._interval(edge_id)
+        if found is None:
+            return 0
+        length, values, index = found
+        return int(round(values["sampledSeconds"][index] / max(length, 1e-9)))
+
+    def getLastStepHaltingNumber(self, edge_id: str) -> int:
+        # waitingTime / durée = nombre moyen de véhicules à l'arrêt
+        found = self._interval(edge_id)
+        if found is None:
+            return 0
+        length, values, index = found
+        return int(round(values["waitingTime"][index] / max(length, 1e-9)))
+
+    def getWaitingTime(self, edge_id: str) -> float:
+        # Attente cumulée depuis la dernière fois où le tronçon était sans véhicule arrêté
+        found = self._interval(edge_id)
+        if found is None:
+            return 0.0
+        _length, values, index = found
+        return values["queueWaitingTime"][index]
+
+    def getLastStepVehicleIDs(self, edge_id: str) -> List[str]:
+        return list(self._replay.on_edge.get(edge_id, ()))
+
+
+class _Vehicle:
+    def __init__(self, replay: "ReplayBackend"):
+        self._replay = replay
+
+    def getTypeID(self, vid: str) -> str:
+        try:
+            return self._replay.vehicle_types[vid]
+        except KeyError:
+            raise ReplayError(f"véhicule '{vid}' inconnu")
+
+    def getRoadID(self, vid: str) -> str:
+        return self._replay.vehicle_edges.get(vid, "")
+
+
+class _TrafficLight:
+    def __init__(self, replay: "ReplayBackend"):
+        self._replay = replay
+        self.phases: Dict[str, int] = {}
+
+    def setPhase(self, tls_id: str, phase: int):
+        self.phases[tls_id] = phase
+        self._replay.decisions.append((self._replay.time, tls_id, phase))
+
+    def getPhase(self, tls_id: str) -> int:
+        return self.phases.get(tls_id, 0)
+
+
+class _InductionLoop:
+    def __init__(self, replay: "ReplayBackend"):
+        self._replay = replay
+
+    def _value(self, detector_id: str, name: str) -> float:
+        found = self._replay.detector_series.lookup(detector_id, self._replay.time)
+        if found is None:
+            return 0.0
+        _length, values, index = found
+        return values[name][index]
+
+    def getLastStepVehicleNumber(self, detector_id: str) -> int:
+        return int(self._value(detector_id, "nVehContrib"))
+
+    def getLastStepOccupancy(self, detector_id: str) -> float:
+        return self._value(detector_id, "occupancy")
+
+    def getLastStepMeanSpeed(self, detector_id: str) -> float:
+        return self._value(detector_id, "speed")
+
+
+class ReplayBackend:
+    """Remplace traci pour rejouer une simulation enregistrée, sans SUMO.
+
+    - edge_data: sortie <edgeData> (idéalement freq="1", comme mon_add.xml)
+    - tripinfo: présence des véhicules (départ, arrivée, type) pour les listes d'IDs
+    - detectors: sortie des boucles <inductionLoop> (optionnel, interface inductionloop)
+
+    tripinfo ne donne pas l'heure de sortie du premier tronçon: un véhicule est
+    considéré sur son tronçon de départ jusqu'à arrival - (duration - waitingTime) / 2
+    (toute l'attente au feu, temps de roulage partagé en deux). Les IDs servent
+    à la détection bus/urgence, pas au comptage (qui vient de edge_data).
+    """
+    TraCIException = ReplayError
+
+    def __init__(self, edge_data: str, tripinfo: Optional[str] = None,
+                 detectors: Optional[str] = None, step_length: float = 1.0,
+                 begin: float = 0.0):
+        self.begin = begin
+        self.time = begin
+        self.step_length = step_length
+        self._step = 0
+        self.decisions: List[Tuple[float, str, int]] = []
+
+        self.edge_series = _IntervalSeries(["sampledSeconds", "waitingTime", "queueWaitingTime"])
+        self._load_edge_data(edge_data)
+        self.detector_series = _IntervalSeries(["nVehContrib", "occupancy", "speed"])
+        if detectors:
+            self._load_detectors(detectors)
+
+        self.vehicle_types: Dict[str, str] = {}
+        self.vehicle_edges: Dict[str, str] = {}
+        self.on_edge: Dict[str, Dict[str, None]] = {}
+        # Tas d'événements (temps, 0=départ/1=sortie du tronçon/2=arrivée, id, tronçon)
+        self._events: List[Tuple[float, int, str, str]] = []
+        self._pending = 0
+        if tripinfo:
+            self._load_tripinfo(tripinfo)
+        self._arrived: List[str] = []
+        self._departed: List[str] = []
+
+        self.edge = _Edge(self)
+        self.vehicle = _Vehicle(self)
+        self.trafficlight = _TrafficLight(self)
+        self.inductionloop = _InductionLoop(self)
+        self.simulation = SimpleNamespace(
+            getTime=lambda: self.time,
+            getDeltaT=lambda: self.step_length,
+            getMinExpectedNumber=self._min_expected,
+            getArrivedIDList=lambda: list(self._arrived),
+            getDepartedIDList=lambda: list(self._departed),
+        )
+
+    # ---- chargement ----
+
+    def _load_edge_data(self, path: str):
+        queue_wait: Dict[str, float] = {}
+        self.end_time = self.time
+        for interval, elem in iter_elements(path, "edge"):
+            edge_id = elem.get("id")
+            begin = float(interval.get("begin", 0))
+            end = float(interval.get("end", begin))
+            waiting = float(elem.get("waitingTime", 0))
+            queue_wait[edge_id] = queue_wait.get(edge_id, 0.0) + waiting if waiting > 0 else 0.0
+            self.edge_series.append(edge_id, begin, end, {
+                "sampledSeconds": float(elem.get("sampledSeconds", 0)),
+                "waitingTime": waiting,
+                "queueWaitingTime": queue_wait[edge_id],
+            })
+            self.end_time = max(self.end_time, end)
+
+    def _load_detectors(self, path: str):
+        for _parent, elem in iter_elements(path, "interval"):
+            self.detector_series.append(
+                elem.get("id"), float(elem.get("begin", 0)), float(elem.get("end", 0)), {
+                    "nVehContrib": float(elem.get("nVehContrib", 0)),
+                    "occupancy": float(elem.get("occupancy", 0)),
+                    "speed": float(elem.get("speed", -1)),
+                })
+
+    def _load_tripinfo(self, path: str):
+        for _parent, elem in iter_elements(path, "tripinfo"):
+            vid = elem.get("id")
+            depart = float(elem.get("depart", 0))
+            arrival = float(elem.get("arrival", depart))
+            duration = float(elem.get("duration", arrival - depart))
+            waiting = float(elem.get("waitingTime", 0))
+            edge_id = elem.get("departLane", "").rsplit("_", 1)[0]
+            leave = max(depart, arrival - (duration - waiting) / 2)
+            self.vehicle_types[vid] = elem.get("vType", "")
+            self._events.append((depart, 0, vid, edge_id))
+            self._events.append((leave, 1, vid, edge_id))
+            self._events.append((arrival, 2, vid, edge_id))
+            self._pending += 1
+        heapq.heapify(self._events)
+
+    # ---- simulation ----
+
+    def _min_expected(self) -> int:
+        if self._pending:
+            return self._pending
+        # Sans tripinfo: on rejoue jusqu'à la fin des données de tronçons
+        return 1 if not self.vehicle_types and self.time < self.end_time else 0
+
+    def simulationStep(self, step: float = 0.0):
+        if step > self.time:
+            self._step = int(round((step - self.begin) / self.step_length))
+        else:
+            self._step += 1
+        # Temps recalculé depuis le numéro de pas: pas de dérive en virgule flottante
+        self.time = round(self.begin + self._step * self.step_length, 6)
+        self._arrived = []
+        self._departed = []
+        events = self._events
+        while events and events[0][0] <= self.time + 1e-9:
+            _t, kind, vid, edge_id = heapq.heappop(events)
+            if kind == 0:
+                self.on_edge.setdefault(edge_id, {})[vid] = None
+                self.vehicle_edges[vid] = edge_id
+                self._departed.append(vid)
+            elif kind == 1:
+                self.on_edge.get(edge_id, {}).pop(vid, None)
+                self.vehicle_edges[vid] = ""
+            else:
+                self.vehicle_edges.pop(vid, None)
+                self._arrived.append(vid)
+                self._pending -= 1
+
+    def close(self):
+        pass
+
+    def save_decisions(self, path: str):
+        """Décisions du contrôleur: time,tls_id,phase"""
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["time", "tls_id", "phase"])
+            writer.writerows(self.decisions)
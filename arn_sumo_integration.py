@@ -1,25 +1,64 @@
 # arn_sumo_integration.py - VERSION FINALE CORRIGÉE
+import argparse
+import contextlib
+import heapq
+import json
 import random
 import time
 import sys
+import xml.etree.ElementTree as ET
+from array import array
+from collections import deque
 from enum import Enum
-from dataclasses import dataclass
-from typing import Optional, List, Dict
+from functools import partial
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, NamedTuple, Set, Tuple, Union
 
 try:
     import traci
+    import traci.constants as tc
 except ImportError:
-    print("❌ ERREUR: Module 'traci' non trouvé!")
-    print("   Installe SUMO et ajoute-le au PYTHONPATH")
-    print("   Ou installe via: pip install traci")
-    sys.exit(1)
+    # Pas de SUMO: seul le mode rejeu (--replay, arn_replay.ReplayBackend) reste possible
+    traci = None
+    tc = None
+
+try:
+    import numpy as np  # optionnel: uniquement pour LaneTable
+except ImportError:
+    np = None
 
 # =============== CONFIGURATION ===============
-SUMO_BINARY = "sumo-gui"  # Change en "sumo" pour mode console
+SUMO_BINARY = "sumo-gui"  # Binaire par défaut (--nogui/--batch: SUMO_BINARY_NOGUI)
+SUMO_BINARY_NOGUI = "sumo"
+SUMO_BACKEND = "traci"  # "libsumo": SUMO dans le processus (sans GUI, sans socket)
 SUMO_CONFIG = "mon_config_simple.sumocfg"  # Utilisation de la configuration simplifiée
 TLS_ID = "center"
+# Carrefour "center" historique sans table de phases: tronçon -> (phase verte, libellé)
+LEGACY_GREEN_PHASES = {
+    "NtoC": (0, "Nord-Sud"), "StoC": (0, "Nord-Sud"),
+    "EtoC": (2, "Est-Ouest"), "WtoC": (2, "Est-Ouest"),
+}
 CYCLE_DELAY = 3.0
 SIM_STEPS_PER_CYCLE = 30
+MAX_STEPS = 3600
+FINAL_REPORT_LANES = 20  # Voies listées dans les statistiques finales
+HISTORY_CYCLES = 32  # Fenêtre de l'historique des métriques par voie (cycles, 0 = sans)
+AUTO_DISCOVER = False  # True: pilote tous les carrefours à feux trouvés dans le réseau
+USE_SUBSCRIPTIONS = True  # Données reçues avec simulationStep au lieu d'un appel TraCI par variable
+EMERGENCY_PREEMPTION = True  # Vert immédiat (au pas près) pour un véhicule d'urgence qui approche
+
+# Ordonnanceur adaptatif (--adaptive), en pas de simulation
+MIN_GREEN_STEPS = 10  # Durée minimale d'un vert avant changement
+MAX_GREEN_STEPS = 90  # Au-delà, le vert passe à une autre voie qui attend
+MIN_DECISION_STEPS = 5  # Intervalle minimal entre deux décisions d'un carrefour
+IDLE_DECISION_STEPS = 60  # Intervalle d'un carrefour vide
+
+# Variables de tronçon abonnées en mode subscriptions
+EDGE_SUBSCRIPTION_VARS = [
+    tc.LAST_STEP_VEHICLE_NUMBER,
+    tc.VAR_WAITING_TIME,
+    tc.LAST_STEP_VEHICLE_HALTING_NUMBER,
+] if tc else []
 
 # =============== ARBRE ROUGE-NOIR ===============
 
@@ -27,6 +66,22 @@ class Color(Enum):
     RED = 0
     BLACK = 1
 
+# Valeurs brutes pour le stockage compact (CompactRedBlackTree)
+RED = Color.RED.value
+BLACK = Color.BLACK.value
+
+@dataclass(frozen=True)
+class ScoreWeights:
+    """Poids du score de priorité (voir Lane.calculate_score)"""
+    vehicles: float = 1.0
+    wait_time: float = 0.5
+    congestion: float = 2.0
+    bus: float = 20.0
+    emergency: float = 100.0
+    trend: float = 0.0  # Par véhicule gagné par cycle sur la fenêtre d'historique (file qui grossit)
+
+DEFAULT_WEIGHTS = ScoreWeights()
+
 @dataclass
 class Lane:
     name: str
@@ -37,25 +92,258 @@ class Lane:
     has_bus: bool = False
     has_emergency: bool = False
     priority_score: float = 0.0
+    # Métriques des derniers cycles (voir TrafficLightSystem, history_size)
+    history: Optional["LaneHistory"] = field(default=None, repr=False, compare=False)
     
-    def calculate_score(self):
+    def calculate_score(self, weights: ScoreWeights = DEFAULT_WEIGHTS):
         score = (
-            self.num_vehicles * 1.0 +
-            self.wait_time * 0.5 +
-            self.congestion_level * 2.0
+            self.num_vehicles * weights.vehicles +
+            self.wait_time * weights.wait_time +
+            self.congestion_level * weights.congestion
         )
         if self.has_bus:
-            score += 20
+            score += weights.bus
         if self.has_emergency:
-            score += 100
+            score += weights.emergency
+        if weights.trend:
+            score += self.queue_trend() * weights.trend
         self.priority_score = score
         return score
+    
+    def queue_trend(self) -> float:
+        """Pente du nombre de véhicules (véhicules par cycle) sur la fenêtre d'historique"""
+        return self.history.trend("num_vehicles") if self.history is not None else 0.0
+
+# =============== HISTORIQUE DES VOIES ===============
+
+class MetricRing:
+    """Les capacity dernières valeurs d'une métrique, dans un tableau préalloué (mémoire bornée).
+    
+    append, mean et trend en O(1) grâce aux sommes tenues à jour, max en O(1)
+    amorti avec une file monotone. total/count/peak couvrent tout le run
+    (métriques positives: peak vaut 0 avant la première valeur).
+    """
+    def __init__(self, capacity: int = HISTORY_CYCLES):
+        self.capacity = capacity
+        self.values = array('d', bytes(8 * capacity))
+        self.head = 0  # Prochaine case écrite
+        self.size = 0
+        self.appended = 0  # Numéro de la prochaine valeur
+        self._sum = 0.0
+        # Σ x·y, x = position dans la fenêtre (0 = plus ancienne)
+        self._sum_xy = 0.0
+        # (numéro, valeur) à valeurs décroissantes: la tête est le maximum de la fenêtre
+        self._maxima: deque = deque()
+        self.total = 0.0
+        self.count = 0
+        self.peak = 0.0
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def append(self, value: float):
+        size = self.size
+        head = self.head
+        total = self._sum
+        if size == self.capacity:
+            total -= self.values[head]
+            size -= 1
+            # Les valeurs restantes reculent d'une position
+            self._sum_xy -= total
+        self.values[head] = value
+        self._sum_xy += size * value
+        self._sum = total + value
+        self.size = size + 1
+        head += 1
+        if head == self.capacity:
+            head = 0
+            self._resync()
+        self.head = head
+        
+        maxima = self._maxima
+        appended = self.appended
+        while maxima and maxima[-1][1] <= value:
+            maxima.pop()
+        maxima.append((appended, value))
+        if maxima[0][0] <= appended - self.capacity:
+            maxima.popleft()
+        self.appended = appended + 1
+        
+        self.total += value
+        self.count += 1
+        if value > self.peak:
+            self.peak = value
+    
+    def _resync(self):
+        """Recalcule les sommes une fois par tour (pas de dérive en virgule flottante)"""
+        values = self.values
+        self._sum = sum(values)
+        self._sum_xy = sum(x * y for x, y in enumerate(values))
+    
+    def window(self) -> List[float]:
+        """Valeurs de la fenêtre, de la plus ancienne à la plus récente"""
+        start = (self.head - self.size) % self.capacity
+        return [self.values[(start + i) % self.capacity] for i in range(self.size)]
+    
+    def mean(self) -> float:
+        return self._sum / self.size if self.size else 0.0
+    
+    def max(self) -> float:
+        return self._maxima[0][1] if self._maxima else 0.0
+    
+    def trend(self) -> float:
+        """Pente des moindres carrés (par cycle) sur la fenêtre"""
+        n = self.size
+        if n < 2:
+            return 0.0
+        sum_x = n * (n - 1) / 2
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6
+        return (n * self._sum_xy - sum_x * self._sum) / (n * sum_xx - sum_x * sum_x)
+    
+    def run_mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+    
+    def state_dict(self) -> Dict[str, object]:
+        return {"window": self.window(), "total": self.total, "count": self.count, "peak": self.peak}
+    
+    def load_state_dict(self, state: Dict[str, object]):
+        self.__init__(self.capacity)
+        for value in state["window"]:
+            self.append(value)
+        self.total, self.count, self.peak = state["total"], state["count"], state["peak"]
+
+HISTORY_FIELDS = ("num_vehicles", "wait_time", "congestion_level")
+
+class LaneHistory:
+    """Historique par cycle des métriques d'une voie (un MetricRing par métrique)"""
+    def __init__(self, capacity: int = HISTORY_CYCLES):
+        self.rings: Dict[str, MetricRing] = {name: MetricRing(capacity) for name in HISTORY_FIELDS}
+    
+    @property
+    def cycles(self) -> int:
+        return self.rings["num_vehicles"].count
+    
+    def record(self, lane: Lane):
+        rings = self.rings
+        rings["num_vehicles"].append(lane.num_vehicles)
+        rings["wait_time"].append(lane.wait_time)
+        rings["congestion_level"].append(lane.congestion_level)
+    
+    def mean(self, name: str) -> float:
+        return self.rings[name].mean()
+    
+    def max(self, name: str) -> float:
+        return self.rings[name].max()
+    
+    def trend(self, name: str) -> float:
+        return self.rings[name].trend()
+    
+    def run_mean(self, name: str) -> float:
+        return self.rings[name].run_mean()
+    
+    def run_max(self, name: str) -> float:
+        return self.rings[name].peak
+    
+    def state_dict(self) -> Dict[str, object]:
+        return {name: ring.state_dict() for name, ring in self.rings.items()}
+    
+    def load_state_dict(self, state: Dict[str, object]):
+        for name, ring_state in state.items():
+            if name in self.rings:
+                self.rings[name].load_state_dict(ring_state)
+
+# =============== TABLE DE VOIES VECTORISÉE ===============
+
+def _column(name: str, cast):
+    def getter(self):
+        return cast(getattr(self._table, name)[self._row])
+    def setter(self, value):
+        getattr(self._table, name)[self._row] = value
+    return property(getter, setter)
+
+class LaneView(Lane):
+    """Voie dont les métriques sont une ligne de LaneTable (même interface que Lane)"""
+    num_vehicles = _column("num_vehicles", int)
+    wait_time = _column("wait_time", float)
+    congestion_level = _column("congestion_level", int)
+    has_bus = _column("has_bus", bool)
+    has_emergency = _column("has_emergency", bool)
+    priority_score = _column("priority_score", float)
+    
+    def __init__(self, table: "LaneTable", row: int, name: str, sumo_edge_id: str):
+        self._table = table
+        self._row = row
+        self.name = name
+        self.sumo_edge_id = sumo_edge_id
+    
+    def calculate_score(self, weights: ScoreWeights = DEFAULT_WEIGHTS):
+        return self._table.score_rows(weights, self._row)
+
+class LaneTable:
+    """Métriques de toutes les voies en colonnes NumPy (struct-of-arrays).
+    
+    score_all() calcule tous les priority_score en une expression vectorisée;
+    les voies d'origine sont remplacées par des LaneView sur les lignes de la table.
+    """
+    def __init__(self, lanes: List[Lane]):
+        if np is None:
+            raise ImportError("LaneTable nécessite numpy (pip install numpy)")
+        n = len(lanes)
+        self.num_vehicles = np.array([l.num_vehicles for l in lanes], dtype=np.int32)
+        self.wait_time = np.array([l.wait_time for l in lanes], dtype=np.float64)
+        self.congestion_level = np.array([l.congestion_level for l in lanes], dtype=np.int32)
+        self.has_bus = np.array([l.has_bus for l in lanes], dtype=bool)
+        self.has_emergency = np.array([l.has_emergency for l in lanes], dtype=bool)
+        self.priority_score = np.array([l.priority_score for l in lanes], dtype=np.float64)
+        # Pente du nombre de véhicules (Lane.queue_trend), remplie si weights.trend != 0
+        self.trend = np.zeros(n)
+        # Scores déjà reportés dans l'ARN (NaN: jamais inséré)
+        self.committed_score = np.full(n, np.nan)
+        self.views = [
+            LaneView(self, row, lane.name, lane.sumo_edge_id) for row, lane in enumerate(lanes)
+        ]
+    
+    def __len__(self) -> int:
+        return len(self.views)
+    
+    def assign(self, rows: List[int], num_vehicles: List[int], wait_time: List[float],
+               congestion_level: List[int], has_bus: List[bool], has_emergency: List[bool]):
+        """Écrit les mesures d'un cycle en une affectation par colonne"""
+        self.num_vehicles[rows] = num_vehicles
+        self.wait_time[rows] = wait_time
+        self.congestion_level[rows] = congestion_level
+        self.has_bus[rows] = has_bus
+        self.has_emergency[rows] = has_emergency
+    
+    def score_rows(self, weights: ScoreWeights = DEFAULT_WEIGHTS, rows=slice(None)):
+        score = (
+            self.num_vehicles[rows] * weights.vehicles +
+            self.wait_time[rows] * weights.wait_time +
+            self.congestion_level[rows] * weights.congestion +
+            self.has_bus[rows] * weights.bus +
+            self.has_emergency[rows] * weights.emergency
+        )
+        if weights.trend:
+            score = score + self.trend[rows] * weights.trend
+        self.priority_score[rows] = score
+        return score
+    
+    def score_all(self, weights: ScoreWeights = DEFAULT_WEIGHTS) -> "np.ndarray":
+        return self.score_rows(weights)
+    
+    def changed_rows(self) -> "np.ndarray":
+        """Lignes dont le score diffère de celui reporté dans l'ARN (puis les marque reportées)"""
+        rows = np.flatnonzero(self.priority_score != self.committed_score)
+        self.committed_score[rows] = self.priority_score[rows]
+        return rows
 
 class RBNode:
     def __init__(self, priority_score: float, lane: Optional[Lane]):
         self.priority_score = priority_score
         self.lane = lane
         self.color = Color.RED
+        self.size = 1  # taille du sous-arbre (augmentation pour top-k / rang)
+        self.order = 0  # rang d'insertion: départage les scores égaux
         self.left: Optional['RBNode'] = None
         self.right: Optional['RBNode'] = None
         self.parent: Optional['RBNode'] = None
@@ -64,7 +352,13 @@ class RedBlackTree:
     def __init__(self):
         self.NIL = RBNode(0, None)
         self.NIL.color = Color.BLACK
+        self.NIL.size = 0
         self.root = self.NIL
+        self.max_node: Optional[RBNode] = None  # maximum mis en cache
+        self._inserted = 0
+    
+    def __len__(self) -> int:
+        return self.root.size
     
     def left_rotate(self, x: RBNode):
         y = x.right
@@ -80,6 +374,8 @@ class RedBlackTree:
             x.parent.right = y
         y.left = x
         x.parent = y
+        y.size = x.size
+        x.size = x.left.size + x.right.size + 1
     
     def right_rotate(self, y: RBNode):
         x = y.left
@@ -95,18 +391,32 @@ class RedBlackTree:
             y.parent.left = x
         x.right = y
         y.parent = x
+        x.size = y.size
+        y.size = y.left.size + y.right.size + 1
     
-    def insert(self, priority_score: float, lane: Lane):
+    def insert(self, priority_score: float, lane: Lane) -> RBNode:
+        """Insère une voie et renvoie son nœud (poignée pour update_key/delete)"""
         node = RBNode(priority_score, lane)
+        node.order = self._inserted
+        self._inserted += 1
+        self._insert_node(node)
+        return node
+    
+    def _insert_node(self, node: RBNode):
         node.left = self.NIL
         node.right = self.NIL
+        node.size = 1
         
+        # Clé (score, rang d'insertion): à score égal la voie insérée en dernier
+        # (la dernière de la liste) reste à droite, même après un update_key
+        key, order = node.priority_score, node.order
         parent = None
         current = self.root
         
         while current != self.NIL:
             parent = current
-            if node.priority_score < current.priority_score:
+            current.size += 1
+            if key < current.priority_score or (key == current.priority_score and order < current.order):
                 current = current.left
             else:
                 current = current.right
@@ -114,13 +424,18 @@ class RedBlackTree:
         node.parent = parent
         if parent is None:
             self.root = node
-        elif node.priority_score < parent.priority_score:
+        elif key < parent.priority_score or (key == parent.priority_score and order < parent.order):
             parent.left = node
         else:
             parent.right = node
         
         node.color = Color.RED
         self._fix_insert(node)
+        
+        max_node = self.max_node
+        if (max_node is None or key > max_node.priority_score
+                or (key == max_node.priority_score and order > max_node.order)):
+            self.max_node = node
     
     def _fix_insert(self, node: RBNode):
         while node.parent and node.parent.color == Color.RED:
@@ -154,138 +469,1528 @@ class RedBlackTree:
                     self.left_rotate(node.parent.parent)
         self.root.color = Color.BLACK
     
+    def _transplant(self, u: RBNode, v: RBNode):
+        if u.parent is None:
+            self.root = v
+        elif u == u.parent.left:
+            u.parent.left = v
+        else:
+            u.parent.right = v
+        v.parent = u.parent
+    
+    def _minimum(self, node: RBNode) -> RBNode:
+        while node.left != self.NIL:
+            node = node.left
+        return node
+    
+    def delete(self, node: RBNode):
+        """Retire un nœud de l'arbre (le nœud peut ensuite être réinséré)"""
+        if node is self.max_node:
+            self.max_node = self.predecessor(node)
+        
+        # Mise à jour des tailles le long du chemin du nœud physiquement retiré
+        if node.left != self.NIL and node.right != self.NIL:
+            ancestor = self._minimum(node.right).parent
+        else:
+            ancestor = node.parent
+        while ancestor is not None:
+            ancestor.size -= 1
+            ancestor = ancestor.parent
+        
+        y = node
+        y_original_color = y.color
+        if node.left == self.NIL:
+            x = node.right
+            self._transplant(node, node.right)
+        elif node.right == self.NIL:
+            x = node.left
+            self._transplant(node, node.left)
+        else:
+            y = self._minimum(node.right)
+            y_original_color = y.color
+            x = y.right
+            if y.parent == node:
+                x.parent = y
+            else:
+                self._transplant(y, y.right)
+                y.right = node.right
+                y.right.parent = y
+            self._transplant(node, y)
+            y.left = node.left
+            y.left.parent = y
+            y.color = node.color
+            y.size = node.size
+        
+        if y_original_color == Color.BLACK:
+            self._fix_delete(x)
+        
+        node.parent = None
+        node.left = None
+        node.right = None
+        self.NIL.parent = None
+    
+    def _fix_delete(self, x: RBNode):
+        while x != self.root and x.color == Color.BLACK:
+            if x == x.parent.left:
+                sibling = x.parent.right
+                if sibling.color == Color.RED:
+                    sibling.color = Color.BLACK
+                    x.parent.color = Color.RED
+                    self.left_rotate(x.parent)
+                    sibling = x.parent.right
+                if sibling.left.color == Color.BLACK and sibling.right.color == Color.BLACK:
+                    sibling.color = Color.RED
+                    x = x.parent
+                else:
+                    if sibling.right.color == Color.BLACK:
+                        sibling.left.color = Color.BLACK
+                        sibling.color = Color.RED
+                        self.right_rotate(sibling)
+                        sibling = x.parent.right
+                    sibling.color = x.parent.color
+                    x.parent.color = Color.BLACK
+                    sibling.right.color = Color.BLACK
+                    self.left_rotate(x.parent)
+                    x = self.root
+            else:
+                sibling = x.parent.left
+                if sibling.color == Color.RED:
+                    sibling.color = Color.BLACK
+                    x.parent.color = Color.RED
+                    self.right_rotate(x.parent)
+                    sibling = x.parent.left
+                if sibling.right.color == Color.BLACK and sibling.left.color == Color.BLACK:
+                    sibling.color = Color.RED
+                    x = x.parent
+                else:
+                    if sibling.left.color == Color.BLACK:
+                        sibling.right.color = Color.BLACK
+                        sibling.color = Color.RED
+                        self.left_rotate(sibling)
+                        sibling = x.parent.left
+                    sibling.color = x.parent.color
+                    x.parent.color = Color.BLACK
+                    sibling.left.color = Color.BLACK
+                    self.right_rotate(x.parent)
+                    x = self.root
+        x.color = Color.BLACK
+    
+    def update_key(self, node: RBNode, priority_score: float) -> bool:
+        """Repositionne un nœud si son score a changé (sans allocation, rang d'insertion conservé)"""
+        if node.priority_score == priority_score:
+            return False
+        self.delete(node)
+        node.priority_score = priority_score
+        self._insert_node(node)
+        return True
+    
     def find_maximum(self) -> Optional[RBNode]:
-        if self.root == self.NIL:
-            return None
+        """Maximum en O(1) grâce au pointeur mis en cache"""
+        return self.max_node
+    
+    def predecessor(self, node: RBNode) -> Optional[RBNode]:
+        if node.left != self.NIL:
+            current = node.left
+            while current.right != self.NIL:
+                current = current.right
+            return current
+        parent = node.parent
+        while parent is not None and node == parent.left:
+            node = parent
+            parent = parent.parent
+        return parent
+    
+    def top_k(self, k: int) -> List[RBNode]:
+        """Les k meilleurs nœuds par score décroissant, en O(k + log n)"""
+        result = []
+        node = self.max_node
+        while node is not None and len(result) < k:
+            result.append(node)
+            node = self.predecessor(node)
+        return result
+    
+    def rank(self, node: RBNode) -> int:
+        """Rang d'un nœud (1 = score le plus élevé), en O(log n)"""
+        position = node.left.size + 1
+        current = node
+        while current.parent is not None:
+            if current == current.parent.right:
+                position += current.parent.left.size + 1
+            current = current.parent
+        return self.root.size - position + 1
+    
+    def clear(self):
+        self.root = self.NIL
+        self.max_node = None
+        self._inserted = 0
+
+# =============== ARBRE ROUGE-NOIR COMPACT ===============
+
+class CompactNode(NamedTuple):
+    """Vue légère d'un nœud de CompactRedBlackTree (mêmes attributs que RBNode)"""
+    index: int
+    priority_score: float
+    lane: Optional[Lane]
+
+class CompactRedBlackTree:
+    """ARN stocké dans des tableaux parallèles préalloués (indices entiers + free-list).
+    
+    Même API que RedBlackTree, mais les poignées sont des indices entiers.
+    Environ 3× moins de mémoire, au prix d'insertions, mises à jour et top_k plus lents.
+    L'indice 0 est la sentinelle NIL (noire, taille 0) et sert aussi de parent de la racine.
+    """
+    NIL = 0
+    
+    def __init__(self, capacity: int = 64):
+        capacity = max(2, capacity)
+        self._color = array('b', [Color.BLACK.value]) * capacity
+        self._key = array('d', [0.0]) * capacity
+        self._left = array('i', [0]) * capacity
+        self._right = array('i', [0]) * capacity
+        self._parent = array('i', [0]) * capacity
+        self._size = array('i', [0]) * capacity
+        self._order = array('q', [0]) * capacity  # rang d'insertion (départage les égalités)
+        self._lanes: List[Optional[Lane]] = [None] * capacity
+        self._capacity = capacity
+        self._next_unused = 1
+        self._free = 0  # tête de la free-list chaînée via _parent
+        self._inserted = 0
+        self.root = self.NIL
+        self._max = self.NIL
+        self._max_view: Optional[CompactNode] = None  # vue du maximum, reconstruite s'il change
+    
+    def __len__(self) -> int:
+        return self._size[self.root]
+    
+    # ---- gestion mémoire ----
+    
+    def _grow(self):
+        extra = self._capacity
+        self._color.extend(array('b', [Color.BLACK.value]) * extra)
+        self._key.extend(array('d', [0.0]) * extra)
+        self._left.extend(array('i', [0]) * extra)
+        self._right.extend(array('i', [0]) * extra)
+        self._parent.extend(array('i', [0]) * extra)
+        self._size.extend(array('i', [0]) * extra)
+        self._order.extend(array('q', [0]) * extra)
+        self._lanes.extend([None] * extra)
+        self._capacity += extra
+    
+    def _alloc(self) -> int:
+        if self._free:
+            index = self._free
+            self._free = self._parent[index]
+            return index
+        if self._next_unused == self._capacity:
+            self._grow()
+        index = self._next_unused
+        self._next_unused += 1
+        return index
+    
+    def _release(self, index: int):
+        self._lanes[index] = None
+        self._parent[index] = self._free
+        self._free = index
+    
+    # ---- rotations ----
+    
+    def _left_rotate(self, x: int):
+        left, right, parent, size = self._left, self._right, self._parent, self._size
+        y = right[x]
+        right[x] = left[y]
+        if left[y]:
+            parent[left[y]] = x
+        parent[y] = parent[x]
+        if not parent[x]:
+            self.root = y
+        elif x == left[parent[x]]:
+            left[parent[x]] = y
+        else:
+            right[parent[x]] = y
+        left[y] = x
+        parent[x] = y
+        size[y] = size[x]
+        size[x] = size[left[x]] + size[right[x]] + 1
+    
+    def _right_rotate(self, y: int):
+        left, right, parent, size = self._left, self._right, self._parent, self._size
+        x = left[y]
+        left[y] = right[x]
+        if right[x]:
+            parent[right[x]] = y
+        parent[x] = parent[y]
+        if not parent[y]:
+            self.root = x
+        elif y == right[parent[y]]:
+            right[parent[y]] = x
+        else:
+            left[parent[y]] = x
+        right[x] = y
+        parent[y] = x
+        size[x] = size[y]
+        size[y] = size[left[y]] + size[right[y]] + 1
+    
+    # ---- insertion ----
+    
+    def insert(self, priority_score: float, lane: Lane) -> int:
+        """Insère une voie et renvoie son indice (poignée pour update_key/delete)"""
+        index = self._alloc()
+        self._key[index] = priority_score
+        self._order[index] = self._inserted
+        self._inserted += 1
+        self._lanes[index] = lane
+        self._insert_index(index)
+        return index
+    
+    def _insert_index(self, node: int):
+        key, order, left, right, size = self._key, self._order, self._left, self._right, self._size
+        node_key, node_order = key[node], order[node]
+        left[node] = right[node] = self.NIL
+        size[node] = 1
+        
+        parent = self.NIL
         current = self.root
-        while current.right != self.NIL:
-            current = current.right
-        return current
+        while current:
+            parent = current
+            size[current] += 1
+            if node_key < key[current] or (node_key == key[current] and node_order < order[current]):
+                current = left[current]
+            else:
+                current = right[current]
+        
+        self._parent[node] = parent
+        if not parent:
+            self.root = node
+        elif node_key < key[parent] or (node_key == key[parent] and node_order < order[parent]):
+            left[parent] = node
+        else:
+            right[parent] = node
+        
+        self._color[node] = RED
+        self._fix_insert(node)
+        
+        top = self._max
+        if not top or node_key > key[top] or (node_key == key[top] and node_order > order[top]):
+            self._max = node
+            self._max_view = None
+    
+    def _fix_insert(self, node: int):
+        color, left, right, parent = self._color, self._left, self._right, self._parent
+        while color[parent[node]] == RED:
+            p = parent[node]
+            g = parent[p]
+            if p == left[g]:
+                uncle = right[g]
+                if color[uncle] == RED:
+                    color[p] = BLACK
+                    color[uncle] = BLACK
+                    color[g] = RED
+                    node = g
+                else:
+                    if node == right[p]:
+                        node = p
+                        self._left_rotate(node)
+                        p = parent[node]
+                        g = parent[p]
+                    color[p] = BLACK
+                    color[g] = RED
+                    self._right_rotate(g)
+            else:
+                uncle = left[g]
+                if color[uncle] == RED:
+                    color[p] = BLACK
+                    color[uncle] = BLACK
+                    color[g] = RED
+                    node = g
+                else:
+                    if node == left[p]:
+                        node = p
+                        self._right_rotate(node)
+                        p = parent[node]
+                        g = parent[p]
+                    color[p] = BLACK
+                    color[g] = RED
+                    self._left_rotate(g)
+        color[self.root] = BLACK
+    
+    # ---- suppression ----
+    
+    def _transplant(self, u: int, v: int):
+        parent = self._parent
+        if not parent[u]:
+            self.root = v
+        elif u == self._left[parent[u]]:
+            self._left[parent[u]] = v
+        else:
+            self._right[parent[u]] = v
+        parent[v] = parent[u]
+    
+    def _minimum(self, node: int) -> int:
+        left = self._left
+        while left[node]:
+            node = left[node]
+        return node
+    
+    def _detach(self, node: int):
+        color, left, right, parent, size = (
+            self._color, self._left, self._right, self._parent, self._size)
+        if node == self._max:
+            self._max = self._predecessor(node)
+            self._max_view = None
+        
+        if left[node] and right[node]:
+            ancestor = parent[self._minimum(right[node])]
+        else:
+            ancestor = parent[node]
+        while ancestor:
+            size[ancestor] -= 1
+            ancestor = parent[ancestor]
+        
+        y = node
+        y_original_color = color[y]
+        if not left[node]:
+            x = right[node]
+            self._transplant(node, x)
+        elif not right[node]:
+            x = left[node]
+            self._transplant(node, x)
+        else:
+            y = self._minimum(right[node])
+            y_original_color = color[y]
+            x = right[y]
+            if parent[y] == node:
+                parent[x] = y
+            else:
+                self._transplant(y, right[y])
+                right[y] = right[node]
+                parent[right[y]] = y
+            self._transplant(node, y)
+            left[y] = left[node]
+            parent[left[y]] = y
+            color[y] = color[node]
+            size[y] = size[node]
+        
+        if y_original_color == BLACK:
+            self._fix_delete(x)
+        parent[self.NIL] = self.NIL
+    
+    def _fix_delete(self, x: int):
+        color, left, right, parent = self._color, self._left, self._right, self._parent
+        while x != self.root and color[x] == BLACK:
+            p = parent[x]
+            if x == left[p]:
+                sibling = right[p]
+                if color[sibling] == RED:
+                    color[sibling] = BLACK
+                    color[p] = RED
+                    self._left_rotate(p)
+                    sibling = right[p]
+                if color[left[sibling]] == BLACK and color[right[sibling]] == BLACK:
+                    color[sibling] = RED
+                    x = p
+                else:
+                    if color[right[sibling]] == BLACK:
+                        color[left[sibling]] = BLACK
+                        color[sibling] = RED
+                        self._right_rotate(sibling)
+                        sibling = right[p]
+                    color[sibling] = color[p]
+                    color[p] = BLACK
+                    color[right[sibling]] = BLACK
+                    self._left_rotate(p)
+                    x = self.root
+            else:
+                sibling = left[p]
+                if color[sibling] == RED:
+                    color[sibling] = BLACK
+                    color[p] = RED
+                    self._right_rotate(p)
+                    sibling = left[p]
+                if color[right[sibling]] == BLACK and color[left[sibling]] == BLACK:
+                    color[sibling] = RED
+                    x = p
+                else:
+                    if color[left[sibling]] == BLACK:
+                        color[right[sibling]] = BLACK
+                        color[sibling] = RED
+                        self._left_rotate(sibling)
+                        sibling = left[p]
+                    color[sibling] = color[p]
+                    color[p] = BLACK
+                    color[left[sibling]] = BLACK
+                    self._right_rotate(p)
+                    x = self.root
+        color[x] = BLACK
+    
+    def delete(self, node: int):
+        """Retire un nœud et rend son emplacement à la free-list"""
+        self._detach(node)
+        self._release(node)
+    
+    def update_key(self, node: int, priority_score: float) -> bool:
+        """Repositionne un nœud si son score a changé (l'indice reste valide)"""
+        if self._key[node] == priority_score:
+            return False
+        self._detach(node)
+        self._key[node] = priority_score
+        self._insert_index(node)
+        return True
+    
+    # ---- requêtes ----
+    
+    def _view(self, node: int) -> CompactNode:
+        return CompactNode(node, self._key[node], self._lanes[node])
+    
+    def find_maximum(self) -> Optional[CompactNode]:
+        """Vue du maximum, mise en cache tant que le maximum et son score ne changent pas"""
+        view = self._max_view
+        if view is None and self._max:
+            view = self._max_view = self._view(self._max)
+        return view
+    
+    def _predecessor(self, node: int) -> int:
+        left, right, parent = self._left, self._right, self._parent
+        if left[node]:
+            node = left[node]
+            while right[node]:
+                node = right[node]
+            return node
+        p = parent[node]
+        while p and node == left[p]:
+            node = p
+            p = parent[p]
+        return p
+    
+    def top_k(self, k: int) -> List[CompactNode]:
+        # Prédécesseur déroulé sur les tableaux: évite un appel de méthode par nœud
+        key, lanes, left, right, parent = self._key, self._lanes, self._left, self._right, self._parent
+        result = []
+        node = self._max
+        while node and len(result) < k:
+            result.append(CompactNode(node, key[node], lanes[node]))
+            if left[node]:
+                node = left[node]
+                while right[node]:
+                    node = right[node]
+            else:
+                p = parent[node]
+                while p and node == left[p]:
+                    node = p
+                    p = parent[p]
+                node = p
+        return result
+    
+    def rank(self, node: int) -> int:
+        left, right, parent, size = self._left, self._right, self._parent, self._size
+        position = size[left[node]] + 1
+        while parent[node]:
+            if node == right[parent[node]]:
+                position += size[left[parent[node]]] + 1
+            node = parent[node]
+        return size[self.root] - position + 1
     
     def clear(self):
+        self._lanes = [None] * self._capacity
+        self._next_unused = 1
+        self._free = 0
+        self._inserted = 0
         self.root = self.NIL
+        self._max = self.NIL
+        self._max_view = None
+        self._parent[self.NIL] = self.NIL
+
+# =============== VÉHICULES SPÉCIAUX ===============
+
+class VehicleClass(Enum):
+    NORMAL = 0
+    BUS = 1
+    EMERGENCY = 2
+
+def classify_vehicle(vid: str, vtype: str) -> VehicleClass:
+    vtype = vtype.lower()
+    if "ambulance" in vtype or "ambulance" in vid.lower():
+        return VehicleClass.EMERGENCY
+    if "bus" in vtype:
+        return VehicleClass.BUS
+    return VehicleClass.NORMAL
+
+class VehicleClassCache:
+    """Cache id véhicule -> VehicleClass, vidé au fil des arrivées.
+    
+    Le type d'un véhicule ne change pas pendant son trajet: getTypeID et
+    l'analyse des chaînes ne sont faits qu'une fois par véhicule.
+    evict_arrived() doit être appelé après chaque simulationStep.
+    Les départs du pas (departed) sont reçus avec le même abonnement.
+    """
+    def __init__(self, backend=None):
+        self.backend = backend or traci
+        self.classes: Dict[str, VehicleClass] = {}
+        self.use_subscriptions = False
+    
+    def __len__(self) -> int:
+        return len(self.classes)
+    
+    def subscribe(self):
+        """Reçoit les listes d'arrivées et de départs avec simulationStep (pas d'appel TraCI dédié)"""
+        if self.use_subscriptions:
+            return
+        # Un seul abonnement simulation: un second subscribe remplacerait les variables du premier
+        self.backend.simulation.subscribe(
+            [tc.VAR_ARRIVED_VEHICLES_IDS, tc.VAR_DEPARTED_VEHICLES_IDS]
+        )
+        self.use_subscriptions = True
+    
+    def get(self, vid: str, vtype: Optional[str] = None) -> VehicleClass:
+        vclass = self.classes.get(vid)
+        if vclass is None:
+            if vtype is None:
+                vtype = self.backend.vehicle.getTypeID(vid)
+            vclass = self.classes[vid] = classify_vehicle(vid, vtype)
+        return vclass
+    
+    def evict_arrived(self) -> List[str]:
+        """Oublie les véhicules arrivés au dernier pas et renvoie leurs IDs"""
+        if self.use_subscriptions:
+            results = self.backend.simulation.getSubscriptionResults() or {}
+            arrived = results.get(tc.VAR_ARRIVED_VEHICLES_IDS, ())
+        else:
+            arrived = self.backend.simulation.getArrivedIDList()
+        for vid in arrived:
+            self.classes.pop(vid, None)
+        return arrived
+    
+    def departed(self) -> List[str]:
+        """Véhicules partis au dernier pas"""
+        if self.use_subscriptions:
+            results = self.backend.simulation.getSubscriptionResults() or {}
+            return results.get(tc.VAR_DEPARTED_VEHICLES_IDS, ())
+        return self.backend.simulation.getDepartedIDList()
+    
+    def clear(self):
+        self.classes.clear()
 
 # =============== SYSTÈME DE GESTION ===============
 
+# Métriques d'une voie sauvegardées dans les points de reprise
+LANE_STATE_FIELDS = ("num_vehicles", "wait_time", "congestion_level", "has_bus", "has_emergency")
+
+_UNTIMED = contextlib.nullcontext()
+
+def _stage_timer(metrics, stage: str):
+    """Chronomètre d'étape de arn_metrics.Metrics, ou rien si le système n'est pas instrumenté"""
+    return metrics.time(stage) if metrics is not None else _UNTIMED
+
+# (rang, vert?, nom, tronçon, bus, urgence, véhicules, attente, congestion, score)
+StatusRow = Tuple[int, bool, str, str, bool, bool, int, float, int, float]
+
+def format_status(cycle_count: int, tls_id: str, rows: List[StatusRow],
+                  green_name: Optional[str]) -> str:
+    """Texte de display_status, construit depuis un instantané (voir status_snapshot)"""
+    lines = [
+        "\n" + "="*75,
+        f"🚦 CYCLE #{cycle_count:03d} - Carrefour Intelligent (ARN) [{tls_id}]",
+        "="*75,
+    ]
+    for (i, is_green, name, edge_id, has_bus, has_emergency,
+         num_vehicles, wait_time, congestion_level, priority_score) in rows:
+        status = "🟢 VERT " if is_green else "🔴 ROUGE"
+        icons = ""
+        if has_emergency:
+            icons += " 🚑"
+        if has_bus:
+            icons += " 🚌"
+        
+        lines.append(f"{i}. {status} | {name:12s} ({edge_id}){icons}")
+        lines.append(f"   📊 Véhicules: {num_vehicles:3d} | "
+                     f"Attente: {wait_time:6.1f}s | "
+                     f"Congestion: {congestion_level:2d}/10 | "
+                     f"Score: {priority_score:6.1f}")
+    
+    if green_name:
+        lines.append(f"\n✅ Voie prioritaire: {green_name}")
+    
+    lines.append("="*75)
+    return "\n".join(lines)
+
 class TrafficLightSystem:
-    def __init__(self, lanes: List[Lane]):
+    def __init__(self, lanes: List[Lane], compact_tree: bool = False,
+                 vehicle_classes: Optional[VehicleClassCache] = None,
+                 tls_id: str = TLS_ID,
+                 green_phases: Optional[Dict[str, List[int]]] = None,
+                 weights: ScoreWeights = DEFAULT_WEIGHTS,
+                 vectorized: bool = False, backend=None,
+                 history_size: int = HISTORY_CYCLES):
+        # Source des données et des commandes de feux: module traci (défaut),
+        # ou tout objet de même interface (ex. arn_replay.ReplayBackend)
+        self.backend = backend or traci
+        # vectorized: métriques dans une LaneTable NumPy, scores calculés en bloc
+        self.table = LaneTable(lanes) if vectorized else None
+        if self.table is not None:
+            lanes = self.table.views
         self.lanes = lanes
-        self.rbt = RedBlackTree()
+        # Fenêtre glissante des métriques par voie (moyenne, max, tendance) et agrégats du run
+        if history_size:
+            for lane in lanes:
+                lane.history = LaneHistory(history_size)
+        self.tls_id = tls_id
+        self.weights = weights
+        # Tronçon entrant -> phases qui lui donnent le vert (voir build_phase_table_*)
+        self.green_phases = green_phases or {}
+        # compact_tree: ARN en tableaux parallèles, moins gourmand en mémoire à grande échelle
+        self.rbt = CompactRedBlackTree(len(lanes) + 1) if compact_tree else RedBlackTree()
         self.current_green: Optional[Lane] = None
         self.cycle_count = 0
+        # Dernier pas joué par run_simulation/run_scheduled (lisible après une interruption)
+        self.step = 0
         self.edge_to_lane: Dict[str, Lane] = {
             lane.sumo_edge_id: lane for lane in lanes
         }
+        # Poignées voie -> nœud de l'ARN, pour ne repositionner que les scores modifiés
+        self.lane_nodes: Dict[str, Union[RBNode, int]] = {}
+        # ARN tenu par un processus de décision (voir detach_priority_tree)
+        self.remote_tree = False
+        self.use_subscriptions = False
+        # Test explicite: un cache vide est faux (__len__) mais doit rester partagé
+        self.vehicle_classes = (vehicle_classes if vehicle_classes is not None
+                                else VehicleClassCache(self.backend))
+        # Instrumentation optionnelle (arn_metrics.Metrics), voir instrument()
+        self.metrics = None
+        # Affichage délégué à un thread (arn_pipeline.Reporter), voir set_reporter()
+        self.reporter = None
+        # Voie réservée par EmergencyWatcher: garde le vert tant que l'urgence approche
+        self.emergency_hold: Optional[Lane] = None
+        # Journal binaire des décisions (arn_decisionlog.DecisionLogWriter), voir set_decision_log()
+        self.decision_log = None
+        # Tronçons sans phase verte connue (signalés une seule fois)
+        self.unmapped_edges: Set[str] = set()
+    
+    def instrument(self, metrics):
+        """Mesure la durée de chaque étape du cycle et compte les erreurs"""
+        self.metrics = metrics
+    
+    def set_reporter(self, reporter):
+        """Les affichages passent par la file du reporter au lieu de print"""
+        self.reporter = reporter
+    
+    def set_decision_log(self, decision_log):
+        """Chaque décision appliquée est ajoutée au journal"""
+        self.decision_log = decision_log
+    
+    def _report(self, message):
+        """message: texte, ou fonction qui le construit (appelée sur le thread du reporter)"""
+        if self.reporter is not None:
+            self.reporter.submit(message)
+        else:
+            print(message() if callable(message) else message)
+    
+    def _count_error(self, kind: str):
+        if self.metrics is not None:
+            self.metrics.error(kind)
+    
+    def state_dict(self) -> Dict[str, object]:
+        """État du contrôleur pour un point de reprise (voir save_checkpoint)"""
+        return {
+            "cycle_count": self.cycle_count,
+            "current_green": self.current_green.sumo_edge_id if self.current_green else None,
+            "lanes": {
+                lane.sumo_edge_id: [getattr(lane, name) for name in LANE_STATE_FIELDS]
+                for lane in self.lanes
+            },
+            "history": {
+                lane.sumo_edge_id: lane.history.state_dict()
+                for lane in self.lanes if lane.history is not None
+            },
+        }
+    
+    def load_state_dict(self, state: Dict[str, object]):
+        """Restaure les métriques des voies, rescore avec self.weights et reconstruit l'ARN"""
+        self.cycle_count = state["cycle_count"]
+        for edge_id, values in state["lanes"].items():
+            lane = self.edge_to_lane.get(edge_id)
+            if lane is None:
+                continue
+            for name, value in zip(LANE_STATE_FIELDS, values):
+                setattr(lane, name, value)
+        for edge_id, history_state in state.get("history", {}).items():
+            lane = self.edge_to_lane.get(edge_id)
+            if lane is not None and lane.history is not None:
+                lane.history.load_state_dict(history_state)
+        if self.table is not None:
+            self._refresh_trend()
+            self.table.score_all(self.weights)
+        else:
+            for lane in self.lanes:
+                lane.calculate_score(self.weights)
+        self.rebuild_priority_tree()
+        self.current_green = self.edge_to_lane.get(state["current_green"])
+    
+    def subscribe(self):
+        """Abonne chaque tronçon à ses variables et au type des véhicules présents.
+        
+        Les résultats arrivent ensuite avec la réponse de chaque simulationStep,
+        sans aller-retour TraCI supplémentaire dans update_traffic_data.
+        """
+        for lane in self.lanes:
+            self.backend.edge.subscribe(lane.sumo_edge_id, EDGE_SUBSCRIPTION_VARS)
+            self.backend.edge.subscribeContext(
+                lane.sumo_edge_id, tc.CMD_GET_VEHICLE_VARIABLE, 0, [tc.VAR_TYPE]
+            )
+        self.vehicle_classes.subscribe()
+        self.use_subscriptions = True
+    
+    def unsubscribe(self):
+        """Retire les abonnements des tronçons: update_traffic_data interroge SUMO directement"""
+        for lane in self.lanes:
+            self.backend.edge.unsubscribe(lane.sumo_edge_id)
+            self.backend.edge.unsubscribeContext(lane.sumo_edge_id, tc.CMD_GET_VEHICLE_VARIABLE, 0)
+        self.use_subscriptions = False
+    
+    def _read_edge(self, edge_id: str):
+        """Renvoie (véhicules, attente, arrêtés, {id véhicule: type ou None})"""
+        edge = self.backend.edge
+        if self.use_subscriptions:
+            results = edge.getSubscriptionResults(edge_id) or {}
+            context = edge.getContextSubscriptionResults(edge_id) or {}
+            return (
+                results.get(tc.LAST_STEP_VEHICLE_NUMBER, 0),
+                results.get(tc.VAR_WAITING_TIME, 0.0),
+                results.get(tc.LAST_STEP_VEHICLE_HALTING_NUMBER, 0),
+                {vid: variables.get(tc.VAR_TYPE) for vid, variables in context.items()},
+            )
+        
+        vcount = edge.getLastStepVehicleNumber(edge_id)
+        waiting_time = edge.getWaitingTime(edge_id)
+        halting = edge.getLastStepHaltingNumber(edge_id)
+        veh_ids = edge.getLastStepVehicleIDs(edge_id)
+        return vcount, waiting_time, halting, dict.fromkeys(veh_ids)
+    
+    def _measure(self, lane: Lane) -> Optional[Tuple[int, float, int, bool, bool]]:
+        """(véhicules, attente moyenne, congestion, bus, urgence) ou None si erreur"""
+        try:
+            # Données SUMO (abonnements ou interrogation directe)
+            vcount, waiting_time, halting, vehicles = self._read_edge(lane.sumo_edge_id)
+            
+            num_vehicles = int(vcount)
+            wait_time = waiting_time / max(1, vcount)
+            congestion_level = min(10, int((halting / max(1, vcount)) * 10))
+            
+            # Détection véhicules spéciaux
+            has_bus = False
+            has_emergency = False
+            
+            for vid, vtype in vehicles.items():
+                try:
+                    vclass = self.vehicle_classes.get(vid, vtype)
+                    if vclass is VehicleClass.BUS:
+                        has_bus = True
+                    elif vclass is VehicleClass.EMERGENCY:
+                        has_emergency = True
+                except:
+                    pass
+            
+            return num_vehicles, wait_time, congestion_level, has_bus, has_emergency
+            
+        except self.backend.TraCIException as e:
+            self._count_error("measure_traci")
+            self._report(f"⚠️  TraCI error pour {lane.name}: {e}")
+        except Exception as e:
+            self._count_error("measure_unexpected")
+            self._report(f"⚠️  Erreur inattendue pour {lane.name}: {e}")
+        return None
     
     def update_traffic_data(self):
         """Récupère les données en temps réel depuis SUMO"""
+        if self.table is not None:
+            self._update_table()
+            return
+        
         for lane in self.lanes:
-            try:
-                # Données SUMO
-                vcount = traci.edge.getLastStepVehicleNumber(lane.sumo_edge_id)
-                waiting_time = traci.edge.getWaitingTime(lane.sumo_edge_id)
-                halting = traci.edge.getLastStepHaltingNumber(lane.sumo_edge_id)
-                
-                lane.num_vehicles = int(vcount)
-                lane.wait_time = waiting_time / max(1, vcount)
-                lane.congestion_level = min(10, int((halting / max(1, vcount)) * 10))
-                
-                # Détection véhicules spéciaux
-                lane.has_bus = False
-                lane.has_emergency = False
-                
-                veh_ids = traci.edge.getLastStepVehicleIDs(lane.sumo_edge_id)
-                for vid in veh_ids:
-                    try:
-                        vtype = traci.vehicle.getTypeID(vid)
-                        if "bus" in vtype.lower():
-                            lane.has_bus = True
-                        if "ambulance" in vtype.lower() or "ambulance" in vid.lower():
-                            lane.has_emergency = True
-                    except:
-                        pass
-                
-            except traci.exceptions.TraCIException as e:
-                print(f"⚠️  TraCI error pour {lane.name}: {e}")
-                pass
-            except Exception as e:
-                print(f"⚠️  Erreur inattendue pour {lane.name}: {e}")
-                pass
+            measure = self._measure(lane)
+            if measure is not None:
+                (lane.num_vehicles, lane.wait_time, lane.congestion_level,
+                 lane.has_bus, lane.has_emergency) = measure
+            if lane.history is not None:
+                lane.history.record(lane)
             
             # Calcul du score
-            lane.calculate_score()
+            lane.calculate_score(self.weights)
+    
+    def _update_table(self):
+        """Variante LaneTable: mesures écrites par colonne, scores en une expression"""
+        rows = []
+        measures = []
+        for row, lane in enumerate(self.lanes):
+            measure = self._measure(lane)
+            if measure is not None:
+                rows.append(row)
+                measures.append(measure)
+        if rows:
+            self.table.assign(rows, *zip(*measures))
+        for lane in self.lanes:
+            if lane.history is not None:
+                lane.history.record(lane)
+        self._refresh_trend()
+        self.table.score_all(self.weights)
+    
+    def _refresh_trend(self):
+        if self.weights.trend:
+            self.table.trend[:] = [lane.queue_trend() for lane in self.lanes]
     
     def rebuild_priority_tree(self):
-        self.rbt.clear()
+        """Met à jour l'ARN de façon incrémentale (seules les voies dont le score a changé bougent)"""
+        if self.remote_tree:
+            return
+        if self.table is not None:
+            # Les lignes modifiées sont trouvées par comparaison vectorisée
+            scores = self.table.priority_score
+            for row in self.table.changed_rows().tolist():
+                lane = self.lanes[row]
+                node = self.lane_nodes.get(lane.sumo_edge_id)
+                if node is None:
+                    self.lane_nodes[lane.sumo_edge_id] = self.rbt.insert(float(scores[row]), lane)
+                else:
+                    self.rbt.update_key(node, float(scores[row]))
+            return
+        
         for lane in self.lanes:
-            self.rbt.insert(lane.priority_score, lane)
+            node = self.lane_nodes.get(lane.sumo_edge_id)
+            if node is None:
+                self.lane_nodes[lane.sumo_edge_id] = self.rbt.insert(lane.priority_score, lane)
+            else:
+                self.rbt.update_key(node, lane.priority_score)
     
     def get_next_green_light(self) -> Optional[Lane]:
         max_node = self.rbt.find_maximum()
         return max_node.lane if max_node else None
     
-    def display_status(self):
-        print("\n" + "="*75)
-        print(f"🚦 CYCLE #{self.cycle_count:03d} - Carrefour Intelligent (ARN)")
-        print("="*75)
-        
-        sorted_lanes = sorted(self.lanes, key=lambda x: x.priority_score, reverse=True)
-        
-        for i, lane in enumerate(sorted_lanes, 1):
-            status = "🟢 VERT " if lane == self.current_green else "🔴 ROUGE"
-            icons = ""
-            if lane.has_emergency:
-                icons += " 🚑"
-            if lane.has_bus:
-                icons += " 🚌"
-            
-            print(f"{i}. {status} | {lane.name:12s} ({lane.sumo_edge_id}){icons}")
-            print(f"   📊 Véhicules: {lane.num_vehicles:3d} | "
-                  f"Attente: {lane.wait_time:6.1f}s | "
-                  f"Congestion: {lane.congestion_level:2d}/10 | "
-                  f"Score: {lane.priority_score:6.1f}")
+    def get_top_lanes(self, k: int) -> List[Lane]:
+        """Les k voies les plus prioritaires, sans retrier toute la liste"""
+        return [node.lane for node in self.rbt.top_k(k)]
+    
+    def get_lane_rank(self, lane: Lane) -> Optional[int]:
+        node = self.lane_nodes.get(lane.sumo_edge_id)
+        return self.rbt.rank(node) if node is not None else None
+    
+    def detach_priority_tree(self):
+        """L'ARN est tenu par un processus de décision (arn_pipeline.DecisionPool "process").
         
-        if self.current_green:
-            print(f"\n✅ Voie prioritaire: {self.current_green.name}")
+        L'ARN local est vidé et n'est plus mis à jour: get_next_green_light et
+        get_lane_rank ne renvoient rien, display_status trie les voies.
+        """
+        self.remote_tree = True
+        self.rbt.clear()
+        self.lane_nodes.clear()
+        if self.table is not None:
+            # Toutes les lignes seront envoyées au premier cycle
+            self.table.committed_score[:] = np.nan
+    
+    def status_snapshot(self) -> Tuple[int, str, List[StatusRow], Optional[str]]:
+        """Copie des valeurs affichées: les voies peuvent changer avant la mise en forme"""
+        if len(self.rbt) == len(self.lanes):
+            sorted_lanes = self.get_top_lanes(len(self.lanes))
+        else:
+            sorted_lanes = sorted(self.lanes, key=lambda x: x.priority_score, reverse=True)
         
-        print("="*75)
+        rows = [
+            (i, lane == self.current_green, lane.name, lane.sumo_edge_id, lane.has_bus,
+             lane.has_emergency, lane.num_vehicles, lane.wait_time, lane.congestion_level,
+             lane.priority_score)
+            for i, lane in enumerate(sorted_lanes, 1)
+        ]
+        green_name = self.current_green.name if self.current_green else None
+        return self.cycle_count, self.tls_id, rows, green_name
     
-    def apply_green_to_sumo(self):
+    def display_status(self):
+        self._report(partial(format_status, *self.status_snapshot()))
+    
+    def apply_green_to_sumo(self, verbose: bool = True):
         """Applique la décision ARN aux feux SUMO"""
         if not self.current_green:
-            print("⚠️  Aucune voie prioritaire sélectionnée")
+            self._report("⚠️  Aucune voie prioritaire sélectionnée")
             return
         
         try:
-            # Méthode simplifiée: utiliser les phases prédéfinies
             target = self.current_green.sumo_edge_id
+            phases = self.green_phases.get(target)
             
-            if target in ["NtoC", "StoC"]:
-                # Nord-Sud vert
-                traci.trafficlight.setPhase(TLS_ID, 0)
-                phase_name = "Nord-Sud"
+            if phases:
+                # Table précalculée au démarrage
+                self.backend.trafficlight.setPhase(self.tls_id, phases[0])
+                phase_name = str(phases[0])
+            elif self.tls_id == TLS_ID and target in LEGACY_GREEN_PHASES:
+                # Méthode simplifiée (carrefour "center" sans table): phases prédéfinies
+                phase, phase_name = LEGACY_GREEN_PHASES[target]
+                self.backend.trafficlight.setPhase(self.tls_id, phase)
             else:
-                # Est-Ouest vert
-                traci.trafficlight.setPhase(TLS_ID, 2)
-                phase_name = "Est-Ouest"
+                # Aucune phase connue: deviner mettrait au vert d'autres tronçons
+                self._count_error("apply_no_phase")
+                if target not in self.unmapped_edges:
+                    self.unmapped_edges.add(target)
+                    self._report(f"⚠️  {self.tls_id}: pas de phase verte pour {target}, feux inchangés")
+                return
             
-            print(f"🚦 Feux appliqués: Phase {phase_name}")
+            if verbose:
+                self._report(f"🚦 Feux appliqués: Phase {phase_name}")
             
-        except traci.exceptions.TraCIException as e:
-            print(f"❌ Erreur TraCI lors de l'application des feux: {e}")
+        except self.backend.TraCIException as e:
+            self._count_error("apply_traci")
+            self._report(f"❌ Erreur TraCI lors de l'application des feux: {e}")
         except Exception as e:
-            print(f"❌ Erreur inattendue: {e}")
+            self._count_error("apply_unexpected")
+            self._report(f"❌ Erreur inattendue: {e}")
+    
+    def run_cycle(self, display: bool = True):
+        with _stage_timer(self.metrics, "update_traffic_data"):
+            self.update_traffic_data()
+        self.decide(display)
     
-    def run_cycle(self):
+    def decide(self, display: bool = True):
+        """Décision ARN à partir des données déjà acquises"""
+        self.choose_green()
+        self.apply_decision(display)
+    
+    def choose_green(self):
+        """Met à jour l'ARN et choisit la voie prioritaire (aucun appel TraCI)"""
+        with _stage_timer(self.metrics, "rebuild_priority_tree"):
+            self.rebuild_priority_tree()
+        with _stage_timer(self.metrics, "get_next_green_light"):
+            self.current_green = self.get_next_green_light()
+    
+    def apply_decision(self, display: bool = True):
+        """Envoie current_green à SUMO et affiche l'état du carrefour"""
+        metrics = self.metrics
         self.cycle_count += 1
-        self.update_traffic_data()
-        self.rebuild_priority_tree()
-        self.current_green = self.get_next_green_light()
-        self.apply_green_to_sumo()
-        self.display_status()
+        if self.emergency_hold is not None:
+            self.current_green = self.emergency_hold
+        with _stage_timer(metrics, "apply_green_to_sumo"):
+            self.apply_green_to_sumo(verbose=display)
+        if self.decision_log is not None:
+            self.decision_log.append(self)
+        if display:
+            with _stage_timer(metrics, "display_status"):
+                self.display_status()
+
+# =============== RÉSEAU MULTI-CARREFOURS ===============
+
+def _incoming_edge(lane_id: str) -> str:
+    """'NtoC_0' -> 'NtoC' (convention SUMO <edge>_<index>)"""
+    return lane_id.rsplit("_", 1)[0]
+
+def discover_junctions_from_traci(backend=None) -> Dict[str, List[str]]:
+    """Carrefours à feux -> tronçons entrants contrôlés, via TraCI (ordre des linkIndex)"""
+    trafficlight = (backend or traci).trafficlight
+    junctions = {}
+    for tls_id in trafficlight.getIDList():
+        edges: Dict[str, None] = {}
+        for links in trafficlight.getControlledLinks(tls_id):
+            for in_lane, _out_lane, _via in links:
+                edges.setdefault(_incoming_edge(in_lane), None)
+        junctions[tls_id] = list(edges)
+    return junctions
+
+def discover_junctions_from_net(net_file: str) -> Dict[str, List[str]]:
+    """Même résultat en lisant un *.net.xml en flux (pas de DOM complet en mémoire).
+    
+    Les <connection tl=... linkIndex=...> font foi; à défaut (réseau sans
+    linkIndex, comme mon_reseau_simple.net.xml) on prend les tronçons qui
+    arrivent sur la jonction du feu.
+    """
+    links: Dict[str, List] = {}
+    tls_ids: Dict[str, None] = {}
+    edges_to: Dict[str, List[str]] = {}
+    for _event, elem in ET.iterparse(net_file):
+        tag = elem.tag
+        if tag == "connection":
+            tl = elem.get("tl")
+            if tl and not elem.get("from", "").startswith(":"):
+                links.setdefault(tl, []).append((int(elem.get("linkIndex", 0)), elem.get("from")))
+        elif tag == "tlLogic":
+            tls_ids.setdefault(elem.get("id"), None)
+        elif tag == "junction" and elem.get("type") == "traffic_light":
+            tls_ids.setdefault(elem.get("id"), None)
+        elif tag == "edge" and elem.get("function") != "internal" and not elem.get("id", "").startswith(":"):
+            edges_to.setdefault(elem.get("to"), []).append(elem.get("id"))
+        else:
+            continue
+        elem.clear()
+    
+    junctions = {}
+    for tls_id in tls_ids:
+        if tls_id in links:
+            edges = dict.fromkeys(edge for _index, edge in sorted(links[tls_id]))
+            junctions[tls_id] = list(edges)
+        else:
+            junctions[tls_id] = edges_to.get(tls_id, [])
+    return junctions
+
+def _green_phases(states: List[str], link_edges: Dict[int, str]) -> Dict[str, List[int]]:
+    """Tronçon -> indices des phases où au moins un de ses liens est vert.
+    
+    Les phases donnant le vert au plus grand nombre de liens du tronçon
+    viennent en premier (à égalité, l'ordre du programme).
+    """
+    candidates: Dict[str, List[Tuple[int, int]]] = {}
+    for phase_index, state in enumerate(states):
+        green_links: Dict[str, int] = {}
+        for link_index, edge in link_edges.items():
+            if link_index < len(state) and state[link_index] in "Gg":
+                green_links[edge] = green_links.get(edge, 0) + 1
+        for edge, count in green_links.items():
+            candidates.setdefault(edge, []).append((-count, phase_index))
+    return {
+        edge: [phase_index for _count, phase_index in sorted(phases)]
+        for edge, phases in candidates.items()
+    }
+
+def build_phase_table_from_net(net_file: str) -> Dict[str, Dict[str, List[int]]]:
+    """tls_id -> {tronçon: phases vertes}, depuis les états <tlLogic> et les <connection linkIndex>"""
+    link_edges: Dict[str, Dict[int, str]] = {}
+    states: Dict[str, List[str]] = {}
+    for _event, elem in ET.iterparse(net_file):
+        if elem.tag == "connection":
+            tl = elem.get("tl")
+            if tl and elem.get("linkIndex") is not None:
+                link_edges.setdefault(tl, {})[int(elem.get("linkIndex"))] = elem.get("from")
+        elif elem.tag == "tlLogic":
+            # Premier programme rencontré = programme chargé par défaut
+            if elem.get("id") not in states:
+                states[elem.get("id")] = [phase.get("state") for phase in elem.iter("phase")]
+        else:
+            continue
+        elem.clear()
+    return {
+        tls_id: _green_phases(states[tls_id], links)
+        for tls_id, links in link_edges.items() if tls_id in states
+    }
+
+def build_phase_table_from_traci(backend=None) -> Dict[str, Dict[str, List[int]]]:
+    """Même table via TraCI (programme courant), à appeler une seule fois au démarrage"""
+    trafficlight = (backend or traci).trafficlight
+    table = {}
+    for tls_id in trafficlight.getIDList():
+        link_edges = {}
+        for link_index, links in enumerate(trafficlight.getControlledLinks(tls_id)):
+            if links:
+                link_edges[link_index] = _incoming_edge(links[0][0])
+        program = trafficlight.getProgram(tls_id)
+        logics = trafficlight.getAllProgramLogics(tls_id)
+        logic = next((l for l in logics if l.programID == program), logics[0] if logics else None)
+        if logic is not None:
+            table[tls_id] = _green_phases([phase.state for phase in logic.phases], link_edges)
+    return table
+
+class NetworkController:
+    """Pilote tous les carrefours à feux d'un réseau depuis un seul processus.
+    
+    Un TrafficLightSystem par carrefour; l'acquisition est faite en une passe
+    commune pour tous les carrefours (cache des classes de véhicules partagé)
+    avant les décisions.
+    """
+    def __init__(self, junctions: Dict[str, List[str]], compact_tree: bool = False,
+                 phase_table: Optional[Dict[str, Dict[str, List[int]]]] = None,
+                 weights: ScoreWeights = DEFAULT_WEIGHTS, vectorized: bool = False,
+                 backend=None, history_size: int = HISTORY_CYCLES):
+        phase_table = phase_table or {}
+        self.backend = backend or traci
+        self.vehicle_classes = VehicleClassCache(self.backend)
+        self.systems: Dict[str, TrafficLightSystem] = {}
+        for tls_id, edges in junctions.items():
+            if not edges:
+                continue
+            lanes = [Lane(name=edge, sumo_edge_id=edge) for edge in edges]
+            self.systems[tls_id] = TrafficLightSystem(
+                lanes, compact_tree, self.vehicle_classes, tls_id=tls_id,
+                green_phases=phase_table.get(tls_id), weights=weights,
+                vectorized=vectorized, backend=self.backend, history_size=history_size,
+            )
+        # Les évictions ne sont faites qu'une fois par pas, sur ce cache: tous les carrefours doivent le voir
+        if any(system.vehicle_classes is not self.vehicle_classes for system in self.systems.values()):
+            raise RuntimeError("NetworkController: cache des classes de véhicules non partagé")
+        self.cycle_count = 0
+        self.step = 0
+        self.metrics = None
+        # Choix des voies prioritaires sur un pool (arn_pipeline.DecisionPool)
+        self.decision_pool = None
+        self.decision_log = None
+    
+    @classmethod
+    def from_traci(cls, backend=None, **kwargs) -> "NetworkController":
+        return cls(discover_junctions_from_traci(backend),
+                   phase_table=build_phase_table_from_traci(backend), backend=backend, **kwargs)
+    
+    @classmethod
+    def from_net_file(cls, net_file: str, **kwargs) -> "NetworkController":
+        return cls(discover_junctions_from_net(net_file),
+                   phase_table=build_phase_table_from_net(net_file), **kwargs)
+    
+    @property
+    def lanes(self) -> List[Lane]:
+        return [lane for system in self.systems.values() for lane in system.lanes]
+    
+    def subscribe(self):
+        for system in self.systems.values():
+            system.subscribe()
+    
+    def instrument(self, metrics):
+        self.metrics = metrics
+        for system in self.systems.values():
+            system.instrument(metrics)
+    
+    def set_reporter(self, reporter):
+        for system in self.systems.values():
+            system.set_reporter(reporter)
+    
+    def set_decision_log(self, decision_log):
+        self.decision_log = decision_log
+        for system in self.systems.values():
+            system.set_decision_log(decision_log)
+    
+    def update_traffic_data(self):
+        for system in self.systems.values():
+            system.update_traffic_data()
+    
+    def run_cycle(self, display: bool = True):
+        self.cycle_count += 1
+        with _stage_timer(self.metrics, "update_traffic_data"):
+            self.update_traffic_data()
+        if self.decision_pool is None:
+            for system in self.systems.values():
+                system.decide(display)
+            return
+        # Choix en parallèle par groupes de carrefours, puis envoi à SUMO dans l'ordre
+        with _stage_timer(self.metrics, "decision_pool"):
+            self.decision_pool.choose(self.systems)
+        for system in self.systems.values():
+            system.apply_decision(display)
+
+# =============== PRÉEMPTION URGENCE ===============
+
+class EmergencyWatcher:
+    """Donne le vert, dans le pas même, à un véhicule d'urgence qui entre sur un tronçon contrôlé.
+    
+    Sans attendre le prochain cycle (SIM_STEPS_PER_CYCLE pas): les départs du
+    pas sont classés par le cache partagé (getTypeID une fois par véhicule),
+    puis seuls les véhicules d'urgence en circulation sont suivis (getRoadID).
+    Un carrefour reste réservé (emergency_hold) au premier véhicule d'urgence
+    arrivé tant qu'il est sur son tronçon d'approche: les cycles ARN gardent
+    alors le vert sur sa voie. Quand il le libère, un autre véhicule d'urgence
+    déjà sur une approche de ce carrefour le réserve aussitôt.
+    """
+    def __init__(self, system):
+        systems = getattr(system, "systems", None) or {system.tls_id: system}
+        self.systems: Dict[str, TrafficLightSystem] = systems
+        self.backend = system.backend
+        self.vehicle_classes = system.vehicle_classes
+        self.edge_systems: Dict[str, TrafficLightSystem] = {
+            lane.sumo_edge_id: tls for tls in systems.values() for lane in tls.lanes
+        }
+        # Véhicule d'urgence -> dernier tronçon vu
+        self.active: Dict[str, str] = {}
+        # Carrefour -> véhicule d'urgence qui le réserve (voie: system.emergency_hold)
+        self.holds: Dict[str, str] = {}
+        self.preemptions = 0
+    
+    def step(self, arrived: List[str] = ()):
+        """À appeler après chaque simulationStep (et evict_arrived, dont arrived est le résultat)"""
+        released = False
+        for vid in arrived:
+            if self.active.pop(vid, None) is not None:
+                released |= self._release(vid)
+        for vid in self.vehicle_classes.departed():
+            try:
+                if self.vehicle_classes.get(vid) is VehicleClass.EMERGENCY:
+                    self.active[vid] = ""
+            except self.backend.TraCIException:
+                pass
+        if not self.active:
+            return
+        
+        for vid, last_edge in list(self.active.items()):
+            try:
+                edge_id = self.backend.vehicle.getRoadID(vid)
+            except self.backend.TraCIException:
+                # Véhicule disparu (téléporté, retiré...)
+                del self.active[vid]
+                released |= self._release(vid)
+                continue
+            if edge_id == last_edge:
+                continue
+            self.active[vid] = edge_id
+            released |= self._release(vid)
+            system = self.edge_systems.get(edge_id)
+            if system is not None:
+                self._preempt(system, vid, system.edge_to_lane[edge_id])
+        
+        if released:
+            # Un carrefour libéré passe au véhicule d'urgence suivant déjà sur l'une de ses approches
+            for vid, edge_id in self.active.items():
+                system = self.edge_systems.get(edge_id)
+                if system is not None and system.tls_id not in self.holds:
+                    self._preempt(system, vid, system.edge_to_lane[edge_id])
+    
+    def scan(self):
+        """Suit les véhicules d'urgence déjà présents (après un loadState: pas de 'departed')"""
+        for vid in self.backend.vehicle.getIDList():
+            if self.vehicle_classes.get(vid) is VehicleClass.EMERGENCY:
+                self.active.setdefault(vid, "")
+    
+    def _release(self, vid: str) -> bool:
+        """Libère les carrefours réservés par vid; True si au moins un l'était"""
+        released = False
+        for tls_id, holder in list(self.holds.items()):
+            if holder == vid:
+                del self.holds[tls_id]
+                self.systems[tls_id].emergency_hold = None
+                released = True
+        return released
+    
+    def _preempt(self, system: TrafficLightSystem, vid: str, lane: Lane):
+        if system.tls_id in self.holds:
+            return
+        self.holds[system.tls_id] = vid
+        system.emergency_hold = lane
+        lane.has_emergency = True
+        if system.current_green is not lane:
+            system.current_green = lane
+            system.apply_green_to_sumo(verbose=False)
+            if system.decision_log is not None:
+                system.decision_log.append(system, preemption=True)
+            self.preemptions += 1
+            system._report(f"🚑 Préemption [{system.tls_id}]: {vid} sur {lane.sumo_edge_id}")
+
+# =============== ORDONNANCEUR ADAPTATIF ===============
+
+class _JunctionSchedule:
+    def __init__(self):
+        self.last_step = 0
+        self.last_queue = 0
+        self.last_score = 0.0
+        self.green: Optional[Lane] = None
+        self.green_since = 0
+
+class DecisionScheduler:
+    """Choisit, carrefour par carrefour, le pas de la prochaine décision.
+    
+    Un tas (pas dû, carrefour) remplace l'intervalle fixe SIM_STEPS_PER_CYCLE:
+    un carrefour vide n'est relu que tous les idle_steps pas, un carrefour dont
+    la file grossit ou dont les scores bougent vite est relu plus souvent
+    (jamais moins de min_interval pas). Le vert dure au moins min_green pas et
+    passe à une autre voie qui attend après max_green pas.
+    
+    Seuls les carrefours dus sont mesurés. Avec les abonnements, SUMO renvoie
+    pourtant les tronçons abonnés à chaque pas: un carrefour trouvé vide est
+    désabonné (unsubscribe_idle) et interrogé directement à sa prochaine
+    décision, puis réabonné dès que des véhicules y arrivent.
+    """
+    def __init__(self, system, base_interval: int = SIM_STEPS_PER_CYCLE,
+                 min_green: int = MIN_GREEN_STEPS, max_green: int = MAX_GREEN_STEPS,
+                 min_interval: int = MIN_DECISION_STEPS, idle_steps: int = IDLE_DECISION_STEPS,
+                 score_scale: float = 10.0, unsubscribe_idle: bool = True):
+        self.controller = system
+        self.systems: Dict[str, TrafficLightSystem] = (
+            getattr(system, "systems", None) or {system.tls_id: system}
+        )
+        self.base_interval = base_interval
+        self.min_green = min_green
+        self.max_green = max_green
+        self.min_interval = min_interval
+        self.idle_steps = idle_steps
+        # Variation de score (points/pas) qui divise l'intervalle de base par deux
+        self.score_scale = score_scale
+        self.unsubscribe_idle = unsubscribe_idle
+        # Carrefours vides désabonnés par l'ordonnanceur (réabonnés quand leur file se forme)
+        self.idle: Set[str] = set()
+        self.decisions = 0
+        self.restart(0)
+    
+    def restart(self, step: int):
+        """Tous les carrefours dus au pas suivant, vert courant considéré comme posé à step.
+        
+        Sert au premier passage et à la reprise d'un point sauvé sans état d'ordonnanceur.
+        """
+        self.state = {tls_id: _JunctionSchedule() for tls_id in self.systems}
+        for tls_id, state in self.state.items():
+            state.last_step = state.green_since = step
+            state.green = self.systems[tls_id].current_green
+        self.heap: List[Tuple[int, str]] = [(step + 1, tls_id) for tls_id in self.systems]
+        heapq.heapify(self.heap)
+    
+    def state_dict(self) -> Dict[str, object]:
+        """Échéances et état de chaque carrefour (voir save_checkpoint)"""
+        return {
+            "decisions": self.decisions,
+            "heap": [[due, tls_id] for due, tls_id in self.heap],
+            "junctions": {
+                tls_id: {
+                    "last_step": state.last_step, "last_queue": state.last_queue,
+                    "last_score": state.last_score, "green_since": state.green_since,
+                    "green": state.green.sumo_edge_id if state.green is not None else None,
+                }
+                for tls_id, state in self.state.items()
+            },
+        }
+    
+    def load_state_dict(self, state: Dict[str, object], step: int):
+        """Restaure les échéances; les carrefours absents du point de reprise repartent à step"""
+        self.restart(step)
+        self.decisions = state["decisions"]
+        for tls_id, saved in state["junctions"].items():
+            junction = self.state.get(tls_id)
+            if junction is None:
+                continue
+            junction.last_step = saved["last_step"]
+            junction.last_queue = saved["last_queue"]
+            junction.last_score = saved["last_score"]
+            junction.green_since = saved["green_since"]
+            junction.green = self.systems[tls_id].edge_to_lane.get(saved["green"])
+        saved_due = {tls_id: due for due, tls_id in state["heap"]}
+        self.heap = [(saved_due.get(tls_id, step + 1), tls_id) for tls_id in self.systems]
+        heapq.heapify(self.heap)
+    
+    def tick(self, step: int, display_every: int = 0) -> int:
+        """Décide pour les carrefours dus à ce pas; renvoie leur nombre"""
+        decided = 0
+        while self.heap and self.heap[0][0] <= step:
+            _due, tls_id = heapq.heappop(self.heap)
+            system = self.systems[tls_id]
+            display = display_every > 0 and (system.cycle_count + 1) % display_every == 0
+            next_due = self._decide(system, self.state[tls_id], step, display)
+            heapq.heappush(self.heap, (next_due, tls_id))
+            decided += 1
+        if decided:
+            self.decisions += decided
+            if not isinstance(self.controller, TrafficLightSystem):
+                self.controller.cycle_count += 1
+        return decided
+    
+    def _decide(self, system: TrafficLightSystem, state: _JunctionSchedule,
+                step: int, display: bool) -> int:
+        with _stage_timer(system.metrics, "update_traffic_data"):
+            system.update_traffic_data()
+        system.choose_green()
+        
+        if system.current_green is not state.green and state.green is not None:
+            if step - state.green_since < self.min_green:
+                # Vert minimal pas encore écoulé
+                system.current_green = state.green
+        elif state.green is not None and step - state.green_since >= self.max_green:
+            # Vert maximal atteint: la meilleure autre voie qui attend prend la main
+            waiting = [lane for lane in system.get_top_lanes(2)
+                       if lane is not state.green and lane.num_vehicles > 0]
+            if waiting:
+                system.current_green = waiting[0]
+        system.apply_decision(display)
+        
+        if system.current_green is not state.green:
+            state.green = system.current_green
+            state.green_since = step
+        
+        lanes = system.lanes
+        queue = sum(lane.num_vehicles for lane in lanes)
+        score = state.green.priority_score if state.green is not None else 0.0
+        elapsed = max(1, step - state.last_step)
+        growth = (queue - state.last_queue) / elapsed
+        score_delta = abs(score - state.last_score) / elapsed
+        state.last_step, state.last_queue, state.last_score = step, queue, score
+        
+        if queue == 0 and self.unsubscribe_idle and system.use_subscriptions:
+            system.unsubscribe()
+            self.idle.add(system.tls_id)
+        elif queue and system.tls_id in self.idle:
+            system.subscribe()
+            self.idle.discard(system.tls_id)
+        
+        if queue == 0:
+            interval = self.idle_steps
+        else:
+            # Plus la file grossit ou les scores bougent vite, plus la décision suivante est proche
+            activity = max(growth, 0.0) + score_delta / self.score_scale
+            interval = self.base_interval / (1.0 + activity)
+        lower = self.min_green if state.green_since == step else self.min_interval
+        interval = int(min(max(interval, lower), max(self.idle_steps, self.max_green)))
+        next_due = step + interval
+        if queue:
+            # Pas de décision manquée au moment où le vert maximal expire
+            next_due = min(next_due, max(step + lower, state.green_since + self.max_green))
+        return next_due
+
+# =============== POINTS DE REPRISE ===============
+
+CHECKPOINT_VERSION = 1
+
+def _checkpoint_paths(prefix: str) -> Tuple[str, str]:
+    """(état SUMO, état du contrôleur)"""
+    return prefix + ".state.xml", prefix + ".json"
+
+def save_checkpoint(system, prefix: str, scheduler: Optional[DecisionScheduler] = None):
+    """Sauve l'état SUMO (simulation.saveState) et celui du contrôleur (JSON)"""
+    sumo_state, controller_state = _checkpoint_paths(prefix)
+    backend = system.backend
+    backend.simulation.saveState(sumo_state)
+    systems = getattr(system, "systems", None) or {system.tls_id: system}
+    state = {
+        "version": CHECKPOINT_VERSION,
+        "time": backend.simulation.getTime(),
+        "cycle_count": system.cycle_count,
+        "junctions": {tls_id: tls.state_dict() for tls_id, tls in systems.items()},
+        # Évite de redemander le type des véhicules déjà classés
+        "vehicle_classes": {
+            vid: vclass.name for vid, vclass in system.vehicle_classes.classes.items()
+        },
+    }
+    if scheduler is not None:
+        state["scheduler"] = scheduler.state_dict()
+    with open(controller_state, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+def load_checkpoint(system, prefix: str, scheduler: Optional[DecisionScheduler] = None) -> float:
+    """Recharge un point de reprise dans une simulation déjà démarrée; renvoie son temps SUMO.
+    
+    Les poids du score peuvent différer de ceux du run sauvegardé: les scores
+    sont recalculés avec ceux du système (balayages partant d'un même état).
+    system.step reprend au pas sauvé; scheduler reprend ses échéances, ou
+    repart du pas sauvé si le point a été pris sans --adaptive.
+    """
+    sumo_state, controller_state = _checkpoint_paths(prefix)
+    with open(controller_state, encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"{controller_state}: version de point de reprise non supportée")
+    system.backend.simulation.loadState(sumo_state)
+    
+    systems = getattr(system, "systems", None) or {system.tls_id: system}
+    for tls_id, junction_state in state["junctions"].items():
+        if tls_id in systems:
+            systems[tls_id].load_state_dict(junction_state)
+    system.cycle_count = state["cycle_count"]
+    # Le compteur de pas reprend au temps SUMO restauré
+    simulation = system.backend.simulation
+    system.step = int(round(simulation.getTime() / simulation.getDeltaT()))
+    system.vehicle_classes.classes.update(
+        (vid, VehicleClass[name]) for vid, name in state["vehicle_classes"].items()
+    )
+    if scheduler is not None:
+        if "scheduler" in state:
+            scheduler.load_state_dict(state["scheduler"], system.step)
+        else:
+            scheduler.restart(system.step)
+    return state["time"]
 
 # =============== MAIN ===============
 
+def load_backend(name: str = SUMO_BACKEND):
+    """Module de contrôle de SUMO: traci (socket, GUI possible) ou libsumo (même interface,
+    SUMO chargé dans le processus). None si le module n'est pas installé."""
+    if name == "traci":
+        return traci
+    if name != "libsumo":
+        raise ValueError(f"backend inconnu: {name}")
+    try:
+        import libsumo
+    except ImportError:
+        return None
+    return libsumo
+
 def check_files():
     """Vérifie que les fichiers nécessaires existent"""
     import os
@@ -300,58 +2005,294 @@ def check_files():
         return False
     return True
 
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Système de gestion intelligent des feux (ARN + SUMO)"
+    )
+    parser.add_argument("-c", "--config", default=SUMO_CONFIG,
+                        help=f"Configuration SUMO (défaut: {SUMO_CONFIG})")
+    parser.add_argument("--nogui", action="store_true",
+                        help=f"Lance '{SUMO_BINARY_NOGUI}' au lieu de '{SUMO_BINARY}'")
+    parser.add_argument("--backend", choices=["traci", "libsumo"], default=SUMO_BACKEND,
+                        help="traci (défaut, socket, GUI possible) ou libsumo (SUMO dans le "
+                             "processus, sans GUI: implique --nogui)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Mode batch: sans GUI, sans pause, seulement les statistiques finales")
+    parser.add_argument("--realtime", type=float, metavar="FACTEUR",
+                        help="Cadence la simulation sur l'horloge (1.0 = temps réel, 2.0 = 2x plus vite)")
+    parser.add_argument("--delay", type=float, metavar="SECONDES",
+                        help=f"Pause après chaque cycle (défaut: {CYCLE_DELAY}s, 0 en mode batch)")
+    parser.add_argument("--display-every", type=int, metavar="N",
+                        help="Affiche l'état tous les N cycles (0 = jamais; défaut: 1, 0 en mode batch)")
+    parser.add_argument("--steps", type=int, default=MAX_STEPS,
+                        help=f"Dernier pas de simulation, compté depuis t=0 même après "
+                             f"--load-state (défaut: {MAX_STEPS})")
+    parser.add_argument("--cycle-steps", type=int, default=SIM_STEPS_PER_CYCLE,
+                        help=f"Pas de simulation par cycle de décision (défaut: {SIM_STEPS_PER_CYCLE})")
+    parser.add_argument("--auto-discover", action="store_true", default=AUTO_DISCOVER,
+                        help="Pilote tous les carrefours à feux du réseau")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="Scores calculés en bloc dans une LaneTable NumPy")
+    parser.add_argument("--history", type=int, default=HISTORY_CYCLES, metavar="CYCLES",
+                        help="Fenêtre de l'historique des métriques par voie "
+                             f"(défaut: {HISTORY_CYCLES}, 0 = sans historique)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Décisions à intervalle adaptatif par carrefour au lieu de --cycle-steps")
+    parser.add_argument("--min-green", type=int, default=MIN_GREEN_STEPS, metavar="PAS",
+                        help=f"Vert minimal en mode --adaptive (défaut: {MIN_GREEN_STEPS})")
+    parser.add_argument("--max-green", type=int, default=MAX_GREEN_STEPS, metavar="PAS",
+                        help=f"Vert maximal en mode --adaptive (défaut: {MAX_GREEN_STEPS})")
+    parser.add_argument("--idle-steps", type=int, default=IDLE_DECISION_STEPS, metavar="PAS",
+                        help=f"Intervalle d'un carrefour vide (défaut: {IDLE_DECISION_STEPS})")
+    parser.add_argument("--no-preemption", dest="preemption", action="store_false",
+                        default=EMERGENCY_PREEMPTION,
+                        help="Désactive le vert immédiat pour les véhicules d'urgence")
+    parser.add_argument("--no-subscriptions", dest="subscriptions", action="store_false",
+                        default=USE_SUBSCRIPTIONS,
+                        help="Interroge TraCI voie par voie au lieu des subscriptions")
+    monitoring = parser.add_argument_group("instrumentation")
+    monitoring.add_argument("--metrics", metavar="FICHIER",
+                            help="Exporte les métriques du cycle (JSON lines, ou Prometheus si .prom)")
+    monitoring.add_argument("--metrics-format", choices=["jsonl", "prometheus"],
+                            help="Format d'export (défaut: selon l'extension de --metrics)")
+    monitoring.add_argument("--metrics-every", type=float, default=10.0, metavar="SECONDES",
+                            help="Intervalle d'export des métriques (défaut: 10s)")
+    monitoring.add_argument("--decision-log", metavar="FICHIER",
+                            help="Journal binaire des décisions (lecture: python arn_decisionlog.py FICHIER)")
+    checkpoint = parser.add_argument_group("points de reprise (SUMO saveState/loadState)")
+    checkpoint.add_argument("--save-state", metavar="PREFIXE",
+                            help="Sauve PREFIXE.state.xml (SUMO) et PREFIXE.json (contrôleur)")
+    checkpoint.add_argument("--save-at", type=int, default=600, metavar="PAS",
+                            help="Pas du point de reprise (défaut: 600)")
+    checkpoint.add_argument("--load-state", metavar="PREFIXE",
+                            help="Démarre depuis un point de reprise (réseau déjà rempli)")
+    pipeline = parser.add_argument_group("pipeline")
+    pipeline.add_argument("--pipeline", action="store_true",
+                          help="Affichage et exports sur un thread dédié (file bornée, sans attente)")
+    pipeline.add_argument("--report-queue", type=int, default=256, metavar="N",
+                          help="Taille de la file d'affichage (messages abandonnés au-delà)")
+    pipeline.add_argument("--decision-workers", type=int, default=0, metavar="N",
+                          help="Choix des voies sur N groupes de carrefours en parallèle "
+                               "(avec --auto-discover, sans --adaptive)")
+    pipeline.add_argument("--decision-pool", choices=["thread", "process"], default="process",
+                          help="Pool des décisions (défaut: process; thread: sans parallélisme "
+                               "réel à cause du GIL)")
+    multiclient = parser.add_argument_group("multi-clients (SUMO --num-clients)")
+    multiclient.add_argument("--num-clients", type=int, default=1, metavar="N",
+                             help="N processus TraCI sur la même simulation, chacun pilotant "
+                                  "un groupe de carrefours équilibré en voies (implique --auto-discover)")
+    replay = parser.add_argument_group("rejeu hors ligne (sans SUMO)")
+    replay.add_argument("--replay", metavar="EDGE_DATA",
+                        help="Rejoue une sortie edgeData enregistrée au lieu de lancer SUMO")
+    replay.add_argument("--replay-tripinfo", metavar="FICHIER",
+                        help="tripinfo.xml du run enregistré (IDs et types des véhicules)")
+    replay.add_argument("--replay-detectors", metavar="FICHIER",
+                        help="Sortie des boucles de détection (detectors.out)")
+    replay.add_argument("--net", default="mon_reseau.net.xml",
+                        help="Réseau utilisé pour les phases et --auto-discover en rejeu")
+    replay.add_argument("--step-length", type=float, default=1.0,
+                        help="Durée d'un pas rejoué en secondes (défaut: 1.0)")
+    replay.add_argument("--record", metavar="FICHIER",
+                        help="Enregistre les décisions de phase (CSV) à la fin du rejeu")
+    args = parser.parse_args(argv)
+    
+    if args.replay:
+        # Rejeu: pas d'affichage ni de pause par défaut, pas de subscriptions TraCI
+        args.batch = True
+        args.subscriptions = False
+    if args.batch or args.backend == "libsumo":
+        args.nogui = True
+    if args.delay is None:
+        args.delay = 0.0 if args.batch or args.realtime else CYCLE_DELAY
+    if args.display_every is None:
+        args.display_every = 0 if args.batch else 1
+    if args.history < 0:
+        parser.error("--history doit être positif ou nul (0 = sans historique)")
+    if args.replay and (args.save_state or args.load_state):
+        parser.error("les points de reprise nécessitent SUMO (incompatibles avec --replay)")
+    if args.decision_workers:
+        if args.adaptive:
+            parser.error("--decision-workers ne s'applique pas à --adaptive "
+                         "(l'ordonnanceur décide carrefour par carrefour, sans pool)")
+        args.pipeline = True
+    if args.num_clients > 1:
+        if args.replay or args.save_state or args.load_state:
+            parser.error("--num-clients nécessite SUMO et n'accepte pas les points de reprise")
+        if args.pipeline:
+            parser.error("--num-clients répartit déjà les carrefours entre processus (sans --pipeline)")
+        if args.backend == "libsumo":
+            parser.error("--num-clients nécessite des connexions TraCI (--backend traci)")
+        args.auto_discover = True
+    if args.metrics and args.metrics_format is None:
+        args.metrics_format = "prometheus" if args.metrics.endswith(".prom") else "jsonl"
+    return args
+
+def run_simulation(system, max_steps: int = MAX_STEPS,
+                   cycle_steps: int = SIM_STEPS_PER_CYCLE, delay: float = 0.0,
+                   display_every: int = 1, realtime: Optional[float] = None,
+                   watcher: Optional[EmergencyWatcher] = None, start_step: int = 0) -> int:
+    """Boucle principale: cycle_steps pas SUMO puis un cycle de décision ARN.
+    
+    realtime cale le temps simulé sur l'horloge murale (facteur d'accélération),
+    delay ajoute une pause fixe après chaque cycle. watcher (EmergencyWatcher)
+    est consulté à chaque pas. start_step reprend le compte d'un appel
+    précédent. Renvoie le nombre de pas joués, aussi tenu à jour dans
+    system.step (valable si la boucle est interrompue).
+    """
+    backend = system.backend
+    metrics = system.metrics
+    decision_log = system.decision_log
+    step_length = backend.simulation.getDeltaT() if realtime else 0.0
+    wall_start = time.perf_counter()
+    step = start_step
+    
+    while backend.simulation.getMinExpectedNumber() > 0 and step < max_steps:
+        # Avance la simulation SUMO
+        with _stage_timer(metrics, "simulation_steps"):
+            for _ in range(cycle_steps):
+                backend.simulationStep()
+                step += 1
+                system.step = step
+                if decision_log is not None:
+                    decision_log.step = step
+                arrived = system.vehicle_classes.evict_arrived()
+                if watcher is not None:
+                    watcher.step(arrived)
+        
+        # Exécute un cycle de décision ARN
+        display = display_every > 0 and (system.cycle_count + 1) % display_every == 0
+        with _stage_timer(metrics, "cycle"):
+            system.run_cycle(display=display)
+        if metrics is not None:
+            metrics.add_steps(cycle_steps)
+            metrics.end_cycle()
+        
+        if realtime:
+            ahead = (step - start_step) * step_length / realtime - (time.perf_counter() - wall_start)
+            if ahead > 0:
+                time.sleep(ahead)
+        if delay > 0:
+            # Pause pour observer
+            time.sleep(delay)
+    
+    return step
+
+def run_scheduled(system, scheduler: DecisionScheduler, max_steps: int = MAX_STEPS,
+                  display_every: int = 1, realtime: Optional[float] = None,
+                  watcher: Optional[EmergencyWatcher] = None, start_step: int = 0) -> int:
+    """Variante de run_simulation pilotée par DecisionScheduler (décisions à la demande)"""
+    backend = system.backend
+    metrics = system.metrics
+    decision_log = system.decision_log
+    step_length = backend.simulation.getDeltaT() if realtime else 0.0
+    wall_start = time.perf_counter()
+    step = start_step
+    
+    while backend.simulation.getMinExpectedNumber() > 0 and step < max_steps:
+        with _stage_timer(metrics, "simulation_steps"):
+            backend.simulationStep()
+            step += 1
+            system.step = step
+            if decision_log is not None:
+                decision_log.step = step
+            arrived = system.vehicle_classes.evict_arrived()
+            if watcher is not None:
+                watcher.step(arrived)
+        
+        with _stage_timer(metrics, "cycle"):
+            decided = scheduler.tick(step, display_every)
+        if metrics is not None:
+            metrics.add_steps(1)
+            if decided:
+                metrics.end_cycle()
+        
+        if realtime:
+            ahead = (step - start_step) * step_length / realtime - (time.perf_counter() - wall_start)
+            if ahead > 0:
+                time.sleep(ahead)
+    
+    return step
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    
     print("\n" + "="*75)
     print("🚀 SYSTÈME DE GESTION INTELLIGENT DES FEUX (ARN + SUMO)")
     print("="*75 + "\n")
     
-    # Vérifications préliminaires
-    if not check_files():
-        sys.exit(1)
+    if args.num_clients > 1:
+        from arn_multiclient import run_multiclient
+        run_multiclient(args)
+        return
     
-    # Création des voies
-    lanes = [
-        Lane(name="Voie Nord",  sumo_edge_id="NtoC"),
-        Lane(name="Voie Sud",   sumo_edge_id="StoC"),
-        Lane(name="Voie Est",   sumo_edge_id="EtoC"),
-        Lane(name="Voie Ouest", sumo_edge_id="WtoC"),
-    ]
+    if args.replay:
+        system, backend = start_replay(args)
+    else:
+        system, backend = start_sumo(args)
     
-    system = TrafficLightSystem(lanes)
+    metrics = None
+    if args.metrics:
+        from arn_metrics import Metrics
+        metrics = Metrics(system.backend, args.metrics, args.metrics_format, args.metrics_every)
+        system.instrument(metrics)
     
-    # Démarrage SUMO
-    print("🔄 Connexion à SUMO...")
-    try:
-        sumo_cmd = [SUMO_BINARY, "-c", SUMO_CONFIG, "--start", "--quit-on-end"]
-        traci.start(sumo_cmd)
-        print("✅ SUMO connecté avec succès!\n")
-    except Exception as e:
-        print(f"❌ Impossible de démarrer SUMO: {e}")
-        print("\n💡 Vérifications:")
-        print("   1. SUMO est installé? → sumo --version")
-        print("   2. sumo-gui est dans le PATH?")
-        print("   3. Change SUMO_BINARY en 'sumo' si pas de GUI")
-        sys.exit(1)
+    reporter = decision_pool = None
+    if args.pipeline:
+        from arn_pipeline import DecisionPool, Reporter
+        reporter = Reporter(args.report_queue)
+        system.set_reporter(reporter)
+        if metrics is not None:
+            metrics.reporter = reporter
+        if args.decision_workers and isinstance(system, NetworkController):
+            decision_pool = DecisionPool(system.systems, args.decision_workers, args.decision_pool)
+            system.decision_pool = decision_pool
+            print(f"🧵 Décisions sur {len(decision_pool.groups)} groupe(s) "
+                  f"({args.decision_pool})\n")
+    
+    scheduler = None
+    if args.adaptive:
+        scheduler = DecisionScheduler(
+            system, base_interval=args.cycle_steps, min_green=args.min_green,
+            max_green=args.max_green, idle_steps=args.idle_steps,
+        )
+    if args.load_state:
+        sim_time = load_checkpoint(system, args.load_state, scheduler)
+        print(f"♻️  Reprise depuis {args.load_state} (t={sim_time:.0f}s, pas {system.step})\n")
+    # Les pas (--steps, --save-at, journal) comptent depuis le début de la simulation
+    start_step = system.step
+    watcher = EmergencyWatcher(system) if args.preemption else None
+    if watcher is not None and args.load_state:
+        watcher.scan()
+    decision_log = None
+    if args.decision_log:
+        from arn_decisionlog import DecisionLogWriter
+        decision_log = DecisionLogWriter(args.decision_log, system)
+        system.set_decision_log(decision_log)
     
     # Boucle principale
     print("🎬 Simulation démarrée...\n")
     
+    def run(max_steps: int) -> int:
+        if scheduler is not None:
+            return run_scheduled(
+                system, scheduler, max_steps=max_steps, display_every=args.display_every,
+                realtime=args.realtime, watcher=watcher, start_step=system.step,
+            )
+        return run_simulation(
+            system, max_steps=max_steps, cycle_steps=args.cycle_steps,
+            delay=args.delay, display_every=args.display_every, realtime=args.realtime,
+            watcher=watcher, start_step=system.step,
+        )
+    
+    wall_start = time.perf_counter()
     try:
-        step = 0
-        max_steps = 3600
-        
-        while traci.simulation.getMinExpectedNumber() > 0 and step < max_steps:
-            # Avance la simulation SUMO
-            for _ in range(SIM_STEPS_PER_CYCLE):
-                traci.simulationStep()
-                step += 1
-            
-            # Exécute un cycle de décision ARN
-            system.run_cycle()
-            
-            # Pause pour observer
-            time.sleep(CYCLE_DELAY)
-        
+        if args.save_state:
+            # Préchauffage jusqu'à --save-at, point de reprise, puis suite du run
+            step = run(min(args.save_at, args.steps))
+            save_checkpoint(system, args.save_state, scheduler)
+            sumo_state, controller_state = _checkpoint_paths(args.save_state)
+            print(f"\n💾 Point de reprise au pas {step}: {sumo_state} + {controller_state}\n")
+        run(args.steps)
         print("\n✅ Simulation terminée (fin naturelle)")
         
     except KeyboardInterrupt:
@@ -363,32 +2304,183 @@ def main():
     finally:
         # Fermeture propre
         try:
-            traci.close()
+            backend.close()
         except:
             pass
+        wall_time = time.perf_counter() - wall_start
+        if decision_pool is not None:
+            decision_pool.close()
+        if reporter is not None:
+            reporter.close()
+            if reporter.dropped:
+                print(f"\n⚠️  {reporter.dropped} message(s) d'affichage abandonné(s) (file pleine)")
+        if decision_log is not None:
+            decision_log.close()
+            print(f"\n📒 {decision_log.records} décisions dans {args.decision_log}")
+        if args.replay and args.record:
+            backend.save_decisions(args.record)
+            print(f"\n📝 {len(backend.decisions)} décisions enregistrées dans {args.record}")
         
-        # Statistiques finales
-        print("\n" + "="*75)
-        print("📊 STATISTIQUES FINALES")
-        print("="*75)
-        print(f"Cycles ARN exécutés: {system.cycle_count}")
+        if metrics is not None:
+            metrics.export()
+            print(f"\n📈 Métriques exportées dans {args.metrics}")
         
-        if lanes:
-            total_wait = sum(l.wait_time for l in lanes)
-            avg_wait = total_wait / len(lanes)
-            avg_cong = sum(l.congestion_level for l in lanes) / len(lanes)
-            
-            print(f"Temps d'attente moyen: {avg_wait:.2f}s")
-            print(f"Congestion moyenne: {avg_cong:.1f}/10")
-            
-            print("\n📋 État final des voies:")
-            for lane in sorted(lanes, key=lambda x: x.priority_score, reverse=True):
-                print(f"  • {lane.name:12s}: {lane.num_vehicles:3d} véhicules, "
-                      f"score {lane.priority_score:.1f}")
+        # system.step: aussi à jour après Ctrl-C ou une exception dans la boucle
+        print_final_statistics(system, system.step, wall_time, watcher, scheduler, start_step)
+
+def build_default_system(backend, green_phases, vectorized: bool = False,
+                         history_size: int = HISTORY_CYCLES) -> TrafficLightSystem:
+    """Les quatre voies du carrefour 'center'"""
+    # Création des voies
+    lanes = [
+        Lane(name="Voie Nord",  sumo_edge_id="NtoC"),
+        Lane(name="Voie Sud",   sumo_edge_id="StoC"),
+        Lane(name="Voie Est",   sumo_edge_id="EtoC"),
+        Lane(name="Voie Ouest", sumo_edge_id="WtoC"),
+    ]
+    return TrafficLightSystem(
+        lanes, green_phases=green_phases, vectorized=vectorized, backend=backend,
+        history_size=history_size,
+    )
+
+def _counting(backend):
+    """Backend dont les appels TraCI sont comptés (arn_metrics.CountingBackend)"""
+    from arn_metrics import CountingBackend
+    return CountingBackend(backend)
+
+def start_replay(args: argparse.Namespace):
+    """Contrôleur alimenté par les sorties enregistrées (arn_replay.ReplayBackend)"""
+    from arn_replay import ReplayBackend
+    
+    print(f"🔄 Chargement du rejeu ({args.replay})...")
+    backend = ReplayBackend(
+        args.replay, tripinfo=args.replay_tripinfo, detectors=args.replay_detectors,
+        step_length=args.step_length,
+    )
+    if args.metrics:
+        backend = _counting(backend)
+    if args.auto_discover:
+        system = NetworkController.from_net_file(
+            args.net, vectorized=args.vectorized, backend=backend, history_size=args.history
+        )
+        print(f"🔎 {len(system.systems)} carrefour(s) à feux détecté(s)\n")
+    else:
+        phase_table = build_phase_table_from_net(args.net) if args.net else {}
+        system = build_default_system(backend, phase_table.get(TLS_ID), args.vectorized,
+                                      args.history)
+    print("✅ Données chargées\n")
+    return system, backend
+
+def start_sumo(args: argparse.Namespace):
+    sumo = load_backend(args.backend)
+    if sumo is None and args.backend == "libsumo":
+        print("❌ ERREUR: Module 'libsumo' non trouvé!")
+        print("   Installe-le via: pip install libsumo (ou eclipse-sumo)")
+        print("   Ou relance avec --backend traci")
+        sys.exit(1)
+    if sumo is None:
+        print("❌ ERREUR: Module 'traci' non trouvé!")
+        print("   Installe SUMO et ajoute-le au PYTHONPATH")
+        print("   Ou installe via: pip install traci")
+        print("   (sans SUMO, seul le rejeu --replay est disponible)")
+        sys.exit(1)
+    
+    # Vérifications préliminaires
+    if not check_files():
+        sys.exit(1)
+    
+    # Démarrage SUMO
+    print("🔄 Connexion à SUMO...")
+    sumo_binary = SUMO_BINARY_NOGUI if args.nogui else SUMO_BINARY
+    backend = _counting(sumo) if args.metrics else sumo
+    try:
+        sumo_cmd = [sumo_binary, "-c", args.config, "--start", "--quit-on-end"]
+        sumo.start(sumo_cmd)
+        if args.backend == "libsumo":
+            print("✅ SUMO chargé dans le processus (libsumo)\n")
+        else:
+            print("✅ SUMO connecté avec succès!\n")
+        
+        if args.auto_discover:
+            # Tous les carrefours à feux du réseau
+            system = NetworkController.from_traci(backend, vectorized=args.vectorized,
+                                                  history_size=args.history)
+            print(f"🔎 {len(system.systems)} carrefour(s) à feux détecté(s)\n")
+        else:
+            system = build_default_system(
+                backend, build_phase_table_from_traci(backend).get(TLS_ID), args.vectorized,
+                args.history,
+            )
         
-        print("="*75)
-        print("👋 Merci d'avoir utilisé le système!")
-        print("="*75 + "\n")
+        if args.subscriptions:
+            system.subscribe()
+    except Exception as e:
+        print(f"❌ Impossible de démarrer SUMO: {e}")
+        print("\n💡 Vérifications:")
+        print("   1. SUMO est installé? → sumo --version")
+        print(f"   2. {sumo_binary} est dans le PATH?")
+        print("   3. Essaie --nogui si pas de GUI")
+        sys.exit(1)
+    
+    return system, sumo
+
+def print_final_statistics(system, step: int, wall_time: float,
+                           watcher: Optional[EmergencyWatcher] = None,
+                           scheduler: Optional[DecisionScheduler] = None, start_step: int = 0):
+    # Statistiques finales (start_step: pas de reprise d'un point sauvé)
+    played = step - start_step
+    print("\n" + "="*75)
+    print("📊 STATISTIQUES FINALES")
+    print("="*75)
+    print(f"Cycles ARN exécutés: {system.cycle_count}")
+    if played:
+        print(f"Durée: {wall_time:.1f}s ({played / max(wall_time, 1e-9):.0f} pas/s)")
+    if start_step:
+        print(f"Pas {start_step} à {step} (reprise)")
+    if scheduler is not None and played:
+        fixed = played // scheduler.base_interval * len(scheduler.systems)
+        print(f"Décisions par carrefour: {scheduler.decisions} "
+              f"(intervalle fixe de {scheduler.base_interval} pas: {fixed})")
+    if watcher is not None:
+        print(f"Préemptions urgence: {watcher.preemptions}")
+    if system.metrics is not None:
+        system.metrics.print_summary()
+    
+    lanes = system.lanes
+    histories = [l.history for l in lanes if l.history is not None and l.history.cycles]
+    if histories:
+        # Agrégats de tout le run (historique des voies), pas seulement le dernier cycle
+        avg_wait = sum(h.run_mean("wait_time") for h in histories) / len(histories)
+        avg_cong = sum(h.run_mean("congestion_level") for h in histories) / len(histories)
+        peak_wait = max(h.run_max("wait_time") for h in histories)
+        
+        print(f"Temps d'attente moyen (sur {histories[0].cycles} cycles): {avg_wait:.2f}s")
+        print(f"Congestion moyenne: {avg_cong:.1f}/10")
+        print(f"Attente maximale observée: {peak_wait:.1f}s")
+    elif lanes:
+        total_wait = sum(l.wait_time for l in lanes)
+        avg_wait = total_wait / len(lanes)
+        avg_cong = sum(l.congestion_level for l in lanes) / len(lanes)
+        
+        print(f"Temps d'attente moyen: {avg_wait:.2f}s")
+        print(f"Congestion moyenne: {avg_cong:.1f}/10")
+    
+    if lanes:
+        print("\n📋 État final des voies:")
+        ranked = sorted(lanes, key=lambda x: x.priority_score, reverse=True)
+        for lane in ranked[:FINAL_REPORT_LANES]:
+            trend = ""
+            if lane.history is not None and lane.history.cycles:
+                trend = (f", moy. {lane.history.run_mean('num_vehicles'):.1f}, "
+                         f"tendance {lane.queue_trend():+.2f}/cycle")
+            print(f"  • {lane.name:12s}: {lane.num_vehicles:3d} véhicules, "
+                  f"score {lane.priority_score:.1f}{trend}")
+        if len(ranked) > FINAL_REPORT_LANES:
+            print(f"  … et {len(ranked) - FINAL_REPORT_LANES} autres voies")
+    
+    print("="*75)
+    print("👋 Merci d'avoir utilisé le système!")
+    print("="*75 + "\n")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
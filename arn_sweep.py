@@ -0,0 +1,260 @@
+"""
+arn_sweep.py - Balayage parallèle des poids du score ARN
+Chaque configuration (poids de Lane.calculate_score + SIM_STEPS_PER_CYCLE)
+tourne dans sa propre instance SUMO, sur un pool de processus.
+
+Exemples:
+  python arn_sweep.py --grid vehicles=0.5,1,2 emergency=50,100 --cycle-steps 15,30
+  python arn_sweep.py --random 64 --seed 1 --workers 32
+  python arn_sweep.py --random 64 --backend libsumo   # SUMO dans chaque worker, sans socket
+  python arn_sweep.py --random 64 --warm-start chaud   # après arn_sumo_integration.py --save-state chaud
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, asdict, fields
+from typing import Dict, List, Optional
+
+import arn_sumo_integration as arn
+from arn_analyse import iter_elements
+from arn_sumo_integration import ScoreWeights, VehicleClass, classify_vehicle
+
+WEIGHT_NAMES = [f.name for f in fields(ScoreWeights)]
+
+# Plages par défaut du tirage aléatoire (min, max)
+DEFAULT_RANGES = {
+    "vehicles": (0.0, 3.0),
+    "wait_time": (0.0, 2.0),
+    "congestion": (0.0, 5.0),
+    "bus": (0.0, 50.0),
+    "emergency": (0.0, 300.0),
+}
+
+
+@dataclass
+class SweepConfig:
+    run_id: int
+    weights: ScoreWeights
+    cycle_steps: int
+
+
+def grid_configs(values: Dict[str, List[float]], cycle_steps: List[int]) -> List[SweepConfig]:
+    """Produit cartésien des valeurs données (les poids absents gardent leur défaut)"""
+    names = list(values)
+    configs = []
+    for combo in itertools.product(*(values[name] for name in names), cycle_steps):
+        weights = ScoreWeights(**dict(zip(names, combo[:-1])))
+        configs.append(SweepConfig(len(configs), weights, combo[-1]))
+    return configs
+
+
+def random_configs(count: int, cycle_steps: List[int], seed: Optional[int] = None,
+                   ranges: Dict[str, tuple] = DEFAULT_RANGES) -> List[SweepConfig]:
+    rng = random.Random(seed)
+    configs = []
+    for run_id in range(count):
+        weights = ScoreWeights(**{
+            name: round(rng.uniform(*ranges[name]), 3) for name in WEIGHT_NAMES if name in ranges
+        })
+        configs.append(SweepConfig(run_id, weights, rng.choice(cycle_steps)))
+    return configs
+
+
+def tripinfo_kpis(tripinfo_file: str) -> Dict[str, float]:
+    """KPI d'un run depuis tripinfo.xml (lecture en flux)"""
+    trips = 0
+    total_wait = total_loss = total_duration = 0.0
+    emergency_trips = 0
+    emergency_loss = emergency_max_loss = 0.0
+    for _parent, elem in iter_elements(tripinfo_file, "tripinfo"):
+        trips += 1
+        time_loss = float(elem.get("timeLoss", 0))
+        total_wait += float(elem.get("waitingTime", 0))
+        total_loss += time_loss
+        total_duration += float(elem.get("duration", 0))
+        if classify_vehicle(elem.get("id", ""), elem.get("vType", "")) is VehicleClass.EMERGENCY:
+            emergency_trips += 1
+            emergency_loss += time_loss
+            emergency_max_loss = max(emergency_max_loss, time_loss)
+    return {
+        "trips": trips,
+        "mean_waiting_time": total_wait / trips if trips else 0.0,
+        "mean_time_loss": total_loss / trips if trips else 0.0,
+        "mean_duration": total_duration / trips if trips else 0.0,
+        "emergency_trips": emergency_trips,
+        "emergency_mean_delay": emergency_loss / emergency_trips if emergency_trips else 0.0,
+        "emergency_max_delay": emergency_max_loss,
+    }
+
+
+def run_configuration(config: SweepConfig, sumo_config: str, max_steps: int,
+                      output_dir: str, warm_start: Optional[str] = None,
+                      backend: str = arn.SUMO_BACKEND,
+                      preemption: bool = arn.EMERGENCY_PREEMPTION) -> Dict[str, object]:
+    """Exécute une configuration dans sa propre instance SUMO (appelé dans un worker).
+    
+    warm_start: préfixe d'un point de reprise (arn_sumo_integration.save_checkpoint),
+    chargé avant la boucle pour sauter le remplissage du réseau.
+    backend: "traci" ou "libsumo" (SUMO chargé dans le worker lui-même).
+    preemption: vert immédiat pour les véhicules d'urgence (EmergencyWatcher),
+    comme dans arn_sumo_integration.py, pour que les retards mesurés soient comparables.
+    """
+    traci = arn.load_backend(backend)
+    tripinfo_file = os.path.join(output_dir, f"tripinfo_{config.run_id:04d}.xml")
+    sumo_cmd = [
+        arn.SUMO_BINARY_NOGUI, "-c", sumo_config,
+        "--tripinfo-output", tripinfo_file,
+        "--no-step-log", "true", "--no-warnings", "true",
+    ]
+    row = {"run_id": config.run_id, "cycle_steps": config.cycle_steps, **asdict(config.weights)}
+    wall_start = time.perf_counter()
+    try:
+        traci.start(sumo_cmd, label=f"sweep-{config.run_id}")
+        system = arn.NetworkController.from_traci(traci, weights=config.weights)
+        system.subscribe()
+        if warm_start:
+            arn.load_checkpoint(system, warm_start)
+        watcher = arn.EmergencyWatcher(system) if preemption else None
+        if watcher is not None and warm_start:
+            watcher.scan()
+        row["steps"] = arn.run_simulation(
+            system, max_steps=max_steps, cycle_steps=config.cycle_steps, display_every=0,
+            watcher=watcher, start_step=system.step,
+        )
+        row["preemptions"] = watcher.preemptions if watcher is not None else 0
+        traci.close()
+        row.update(tripinfo_kpis(tripinfo_file))
+        row["error"] = ""
+    except Exception as e:
+        row["error"] = str(e)
+        try:
+            traci.close()
+        except Exception:
+            pass
+    row["wall_time"] = round(time.perf_counter() - wall_start, 3)
+    return row
+
+
+def _run_configuration(job):
+    return run_configuration(*job)
+
+
+def run_sweep(configs: List[SweepConfig], sumo_config: str = arn.SUMO_CONFIG,
+              max_steps: int = arn.MAX_STEPS, workers: Optional[int] = None,
+              output_dir: Optional[str] = None,
+              warm_start: Optional[str] = None,
+              backend: str = arn.SUMO_BACKEND,
+              preemption: bool = arn.EMERGENCY_PREEMPTION) -> List[Dict[str, object]]:
+    """Lance toutes les configurations sur un pool de processus, renvoie la table des résultats"""
+    keep_outputs = output_dir is not None
+    output_dir = output_dir or tempfile.mkdtemp(prefix="arn_sweep_")
+    os.makedirs(output_dir, exist_ok=True)
+    sumo_config = os.path.abspath(sumo_config)
+    warm_start = os.path.abspath(warm_start) if warm_start else None
+    jobs = [(config, sumo_config, max_steps, output_dir, warm_start, backend, preemption)
+            for config in configs]
+
+    rows = []
+    try:
+        with multiprocessing.Pool(processes=workers) as pool:
+            for row in pool.imap_unordered(_run_configuration, jobs):
+                rows.append(row)
+                status = "❌ " + row["error"] if row["error"] else (
+                    f"attente {row['mean_waiting_time']:.2f}s, "
+                    f"urgence {row['emergency_mean_delay']:.2f}s"
+                )
+                print(f"  [{len(rows):4d}/{len(jobs)}] run {row['run_id']:4d}: {status}")
+    finally:
+        if not keep_outputs:
+            shutil.rmtree(output_dir, ignore_errors=True)
+    return sorted(rows, key=lambda row: row["run_id"])
+
+
+def write_results(rows: List[Dict[str, object]], path: str):
+    columns = ["run_id", "cycle_steps", *WEIGHT_NAMES, "steps", "preemptions", "trips",
+               "mean_waiting_time", "mean_time_loss", "mean_duration",
+               "emergency_trips", "emergency_mean_delay", "emergency_max_delay",
+               "wall_time", "error"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _parse_grid(specs: List[str]) -> Dict[str, List[float]]:
+    values = {}
+    for spec in specs:
+        name, _, raw = spec.partition("=")
+        if name not in WEIGHT_NAMES or not raw:
+            raise ValueError(
+                f"'{spec}': attendu <poids>=v1,v2,... avec poids parmi {', '.join(WEIGHT_NAMES)}"
+            )
+        values[name] = [float(v) for v in raw.split(",")]
+    return values
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Balayage parallèle des poids du score ARN")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--grid", nargs="+", metavar="POIDS=V1,V2",
+                      help=f"Grille de valeurs (poids: {', '.join(WEIGHT_NAMES)})")
+    mode.add_argument("--random", type=int, metavar="N", help="N vecteurs de poids tirés au hasard")
+    parser.add_argument("--seed", type=int, help="Graine du tirage aléatoire")
+    parser.add_argument("--cycle-steps", default=str(arn.SIM_STEPS_PER_CYCLE),
+                        help="Valeurs de SIM_STEPS_PER_CYCLE, séparées par des virgules")
+    parser.add_argument("-c", "--config", default=arn.SUMO_CONFIG, help="Configuration SUMO")
+    parser.add_argument("--steps", type=int, default=arn.MAX_STEPS,
+                        help="Dernier pas de chaque run (compté depuis t=0, même après --warm-start)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processus en parallèle")
+    parser.add_argument("--warm-start", metavar="PREFIXE",
+                        help="Point de reprise chargé au début de chaque run (voir --save-state)")
+    parser.add_argument("--backend", choices=["traci", "libsumo"], default=arn.SUMO_BACKEND,
+                        help="traci (une connexion socket par run) ou libsumo (SUMO dans le worker)")
+    parser.add_argument("--no-preemption", dest="preemption", action="store_false",
+                        default=arn.EMERGENCY_PREEMPTION,
+                        help="Désactive le vert immédiat pour les véhicules d'urgence")
+    parser.add_argument("--keep-outputs", metavar="DOSSIER",
+                        help="Conserve les tripinfo de chaque run dans ce dossier")
+    parser.add_argument("-o", "--output", default="sweep_results.csv", help="Table des résultats (CSV)")
+    args = parser.parse_args(argv)
+
+    cycle_steps = [int(v) for v in args.cycle_steps.split(",")]
+    if args.grid:
+        try:
+            values = _parse_grid(args.grid)
+        except ValueError as e:
+            parser.error(str(e))
+        configs = grid_configs(values, cycle_steps)
+    else:
+        configs = random_configs(args.random, cycle_steps, args.seed)
+
+    print("\n" + "="*75)
+    print(f"🧪 BALAYAGE DES POIDS ARN: {len(configs)} configuration(s), {args.workers} worker(s)")
+    print("="*75 + "\n")
+
+    wall_start = time.perf_counter()
+    if arn.load_backend(args.backend) is None:
+        parser.error(f"module '{args.backend}' non trouvé")
+    rows = run_sweep(configs, args.config, args.steps, args.workers, args.keep_outputs,
+                     args.warm_start, args.backend, args.preemption)
+    write_results(rows, args.output)
+
+    ok = [row for row in rows if not row["error"]]
+    print(f"\n✅ {len(ok)}/{len(rows)} runs terminés en {time.perf_counter() - wall_start:.1f}s")
+    if ok:
+        best = min(ok, key=lambda row: row["mean_waiting_time"])
+        print(f"🏆 Meilleure attente moyenne: run {best['run_id']} "
+              f"({best['mean_waiting_time']:.2f}s) poids "
+              f"{ {name: best[name] for name in WEIGHT_NAMES} }, cycle {best['cycle_steps']}")
+    print(f"📄 Résultats: {args.output}")
+    print("="*75 + "\n")
+
+
+if __name__ == "__main__":
+    main()
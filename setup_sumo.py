@@ -1,8 +1,23 @@
 """
 setup_complet.py - Génère TOUS les fichiers nécessaires pour SUMO
 Lance CE fichier en PREMIER avant tout !
+
+Grilles N×M de carrefours à feux (réseau, demande et .sumocfg):
+  python setup_sumo.py --grid 10x20 --car-rate 200 --bus-share 0.1 --emergency-per-hour 6
 """
+import argparse
+import math
 import os
+import random
+from typing import Dict, List, Tuple
+
+# Paramètres des grilles générées
+GRID_SPACING = 200.0  # Distance entre deux carrefours (m)
+LANE_SPEED = 13.89
+LANE_OFFSET = 1.60  # Demi-largeur de voie: décalage à droite de l'axe du tronçon
+JUNCTION_RADIUS = 3.20
+GREEN_DURATION = 31
+YELLOW_DURATION = 4
 
 def create_network():
     """Crée mon_reseau.net.xml"""
@@ -135,19 +150,20 @@ def create_routes():
     print("✅ mes_routes.rou.xml créé")
 
 
-def create_config():
-    """Crée mon_config.sumocfg"""
-    content = """<?xml version="1.0" encoding="UTF-8"?>
+def create_config(config_file="mon_config.sumocfg", net_file="mon_reseau.net.xml",
+                  route_file="mes_routes.rou.xml", end=3600):
+    """Crée mon_config.sumocfg (ou la configuration d'une grille générée)"""
+    content = f"""<?xml version="1.0" encoding="UTF-8"?>
 <configuration xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/sumoConfiguration.xsd">
 
     <input>
-        <net-file value="mon_reseau.net.xml"/>
-        <route-files value="mes_routes.rou.xml"/>
+        <net-file value="{net_file}"/>
+        <route-files value="{route_file}"/>
     </input>
 
     <time>
         <begin value="0"/>
-        <end value="3600"/>
+        <end value="{end}"/>
         <step-length value="1"/>
     </time>
 
@@ -165,12 +181,278 @@ def create_config():
 
 </configuration>"""
     
-    with open("mon_config.sumocfg", "w", encoding="utf-8") as f:
+    with open(config_file, "w", encoding="utf-8") as f:
         f.write(content)
-    print("✅ mon_config.sumocfg créé")
+    print(f"✅ {config_file} créé")
+
+
+# =============== GRILLES N×M ===============
+# Chaque carrefour J<i>_<j> a 4 tronçons entrants à une voie et ne laisse que
+# le tout-droit, comme le carrefour "center": linkIndex 0 = depuis le nord,
+# 1 = depuis le sud, 2 = depuis l'est, 3 = depuis l'ouest. Les bords de la
+# grille se terminent par des impasses N<j>, S<j>, E<i>, W<i>.
+# Les fichiers sont écrits ligne par ligne (pas de grande chaîne en mémoire).
+
+# Ordre des liens d'un carrefour: (voisin d'où l'on vient, voisin vers lequel on va)
+GRID_LINKS = (("north", "south"), ("south", "north"), ("east", "west"), ("west", "east"))
+# Même matrice de conflits que le carrefour "center"
+GRID_REQUESTS = (("0000", "1100"), ("0000", "0100"), ("0011", "0011"), ("0010", "0010"))
+GRID_PHASES = ((GREEN_DURATION, "GGrr"), (YELLOW_DURATION, "yyrr"),
+               (GREEN_DURATION, "rrGG"), (YELLOW_DURATION, "rryy"))
+
+
+def _grid_nodes(rows: int, cols: int, spacing: float) -> Dict[str, Tuple[float, float]]:
+    """Carrefours J<i>_<j> (ligne i du sud au nord, colonne j d'ouest en est) puis impasses"""
+    nodes = {}
+    for i in range(rows):
+        for j in range(cols):
+            nodes[f"J{i}_{j}"] = (j * spacing, i * spacing)
+    for i in range(rows):
+        nodes[f"W{i}"] = (-spacing, i * spacing)
+        nodes[f"E{i}"] = (cols * spacing, i * spacing)
+    for j in range(cols):
+        nodes[f"S{j}"] = (j * spacing, -spacing)
+        nodes[f"N{j}"] = (j * spacing, rows * spacing)
+    return nodes
+
+
+def _grid_neighbours(i: int, j: int, rows: int, cols: int) -> Dict[str, str]:
+    return {
+        "north": f"J{i + 1}_{j}" if i + 1 < rows else f"N{j}",
+        "south": f"J{i - 1}_{j}" if i > 0 else f"S{j}",
+        "east": f"J{i}_{j + 1}" if j + 1 < cols else f"E{i}",
+        "west": f"J{i}_{j - 1}" if j > 0 else f"W{i}",
+    }
+
+
+def _fmt(point: Tuple[float, float]) -> str:
+    return f"{point[0]:.2f},{point[1]:.2f}"
+
+
+def _lane_geometry(start: Tuple[float, float], end: Tuple[float, float],
+                   trim_start: bool, trim_end: bool) -> Tuple[Tuple[float, float], Tuple[float, float], float]:
+    """Extrémités de la voie (décalée à droite, raccourcie au bord des carrefours) et longueur"""
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    norm = math.hypot(dx, dy)
+    ux, uy = dx / norm, dy / norm
+    # Circulation à droite: normale (uy, -ux)
+    ox, oy = uy * LANE_OFFSET, -ux * LANE_OFFSET
+    a = JUNCTION_RADIUS if trim_start else 0.0
+    b = JUNCTION_RADIUS if trim_end else 0.0
+    p0 = (start[0] + ux * a + ox, start[1] + uy * a + oy)
+    p1 = (end[0] - ux * b + ox, end[1] - uy * b + oy)
+    return p0, p1, norm - a - b
+
+
+def grid_edge_id(from_node: str, to_node: str) -> str:
+    return f"{from_node}to{to_node}"
+
+
+def create_grid_network(path: str, rows: int, cols: int, spacing: float = GRID_SPACING):
+    """Réseau N×M de carrefours à feux, écrit en flux"""
+    nodes = _grid_nodes(rows, cols, spacing)
+    # Tronçons orientés (de, vers): chaque carrefour est relié à ses 4 voisins dans les deux sens
+    edges: List[Tuple[str, str]] = []
+    for i in range(rows):
+        for j in range(cols):
+            here = f"J{i}_{j}"
+            for other in _grid_neighbours(i, j, rows, cols).values():
+                edges.append((other, here))
+                # Entre deux carrefours, le tronçon sortant est l'entrant du voisin (écrit par lui)
+                if not other.startswith("J"):
+                    edges.append((here, other))
+    geometry = {
+        (a, b): _lane_geometry(nodes[a], nodes[b], a.startswith("J"), b.startswith("J"))
+        for a, b in edges
+    }
+    incoming: Dict[str, List[str]] = {}
+    for a, b in edges:
+        incoming.setdefault(b, []).append(grid_edge_id(a, b))
+
+    xs = [x for x, _y in nodes.values()]
+    ys = [y for _x, y in nodes.values()]
+    with open(path, "w", encoding="utf-8") as f:
+        write = f.write
+        write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        write('<net version="1.20" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+              'xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/net_file.xsd">\n\n')
+        write(f'    <location netOffset="0.00,0.00" '
+              f'convBoundary="{min(xs):.2f},{min(ys):.2f},{max(xs):.2f},{max(ys):.2f}"/>\n\n')
+
+        write("    <!-- Edges -->\n")
+        for a, b in edges:
+            edge_id = grid_edge_id(a, b)
+            p0, p1, length = geometry[(a, b)]
+            write(f'    <edge id="{edge_id}" from="{a}" to="{b}" priority="1">\n')
+            write(f'        <lane id="{edge_id}_0" index="0" speed="{LANE_SPEED}" '
+                  f'length="{length:.2f}" shape="{_fmt(p0)} {_fmt(p1)}"/>\n')
+            write("    </edge>\n")
+
+        write("\n    <!-- Junctions -->\n")
+        for i in range(rows):
+            for j in range(cols):
+                tls = f"J{i}_{j}"
+                x, y = nodes[tls]
+                neighbours = _grid_neighbours(i, j, rows, cols)
+                inc_lanes = " ".join(f"{grid_edge_id(neighbours[src], tls)}_0" for src, _dst in GRID_LINKS)
+                int_lanes = " ".join(f":{tls}_{k}_0" for k in range(len(GRID_LINKS)))
+                r = JUNCTION_RADIUS
+                shape = f"{x - r:.2f},{y + r:.2f} {x + r:.2f},{y + r:.2f} {x + r:.2f},{y - r:.2f} {x - r:.2f},{y - r:.2f}"
+                write(f'    <junction id="{tls}" type="traffic_light" x="{x:.2f}" y="{y:.2f}" '
+                      f'incLanes="{inc_lanes}" intLanes="{int_lanes}" shape="{shape}">\n')
+                for k, (response, foes) in enumerate(GRID_REQUESTS):
+                    write(f'        <request index="{k}" response="{response}" foes="{foes}" cont="0"/>\n')
+                write("    </junction>\n")
+                # Voies internes: de la fin de la voie entrante au début de la voie sortante
+                for k, (src, dst) in enumerate(GRID_LINKS):
+                    start = geometry[(neighbours[src], tls)][1]
+                    end = geometry[(tls, neighbours[dst])][0]
+                    length = math.hypot(end[0] - start[0], end[1] - start[1])
+                    write(f'    <junction id=":{tls}_{k}" type="internal">\n')
+                    write(f'        <lane id=":{tls}_{k}_0" index="0" speed="{LANE_SPEED}" '
+                          f'length="{length:.2f}" shape="{_fmt(start)} {_fmt(end)}"/>\n')
+                    write("    </junction>\n")
+        for node, (x, y) in nodes.items():
+            if node.startswith("J"):
+                continue
+            inc_lanes = " ".join(f"{edge_id}_0" for edge_id in incoming.get(node, ()))
+            write(f'    <junction id="{node}" type="dead_end" x="{x:.2f}" y="{y:.2f}" '
+                  f'incLanes="{inc_lanes}" intLanes="" shape="{x:.2f},{y:.2f}"/>\n')
+
+        write("\n    <!-- Connections -->\n")
+        for i in range(rows):
+            for j in range(cols):
+                tls = f"J{i}_{j}"
+                neighbours = _grid_neighbours(i, j, rows, cols)
+                for k, (src, dst) in enumerate(GRID_LINKS):
+                    from_edge = grid_edge_id(neighbours[src], tls)
+                    to_edge = grid_edge_id(tls, neighbours[dst])
+                    write(f'    <connection from="{from_edge}" to="{to_edge}" fromLane="0" toLane="0" '
+                          f'via=":{tls}_{k}_0" tl="{tls}" linkIndex="{k}" dir="s" state="O"/>\n')
+                    write(f'    <connection from=":{tls}_{k}" to="{to_edge}" fromLane="0" toLane="0" '
+                          f'dir="s" state="M"/>\n')
+
+        write("\n    <!-- Traffic Light Logic -->\n")
+        for i in range(rows):
+            for j in range(cols):
+                write(f'    <tlLogic id="J{i}_{j}" type="static" programID="0" offset="0">\n')
+                for duration, state in GRID_PHASES:
+                    write(f'        <phase duration="{duration}" state="{state}"/>\n')
+                write("    </tlLogic>\n")
+        write("\n</net>\n")
+    print(f"✅ {path} créé ({rows * cols} carrefours, {len(edges)} tronçons)")
+
+
+def grid_routes(rows: int, cols: int) -> Dict[str, List[str]]:
+    """Un itinéraire tout-droit par ligne et par colonne, dans chaque sens"""
+    routes = {}
+    for i in range(rows):
+        path = [f"W{i}"] + [f"J{i}_{j}" for j in range(cols)] + [f"E{i}"]
+        routes[f"row{i}_we"] = path
+        routes[f"row{i}_ew"] = path[::-1]
+    for j in range(cols):
+        path = [f"S{j}"] + [f"J{i}_{j}" for i in range(rows)] + [f"N{j}"]
+        routes[f"col{j}_sn"] = path
+        routes[f"col{j}_ns"] = path[::-1]
+    return {
+        route_id: [grid_edge_id(a, b) for a, b in zip(path, path[1:])]
+        for route_id, path in routes.items()
+    }
+
+
+def create_grid_routes(path: str, rows: int, cols: int, car_rate: float = 300.0,
+                       bus_share: float = 0.1, emergency_per_hour: float = 3.0,
+                       end: int = 3600, seed: int = 0):
+    """Demande de la grille: flux voitures/bus par itinéraire et véhicules d'urgence tirés au hasard.
+
+    car_rate: véhicules/heure par itinéraire, dont bus_share de bus;
+    emergency_per_hour: ambulances sur tout le réseau (départs reproductibles avec seed).
+    """
+    routes = grid_routes(rows, cols)
+    rng = random.Random(seed)
+    count = int(round(emergency_per_hour * end / 3600.0))
+    ambulances = sorted((round(rng.uniform(0, end), 1), rng.choice(list(routes))) for _ in range(count))
+    bus_rate = car_rate * bus_share
+    with open(path, "w", encoding="utf-8") as f:
+        write = f.write
+        write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        write('<routes xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+              'xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/routes_file.xsd">\n\n')
+        write('    <vType id="car" accel="2.6" decel="4.5" sigma="0.5" length="5.0" minGap="2.5" '
+              'maxSpeed="13.89" guiShape="passenger" color="1,1,0"/>\n')
+        write('    <vType id="bus" accel="1.2" decel="4.5" sigma="0.5" length="12.0" minGap="3.0" '
+              'maxSpeed="12.0" guiShape="bus" color="0,1,0"/>\n')
+        write('    <vType id="ambulance" accel="3.0" decel="5.0" sigma="0.3" length="6.0" minGap="2.0" '
+              'maxSpeed="20.0" guiShape="emergency" color="1,0,0"/>\n\n')
+        for route_id, route_edges in routes.items():
+            write(f'    <route id="{route_id}" edges="{" ".join(route_edges)}"/>\n')
+        write("\n")
+        for route_id in routes:
+            if car_rate - bus_rate > 0:
+                write(f'    <flow id="flow_{route_id}_cars" type="car" route="{route_id}" '
+                      f'begin="0" end="{end}" vehsPerHour="{car_rate - bus_rate:g}"/>\n')
+            if bus_rate > 0:
+                write(f'    <flow id="flow_{route_id}_bus" type="bus" route="{route_id}" '
+                      f'begin="0" end="{end}" vehsPerHour="{bus_rate:g}"/>\n')
+        write("\n")
+        for n, (depart, route_id) in enumerate(ambulances, 1):
+            write(f'    <vehicle id="ambulance_{n}" type="ambulance" route="{route_id}" '
+                  f'depart="{depart:g}" color="1,0,0"/>\n')
+        write("\n</routes>\n")
+    print(f"✅ {path} créé ({len(routes)} itinéraires, {count} ambulance(s))")
+
+
+def create_grid(rows: int, cols: int, prefix: str, spacing: float = GRID_SPACING,
+                car_rate: float = 300.0, bus_share: float = 0.1,
+                emergency_per_hour: float = 3.0, end: int = 3600, seed: int = 0):
+    """<prefix>.net.xml, <prefix>.rou.xml et <prefix>.sumocfg"""
+    net_file, route_file, config_file = f"{prefix}.net.xml", f"{prefix}.rou.xml", f"{prefix}.sumocfg"
+    create_grid_network(net_file, rows, cols, spacing)
+    create_grid_routes(route_file, rows, cols, car_rate, bus_share, emergency_per_hour, end, seed)
+    # Chemins relatifs au .sumocfg
+    create_config(config_file, os.path.basename(net_file), os.path.basename(route_file), end)
+    return config_file
+
+
+def _parse_grid_size(value: str) -> Tuple[int, int]:
+    rows, _, cols = value.lower().partition("x")
+    try:
+        size = int(rows), int(cols or rows)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}': attendu NxM (ex. 10x20)")
+    if min(size) < 1:
+        raise argparse.ArgumentTypeError(f"'{value}': au moins 1x1")
+    return size
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Génère les fichiers SUMO (carrefour unique ou grille N×M)")
+    parser.add_argument("--grid", type=_parse_grid_size, metavar="NxM",
+                        help="Grille de N lignes et M colonnes de carrefours à feux")
+    parser.add_argument("--prefix", help="Préfixe des fichiers de la grille (défaut: grille_NxM)")
+    parser.add_argument("--spacing", type=float, default=GRID_SPACING, help="Distance entre carrefours (m)")
+    parser.add_argument("--car-rate", type=float, default=300.0,
+                        help="Véhicules/heure par itinéraire (ligne ou colonne, par sens)")
+    parser.add_argument("--bus-share", type=float, default=0.1, help="Part de bus dans ce débit")
+    parser.add_argument("--emergency-per-hour", type=float, default=3.0,
+                        help="Ambulances par heure sur tout le réseau")
+    parser.add_argument("--end", type=int, default=3600, help="Fin de la demande et de la simulation (s)")
+    parser.add_argument("--seed", type=int, default=0, help="Graine des départs d'ambulances")
+    args = parser.parse_args()
+
+    if args.grid:
+        rows, cols = args.grid
+        prefix = args.prefix or f"grille_{rows}x{cols}"
+        print("\n" + "="*70)
+        print(f"🚀 GRILLE {rows}x{cols} ({rows * cols} CARREFOURS)")
+        print("="*70 + "\n")
+        config_file = create_grid(rows, cols, prefix, args.spacing, args.car_rate,
+                                  args.bus_share, args.emergency_per_hour, args.end, args.seed)
+        print("\n🎯 Prochaine étape:")
+        print(f"  python arn_sumo_integration.py --auto-discover --config {config_file}")
+        print("="*70 + "\n")
+        return
+
     print("\n" + "="*70)
     print("🚀 CRÉATION DES FICHIERS SUMO")
     print("="*70 + "\n")
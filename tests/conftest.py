@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les modules arn_* sont à la racine du dépôt (pas de paquet installable)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,106 @@
+"""Faux backend TraCI piloté par les tests (interrogation directe et abonnements)"""
+import json
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Set, Tuple
+
+from arn_sumo_integration import tc
+
+
+class FakeBackend:
+    class TraCIException(Exception):
+        pass
+
+    def __init__(self):
+        self.vehicles: Dict[str, List[Tuple[str, str]]] = {}  # tronçon -> [(id, type)]
+        self.waiting: Dict[str, float] = {}
+        self.arrived: List[str] = []
+        self.departed: List[str] = []
+        self.phases: List[Tuple[str, int]] = []
+        self.calls = Counter()
+        self.time = 0.0
+        self.end = 100
+        self.subscribed: Set[str] = set()
+        self.context: Set[str] = set()
+        self.pushed = 0  # résultats d'abonnement de tronçon renvoyés par simulationStep
+
+        def counted(name, fn):
+            def call(*args):
+                self.calls[name] += 1
+                return fn(*args)
+            return call
+
+        types = {}
+        self.edge = SimpleNamespace(
+            getLastStepVehicleNumber=counted("vehicles", lambda e: len(self.vehicles.get(e, ()))),
+            getWaitingTime=counted("waiting", lambda e: self.waiting.get(e, 0.0)),
+            getLastStepHaltingNumber=counted("halting", lambda e: len(self.vehicles.get(e, ()))),
+            getLastStepVehicleIDs=counted("ids", lambda e: [vid for vid, _ in self.vehicles.get(e, ())]),
+            subscribe=counted("subscribe", lambda e, variables: self.subscribed.add(e)),
+            subscribeContext=counted("subscribe", lambda e, domain, dist, variables: self.context.add(e)),
+            unsubscribe=counted("unsubscribe", lambda e: self.subscribed.discard(e)),
+            unsubscribeContext=counted("unsubscribe", lambda e, domain, dist: self.context.discard(e)),
+            getSubscriptionResults=self._edge_results,
+            getContextSubscriptionResults=lambda e: (
+                {vid: {tc.VAR_TYPE: vtype} for vid, vtype in self.vehicles.get(e, ())}
+                if e in self.context else None),
+        )
+        self.vehicle = SimpleNamespace(
+            getTypeID=counted("type", lambda vid: types[vid]),
+            getRoadID=counted("road", self._road),
+            getIDList=lambda: [vid for edge in self.vehicles.values() for vid, _ in edge],
+        )
+        self._types = types
+        self.trafficlight = SimpleNamespace(
+            setPhase=counted("setPhase", lambda tls_id, phase: self.phases.append((tls_id, phase))),
+        )
+        self.simulation = SimpleNamespace(
+            getArrivedIDList=lambda: self.arrived,
+            getDepartedIDList=lambda: self.departed,
+            getTime=lambda: self.time,
+            getDeltaT=lambda: 1.0,
+            saveState=self._save_state,
+            loadState=self._load_state,
+            getMinExpectedNumber=lambda: 1 if self.time < self.end else 0,
+            subscribe=lambda variables: None,
+            getSubscriptionResults=lambda: {tc.VAR_ARRIVED_VEHICLES_IDS: self.arrived,
+                                            tc.VAR_DEPARTED_VEHICLES_IDS: self.departed},
+        )
+
+    def put(self, edge_id: str, vid: str, vtype: str = "car"):
+        """Place un véhicule sur un tronçon (et le retire des autres)"""
+        self.remove(vid)
+        self.vehicles.setdefault(edge_id, []).append((vid, vtype))
+        self._types[vid] = vtype
+
+    def remove(self, vid: str):
+        for edge_vehicles in self.vehicles.values():
+            edge_vehicles[:] = [(v, t) for v, t in edge_vehicles if v != vid]
+
+    def _road(self, vid: str) -> str:
+        for edge_id, edge_vehicles in self.vehicles.items():
+            if any(v == vid for v, _ in edge_vehicles):
+                return edge_id
+        raise self.TraCIException(f"Vehicle '{vid}' is not known")
+
+    def _edge_results(self, edge_id: str):
+        if edge_id not in self.subscribed:
+            return None
+        count = len(self.vehicles.get(edge_id, ()))
+        return {tc.LAST_STEP_VEHICLE_NUMBER: count, tc.VAR_WAITING_TIME: self.waiting.get(edge_id, 0.0),
+                tc.LAST_STEP_VEHICLE_HALTING_NUMBER: count}
+
+    def _save_state(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"time": self.time, "vehicles": self.vehicles, "types": self._types}, f)
+
+    def _load_state(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        self.time = state["time"]
+        self.vehicles = {e: [tuple(v) for v in vehicles] for e, vehicles in state["vehicles"].items()}
+        self._types.update(state["types"])
+
+    def simulationStep(self):
+        self.time += 1.0
+        self.pushed += len(self.subscribed) + len(self.context)
@@ -0,0 +1,78 @@
+import math
+import random
+
+from arn_analyse import (StreamingHistogram, analyse_edge_data, analyse_tripinfo, iter_elements,
+                         read_columns)
+
+EDGE_DATA = """<meandata>
+    <interval begin="0.00" end="60.00" id="ed">
+        <edge id="NtoC" sampledSeconds="120" waitingTime="30" timeLoss="40" density="10" speed="5"/>
+        <edge id="StoC" sampledSeconds="0" waitingTime="0" timeLoss="0" density="0" speed="0"/>
+    </interval>
+    <interval begin="60.00" end="180.00" id="ed">
+        <edge id="NtoC" sampledSeconds="360" waitingTime="90" timeLoss="100" density="20" speed="9"/>
+    </interval>
+</meandata>
+"""
+
+TRIPINFO = """<tripinfos>
+    <tripinfo id="v1" vType="car" depart="0" duration="40.5" waitingTime="3" timeLoss="5" routeLength="200"/>
+    <tripinfo id="v2" vType="car" depart="5" duration="60" waitingTime="9" timeLoss="15" routeLength="200"/>
+    <tripinfo id="b1" vType="bus" depart="9" duration="90" waitingTime="20" timeLoss="30" routeLength="400"/>
+</tripinfos>
+"""
+
+
+def test_histogram_percentiles_bound_exact_values():
+    """Le percentile renvoyé est la borne haute de la case du percentile exact"""
+    rng = random.Random(5)
+    values = [rng.uniform(0, 500) for _ in range(10000)]
+    histogram = StreamingHistogram(bin_width=2.0, max_value=1000.0)
+    for value in values:
+        histogram.add(value)
+    ordered = sorted(values)
+    for q in (10, 50, 90, 99):
+        exact = ordered[math.ceil(q / 100 * len(ordered)) - 1]
+        assert exact < histogram.percentile(q) <= exact + 2.0
+
+
+def test_histogram_edges():
+    histogram = StreamingHistogram(bin_width=1.0, max_value=10.0)
+    assert histogram.percentile(50) == 0.0
+    histogram.add(-3.0)
+    histogram.add(1e6)  # au-delà de max_value: dernière case
+    assert histogram.counts[0] == 1 and histogram.counts[-1] == 1
+    assert histogram.percentile(100) == 11.0
+
+
+def test_iter_elements_gives_parent_attributes(tmp_path):
+    path = tmp_path / "edge_data.xml"
+    path.write_text(EDGE_DATA)
+    seen = [(parent["begin"], elem.get("id")) for parent, elem in iter_elements(str(path), "edge")]
+    assert seen == [("0.00", "NtoC"), ("0.00", "StoC"), ("60.00", "NtoC")]
+
+
+def test_edge_data_weighted_means_and_columns(tmp_path):
+    path = tmp_path / "edge_data.xml"
+    path.write_text(EDGE_DATA)
+    stats = analyse_edge_data(str(path), str(tmp_path / "out"))
+    summary = stats["NtoC"].summary()
+    assert summary["intervals"] == 2
+    assert summary["mean_density"] == (10 * 60 + 20 * 120) / 180
+    assert summary["mean_speed"] == (5 * 120 + 9 * 360) / 480
+    assert stats["StoC"].summary()["mean_speed"] == 0.0
+
+    columns = read_columns(str(tmp_path / "out" / "edge_timeseries"))
+    assert list(columns["begin"]) == [0.0, 0.0, 60.0]
+    assert list(columns["edge"]) == [0, 1, 0]
+
+
+def test_tripinfo_per_vehicle_type(tmp_path):
+    path = tmp_path / "tripinfo.xml"
+    path.write_text(TRIPINFO)
+    stats = analyse_tripinfo(str(path), str(tmp_path / "out"))
+    car = stats["car"].summary()
+    assert car["trips"] == 2 and car["mean_waiting_time"] == 6.0 and car["max_time_loss"] == 15.0
+    assert car["p50_travel_time"] == 41.0
+    assert stats["bus"].summary()["trips"] == 1
+    assert list(read_columns(str(tmp_path / "out" / "trips"))["vtype"]) == [0, 0, 1]
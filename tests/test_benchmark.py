@@ -0,0 +1,35 @@
+import argparse
+
+import pytest
+
+import arn_benchmark as bench
+from arn_sumo_integration import TrafficLightSystem
+
+
+def options(**overrides):
+    values = dict(min_time=0.0, min_iterations=3, max_iterations=3, vectorized=False, seed=0)
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+@pytest.mark.parametrize("compact_tree", [False, True])
+def test_run_cycle_applies_every_decision(capsys, compact_tree):
+    results = bench.bench_cycle(16, compact_tree, options())
+    assert [r["benchmark"] for r in results][-1] == "run_cycle"
+    # Aucun avertissement de phase manquante dans la boucle chronométrée
+    assert "pas de phase verte" not in capsys.readouterr().out
+
+    system = bench.make_system(16)
+    for _ in range(5):
+        system.run_cycle(display=False)
+        system.backend.simulationStep()
+    bench.check_applied(system)
+    assert system.backend.set_phases == 5
+
+
+def test_check_applied_rejects_system_without_phases(capsys):
+    lanes = bench.make_lanes(4)
+    system = TrafficLightSystem(lanes, backend=bench.FakeTraCI([l.sumo_edge_id for l in lanes]))
+    system.run_cycle(display=False)
+    with pytest.raises(RuntimeError):
+        bench.check_applied(system)
@@ -0,0 +1,54 @@
+import arn_sumo_integration as arn
+from test_scheduler import Traffic
+
+JUNCTIONS = {"J0": ["J0_a", "J0_b"], "J1": ["J1_a", "J1_b", "J1_c"]}
+PHASES = {"J0": {"J0_a": [0], "J0_b": [2]}, "J1": {"J1_a": [0], "J1_b": [2], "J1_c": [4]}}
+
+
+def controller(backend):
+    backend.end = 200
+    system = arn.NetworkController(JUNCTIONS, phase_table=PHASES, backend=backend)
+    system.subscribe()
+    return system
+
+
+def test_adaptive_run_resumes_where_it_was_saved(tmp_path):
+    prefix = str(tmp_path / "chaud")
+    reference = Traffic()
+    system = controller(reference)
+    scheduler = arn.DecisionScheduler(system, min_green=20)
+    arn.run_scheduled(system, scheduler, max_steps=200, display_every=0)
+
+    first = Traffic()
+    system = controller(first)
+    scheduler = arn.DecisionScheduler(system, min_green=20)
+    arn.run_scheduled(system, scheduler, max_steps=60, display_every=0)
+    arn.save_checkpoint(system, prefix, scheduler)
+
+    resumed = Traffic()
+    system = controller(resumed)
+    scheduler = arn.DecisionScheduler(system, min_green=20)
+    arn.load_checkpoint(system, prefix, scheduler)
+    assert system.step == 60
+    end = arn.run_scheduled(system, scheduler, max_steps=200, display_every=0,
+                            start_step=system.step)
+    assert end == 200
+    # Mêmes échéances et mêmes temps de vert: la suite est celle du run d'un seul tenant
+    assert first.phases + resumed.phases == reference.phases
+
+
+def test_checkpoint_without_scheduler_restarts_it_at_saved_step(tmp_path):
+    prefix = str(tmp_path / "fixe")
+    backend = Traffic()
+    system = controller(backend)
+    arn.run_simulation(system, max_steps=60, cycle_steps=10, display_every=0)
+    arn.save_checkpoint(system, prefix)
+
+    system = controller(Traffic())
+    scheduler = arn.DecisionScheduler(system)
+    arn.load_checkpoint(system, prefix, scheduler)
+    assert system.step == 60
+    assert sorted(scheduler.heap) == [(61, "J0"), (61, "J1")]
+    for tls_id, state in scheduler.state.items():
+        assert state.green_since == state.last_step == 60
+        assert state.green is system.systems[tls_id].current_green
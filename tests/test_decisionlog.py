@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from arn_decisionlog import FLAG_PREEMPTION, DecisionLog, DecisionLogWriter, _decision_keys, diff_logs
+from arn_sumo_integration import Lane, TrafficLightSystem
+from fakes import FakeBackend
+
+# Lecture des journaux seulement
+np = pytest.importorskip("numpy")
+
+EDGES = {"J0": ["a", "b"], "J1": ["c", "d", "e"]}
+
+
+def make_systems():
+    backend = FakeBackend()
+    return {tls_id: TrafficLightSystem([Lane(edge, edge) for edge in edges], tls_id=tls_id,
+                                       backend=backend)
+            for tls_id, edges in EDGES.items()}
+
+
+def write_log(path, decisions):
+    """decisions: [(pas, carrefour, tronçon vert, préemption)]"""
+    systems = make_systems()
+    writer = DecisionLogWriter(str(path), systems)
+    for step, tls_id, edge, preemption in decisions:
+        system = systems[tls_id]
+        system.current_green = system.edge_to_lane[edge]
+        writer.step = step
+        writer.append(system, preemption=preemption)
+    writer.close()
+    return DecisionLog(str(path))
+
+
+RUN = [(10, "J0", "a", False), (10, "J1", "c", False), (20, "J0", "b", False),
+       (20, "J1", "d", False), (30, "J0", "a", False), (30, "J1", "e", False)]
+
+
+def test_identical_logs(tmp_path):
+    with write_log(tmp_path / "a.arnlog", RUN) as a, write_log(tmp_path / "b.arnlog", RUN) as b:
+        assert diff_logs(a, b) == {"common": 6, "only_a": 0, "only_b": 0, "chosen_differs": 0,
+                                   "max_score_delta": 0.0, "first_divergence": None}
+
+
+def test_first_divergence(tmp_path):
+    other = list(RUN)
+    other[3] = (20, "J1", "e", False)
+    other[5] = (30, "J1", "c", False)
+    with write_log(tmp_path / "a.arnlog", RUN) as a, write_log(tmp_path / "b.arnlog", other) as b:
+        result = diff_logs(a, b)
+    assert result["chosen_differs"] == 2
+    assert result["first_divergence"] == {"step": 20, "junction": "J1", "a": "d", "b": "e"}
+
+
+def test_preemption_and_cycle_at_same_step(tmp_path):
+    # Préemption de J0 au pas 20 puis décision de cycle au même pas
+    preempted = RUN[:2] + [(20, "J0", "a", True)] + RUN[2:]
+    with write_log(tmp_path / "a.arnlog", preempted) as a:
+        keys = _decision_keys(a)
+        assert len(np.unique(keys)) == len(keys)
+        assert keys[3] == keys[2] + 1
+        assert a.records["flags"][2] == FLAG_PREEMPTION
+        with write_log(tmp_path / "b.arnlog", RUN) as b:
+            result = diff_logs(a, b)
+    # Rangs dans le pas: la préemption de a est appariée au cycle de b, le cycle de a reste seul
+    assert (result["common"], result["only_a"], result["only_b"]) == (6, 1, 0)
+    assert result["first_divergence"] == {"step": 20, "junction": "J0", "a": "a", "b": "b"}
+
+
+def test_truncated_tail_is_ignored(tmp_path):
+    path = tmp_path / "a.arnlog"
+    write_log(path, RUN).close()
+    os.truncate(path, os.path.getsize(path) - 3)
+    with DecisionLog(str(path)) as truncated, write_log(tmp_path / "b.arnlog", RUN) as b:
+        assert len(truncated) == 5
+        result = diff_logs(truncated, b)
+    assert (result["common"], result["only_a"], result["only_b"]) == (5, 0, 1)
+    assert result["chosen_differs"] == 0
+
+
+def test_logs_of_different_networks_are_rejected(tmp_path):
+    with write_log(tmp_path / "a.arnlog", RUN) as a, write_log(tmp_path / "b.arnlog", RUN) as b:
+        b.lanes = {"J0": ["a", "b"], "J1": ["c", "d"]}
+        with pytest.raises(ValueError):
+            diff_logs(a, b)
@@ -0,0 +1,58 @@
+import arn_sumo_integration as arn
+from fakes import FakeBackend
+
+PHASES = {"center": {"NtoC": [0], "StoC": [0], "EtoC": [2], "WtoC": [2]}}
+
+
+def make_watcher():
+    backend = FakeBackend()
+    controller = arn.NetworkController({"center": ["NtoC", "StoC", "EtoC", "WtoC"]},
+                                       phase_table=PHASES, backend=backend, history_size=0)
+    return backend, controller.systems["center"], arn.EmergencyWatcher(controller)
+
+
+def step(backend, watcher, departed=()):
+    backend.departed = list(departed)
+    watcher.step(backend.arrived)
+    backend.arrived = []
+
+
+def test_hold_passes_to_second_vehicle_on_same_approach():
+    backend, system, watcher = make_watcher()
+    backend.put("EtoC", "ambulance_1")
+    step(backend, watcher, ["ambulance_1"])
+    backend.put("EtoC", "ambulance_2")
+    step(backend, watcher, ["ambulance_2"])
+    assert watcher.holds == {"center": "ambulance_1"}
+
+    # La première ambulance franchit le carrefour: la seconde, toujours sur EtoC, reprend la réserve
+    backend.put("CtoW", "ambulance_1")
+    step(backend, watcher)
+    assert watcher.holds == {"center": "ambulance_2"}
+    assert system.emergency_hold is system.edge_to_lane["EtoC"]
+    assert backend.phases == [("center", 2)]  # le vert était déjà sur EtoC
+
+
+def test_hold_passes_to_vehicle_on_other_approach_after_arrival():
+    backend, system, watcher = make_watcher()
+    backend.put("EtoC", "ambulance_1")
+    backend.put("NtoC", "ambulance_2")
+    step(backend, watcher, ["ambulance_1", "ambulance_2"])
+    holder = watcher.holds["center"]
+    other = "ambulance_2" if holder == "ambulance_1" else "ambulance_1"
+
+    backend.remove(holder)
+    backend.arrived = [holder]
+    step(backend, watcher)
+    assert watcher.holds == {"center": other}
+    assert watcher.preemptions == 2
+    assert system.current_green is system.edge_to_lane[backend._road(other)]
+
+
+def test_hold_cleared_when_last_vehicle_leaves():
+    backend, system, watcher = make_watcher()
+    backend.put("WtoC", "ambulance_1")
+    step(backend, watcher, ["ambulance_1"])
+    backend.put("CtoE", "ambulance_1")
+    step(backend, watcher)
+    assert watcher.holds == {} and system.emergency_hold is None
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+import arn_sumo_integration as arn
+
+
+def least_squares_slope(values):
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x, mean_y = (n - 1) / 2, sum(values) / n
+    num = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    return num / sum((x - mean_x) ** 2 for x in range(n))
+
+
+@pytest.mark.parametrize("capacity", [1, 2, 5, 16])
+def test_ring_matches_brute_force_across_wraps(capacity):
+    rng = random.Random(capacity)
+    ring = arn.MetricRing(capacity)
+    appended = []
+    assert ring.mean() == ring.max() == ring.trend() == 0.0
+    # Plusieurs tours complets: les sommes sont recalculées à chaque retour en tête
+    for _ in range(capacity * 7 + 3):
+        appended.append(rng.choice([0.0, rng.uniform(0, 100)]))
+        ring.append(appended[-1])
+        window = appended[-capacity:]
+        assert ring.window() == window and len(ring) == len(window)
+        assert ring.mean() == pytest.approx(sum(window) / len(window))
+        assert ring.max() == max(window)
+        assert ring.trend() == pytest.approx(least_squares_slope(window), abs=1e-9)
+    assert ring.count == len(appended) and ring.peak == max(appended)
+    assert ring.run_mean() == pytest.approx(sum(appended) / len(appended))
+
+
+def test_trend_sign_and_max_after_eviction():
+    ring = arn.MetricRing(4)
+    for value in (9, 1, 2, 3, 4):
+        ring.append(value)
+    # 9 est sorti de la fenêtre: il ne compte plus pour max/trend, mais reste le pic du run
+    assert ring.window() == [1, 2, 3, 4]
+    assert ring.max() == 4 and ring.trend() == pytest.approx(1.0) and ring.peak == 9
+    for value in (3, 2, 1):
+        ring.append(value)
+    assert ring.trend() < 0
+
+
+def test_ring_state_round_trip():
+    ring = arn.MetricRing(3)
+    for value in (5, 7, 1, 8, 2):
+        ring.append(value)
+    restored = arn.MetricRing(3)
+    restored.load_state_dict(ring.state_dict())
+    assert restored.window() == ring.window()
+    assert (restored.mean(), restored.max(), restored.trend()) == (ring.mean(), ring.max(), ring.trend())
+    assert (restored.total, restored.count, restored.peak) == (ring.total, ring.count, ring.peak)
+    restored.append(9)
+    ring.append(9)
+    assert restored.window() == ring.window() and restored.max() == ring.max()
+
+
+def test_negative_history_is_rejected():
+    with pytest.raises(SystemExit):
+        arn.parse_args(["--history", "-1"])
+    assert arn.parse_args(["--history", "0"]).history == 0
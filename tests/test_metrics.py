@@ -0,0 +1,49 @@
+import json
+
+import arn_sumo_integration as arn
+from arn_metrics import CountingBackend, Histogram, Metrics
+from fakes import FakeBackend
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = Histogram((1, 10, 100))
+    for value in (0.5, 1, 5, 50, 500):
+        histogram.observe(value)
+    assert list(histogram.counts) == [2, 1, 1, 1]
+    assert histogram.percentile(40) == 1 and histogram.percentile(60) == 10
+    assert histogram.percentile(100) == float("inf")
+    assert Histogram().percentile(50) == 0.0
+
+
+def test_counting_backend_counts_calls_but_not_subscription_reads():
+    backend = FakeBackend()
+    backend.edge.getSubscriptionResults = lambda edge_id: {}
+    counting = CountingBackend(backend)
+    assert counting.TraCIException is FakeBackend.TraCIException
+    counting.edge.getLastStepVehicleNumber("NtoC")
+    counting.edge.getSubscriptionResults("NtoC")
+    counting.simulationStep()
+    assert counting.calls == 2
+
+
+def test_cycle_metrics_and_prometheus_export(tmp_path):
+    backend = CountingBackend(FakeBackend())
+    path = tmp_path / "metrics.prom"
+    metrics = Metrics(backend, str(path), "prometheus", export_every=3600)
+    system = arn.build_default_system(backend, {})
+    system.instrument(metrics)
+    system.run_cycle(display=False)  # 4 tronçons x 4 appels + setPhase (repli "center")
+    metrics.end_cycle()
+    metrics.error("measure_traci")
+    metrics.export()
+
+    text = path.read_text()
+    assert 'arn_stage_seconds_count{stage="update_traffic_data"} 1' in text
+    assert "arn_traci_calls_per_cycle_sum 17.000000" in text
+    assert 'arn_errors_total{kind="measure_traci"} 1' in text
+
+    metrics = Metrics(backend, str(tmp_path / "metrics.jsonl"), "jsonl")
+    metrics.export()
+    metrics.export()
+    lines = (tmp_path / "metrics.jsonl").read_text().splitlines()
+    assert len(lines) == 2 and json.loads(lines[0])["traci_calls_total"] == 17
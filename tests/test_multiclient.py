@@ -0,0 +1,70 @@
+import arn_sumo_integration as arn
+from arn_multiclient import client_path, client_tables, net_file_from_config, print_multiclient_statistics
+from arn_pipeline import partition_junctions
+from fakes import FakeBackend
+from setup_sumo import create_config
+
+
+def test_net_file_is_relative_to_config(tmp_path):
+    config = tmp_path / "cas" / "grille.sumocfg"
+    config.parent.mkdir()
+    create_config(str(config), "grille.net.xml,extra.net.xml", "grille.rou.xml")
+    assert net_file_from_config(str(config)) == str(tmp_path / "cas" / "grille.net.xml")
+
+
+def test_config_without_net_file(tmp_path):
+    config = tmp_path / "vide.sumocfg"
+    config.write_text("<configuration><input/></configuration>")
+    try:
+        net_file_from_config(str(config))
+    except ValueError as e:
+        assert "net-file" in str(e)
+    else:
+        raise AssertionError("ValueError attendue")
+
+
+def test_client_path():
+    assert client_path("metrics.prom", 2) == "metrics.2.prom"
+    assert client_path("out/decisions.arnlog", 0) == "out/decisions.0.arnlog"
+    assert client_path("journal", 1) == "journal.1"
+
+
+def test_client_tables_slice_junctions_and_phases():
+    junctions = {"A": ["a1", "a2", "a3"], "B": ["b1"], "C": ["c1", "c2"]}
+    phases = {"A": {"a1": [0]}, "C": {"c1": [2]}}
+    groups = partition_junctions({tls_id: len(edges) for tls_id, edges in junctions.items()}, 2)
+    tables = client_tables(junctions, phases, groups)
+    assert len(tables) == 2
+    # Chaque carrefour dans un seul client, avec ses tronçons; B n'a pas de phases connues
+    merged = {}
+    for client_junctions, client_phases in tables:
+        assert set(client_phases) <= set(client_junctions)
+        assert all(client_phases[tls_id] == phases[tls_id] for tls_id in client_phases)
+        merged.update(client_junctions)
+    assert merged == junctions
+    assert sum(len(client_phases) for _, client_phases in tables) == 2
+
+
+def test_statistics_merge_client_states(capsys):
+    junctions = {"J0": ["J0_a", "J0_b"], "J1": ["J1_a"], "J2": ["J2_a", "J2_b"]}
+    backend = FakeBackend()
+    for i, edge in enumerate(("J0_a", "J1_a", "J2_a", "J2_b")):
+        for k in range(i + 1):
+            backend.put(edge, f"veh_{edge}_{k}")
+        backend.waiting[edge] = 10.0 * (i + 1)
+    reference = arn.NetworkController(junctions, backend=backend)
+    arn.run_simulation(reference, max_steps=30, cycle_steps=10, display_every=0)
+    capsys.readouterr()
+    arn.print_final_statistics(reference, 30, 1.0)
+    expected = capsys.readouterr().out
+
+    rows = []
+    for client, group in enumerate((["J0", "J2"], ["J1"])):
+        rows.append({"client": client, "cycles": reference.cycle_count, "step": 30 - client,
+                     "preemptions": 0, "decisions": 0, "metrics": "", "error": "",
+                     "junctions": {tls_id: reference.systems[tls_id].state_dict() for tls_id in group}})
+    print_multiclient_statistics(junctions, {}, rows, 3, 1.0)
+    out = capsys.readouterr().out
+    # Bilan du réseau entier identique à celui d'un seul contrôleur
+    assert expected in out
+    assert "1 client(s) sans résultat" in out
@@ -0,0 +1,18 @@
+from arn_sumo_integration import NetworkController
+from fakes import FakeBackend
+
+
+def test_controller_shares_one_vehicle_class_cache():
+    backend = FakeBackend()
+    controller = NetworkController({"A": ["a1", "a2"], "B": ["b1"], "C": []}, backend=backend)
+    assert set(controller.systems) == {"A", "B"}
+    assert all(system.vehicle_classes is controller.vehicle_classes
+               for system in controller.systems.values())
+
+    # Un bus vu par A est classé une seule fois, puis reconnu par B sans getTypeID
+    backend.put("a1", "bus_1", "bus")
+    controller.update_traffic_data()
+    backend.put("b1", "bus_1", "bus")
+    controller.update_traffic_data()
+    assert backend.calls["type"] == 1
+    assert controller.systems["B"].lanes[0].has_bus
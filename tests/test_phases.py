@@ -0,0 +1,74 @@
+import os
+import xml.etree.ElementTree as ET
+
+from arn_sumo_integration import (Lane, TrafficLightSystem, build_phase_table_from_net,
+                                  discover_junctions_from_net)
+from setup_sumo import create_grid, grid_edge_id
+from fakes import FakeBackend
+
+
+def make_system(backend, tls_id="center", green_phases=None):
+    lanes = [Lane(edge, edge) for edge in ("NtoC", "StoC", "EtoC", "WtoC", "XtoC")]
+    return TrafficLightSystem(lanes, tls_id=tls_id, green_phases=green_phases, backend=backend)
+
+
+def test_phase_table_wins():
+    backend = FakeBackend()
+    system = make_system(backend, green_phases={"NtoC": [4, 6]})
+    system.current_green = system.edge_to_lane["NtoC"]
+    system.apply_green_to_sumo(verbose=False)
+    assert backend.phases == [("center", 4)]
+
+
+def test_legacy_fallback_only_for_center():
+    backend = FakeBackend()
+    system = make_system(backend)
+    for edge in ("NtoC", "EtoC"):
+        system.current_green = system.edge_to_lane[edge]
+        system.apply_green_to_sumo(verbose=False)
+    assert backend.phases == [("center", 0), ("center", 2)]
+
+    other = make_system(backend, tls_id="J7")
+    other.current_green = other.edge_to_lane["NtoC"]
+    other.apply_green_to_sumo(verbose=False)
+    assert backend.phases == [("center", 0), ("center", 2)]
+    assert other.unmapped_edges == {"NtoC"}
+
+
+def test_unmapped_edge_is_skipped_and_reported_once(capsys):
+    backend = FakeBackend()
+    system = make_system(backend)
+    system.current_green = system.edge_to_lane["XtoC"]
+    system.apply_green_to_sumo(verbose=False)
+    system.apply_green_to_sumo(verbose=False)
+    assert backend.phases == []
+    assert capsys.readouterr().out.count("pas de phase verte pour XtoC") == 1
+
+
+def test_phase_table_from_net_file():
+    net_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "mon_reseau.net.xml")
+    assert build_phase_table_from_net(net_file) == {
+        "center": {"NtoC": [0], "StoC": [0], "EtoC": [2], "WtoC": [2]},
+    }
+
+
+def test_phase_table_from_generated_grid(tmp_path):
+    create_grid(2, 3, str(tmp_path / "grille"))
+    net_file = str(tmp_path / "grille.net.xml")
+    # 4 entrants par carrefour + un sortant vers chaque impasse (2×2 + 2×3), sans doublon
+    edge_ids = [elem.get("id") for elem in ET.parse(net_file).getroot().iter("edge")]
+    assert len(edge_ids) == len(set(edge_ids)) == 4 * 2 * 3 + 2 * 2 + 2 * 3
+    table = build_phase_table_from_net(net_file)
+    junctions = discover_junctions_from_net(net_file)
+    assert sorted(table) == sorted(junctions) == [f"J{i}_{j}" for i in range(2) for j in range(3)]
+
+    # Coin sud-ouest: voisins J1_0 au nord, J0_1 à l'est, impasses S0 et W0
+    north, south = grid_edge_id("J1_0", "J0_0"), grid_edge_id("S0", "J0_0")
+    east, west = grid_edge_id("J0_1", "J0_0"), grid_edge_id("W0", "J0_0")
+    assert junctions["J0_0"] == [north, south, east, west]
+    assert table["J0_0"] == {north: [0], south: [0], east: [2], west: [2]}
+    # Aucune phase orange; chaque tronçon entrant a sa phase verte
+    for tls_id, edges in junctions.items():
+        assert set(table[tls_id]) == set(edges)
+        assert all(phases in ([0], [2]) for phases in table[tls_id].values())
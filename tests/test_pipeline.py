@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+import arn_sumo_integration as arn
+from arn_pipeline import DecisionPool, Reporter, partition_junctions
+from fakes import FakeBackend
+
+
+def test_partition_balances_lane_counts():
+    counts = {"A": 8, "B": 7, "C": 6, "D": 5, "E": 4, "F": 2}
+    groups = partition_junctions(counts, 3)
+    assert sorted(tls for group in groups for tls in group) == sorted(counts)
+    assert sorted(sum(counts[tls] for tls in group) for group in groups) == [10, 11, 11]
+    assert groups == partition_junctions(counts, 3)
+
+
+def test_partition_never_returns_empty_groups():
+    assert partition_junctions({"A": 4, "B": 4}, 5) == [["A"], ["B"]]
+    assert partition_junctions({"A": 4}, 0) == [["A"]]
+    assert partition_junctions({}, 3) == []
+
+
+def make_controller(vectorized=False):
+    junctions = {f"J{i}": [f"J{i}_{k}" for k in range(3 + i % 3)] for i in range(6)}
+    return arn.NetworkController(junctions, backend=FakeBackend(), vectorized=vectorized,
+                                 history_size=0)
+
+
+def random_scores(controller, rng):
+    for system in controller.systems.values():
+        for lane in system.lanes:
+            if rng.random() < 0.5:
+                lane.priority_score = float(rng.randint(0, 4))
+
+
+@pytest.mark.parametrize("mode", ["process", "thread"])
+def test_pool_matches_serial_decisions(mode):
+    serial, pooled = make_controller(), make_controller()
+    pool = DecisionPool(pooled.systems, 3, mode)
+    rng = random.Random(11)
+    try:
+        for _ in range(30):
+            state = rng.getstate()
+            random_scores(serial, rng)
+            rng.setstate(state)
+            random_scores(pooled, rng)
+            for system in serial.systems.values():
+                system.choose_green()
+            pool.choose(pooled.systems)
+            assert ({tls: s.current_green.sumo_edge_id for tls, s in pooled.systems.items()} ==
+                    {tls: s.current_green.sumo_edge_id for tls, s in serial.systems.items()})
+    finally:
+        pool.close()
+
+
+def test_process_pool_detaches_main_tree_and_sends_changes_only():
+    controller = make_controller()
+    pool = DecisionPool(controller.systems, 2)
+    try:
+        system = controller.systems["J0"]
+        system.lanes[1].priority_score = 5.0
+        changes = {tls: pool._changes(s) for tls, s in controller.systems.items()}
+        assert len(changes["J0"]) == len(system.lanes)  # premier envoi: toutes les lignes
+        assert {tls: pool._changes(s) for tls, s in controller.systems.items()}["J0"] == []
+
+        system.lanes[2].priority_score = 9.0
+        pool.choose(controller.systems)
+        assert system.current_green is system.lanes[2]
+        # L'ARN local n'est ni rempli ni consulté
+        system.rebuild_priority_tree()
+        assert system.remote_tree and len(system.rbt) == 0
+        assert system.get_lane_rank(system.lanes[2]) is None
+        assert system.status_snapshot()[2][0][2] == system.lanes[2].name
+    finally:
+        pool.close()
+
+
+def test_vectorized_process_pool():
+    controller = make_controller(vectorized=True)
+    pool = DecisionPool(controller.systems, 2)
+    try:
+        system = controller.systems["J1"]
+        system.table.priority_score[3] = 4.0
+        pool.choose(controller.systems)
+        assert system.current_green is system.lanes[3]
+        system.table.priority_score[0] = 6.0
+        assert pool._changes(system) == [(0, 6.0)]
+    finally:
+        pool.close()
+
+
+def test_adaptive_rejects_decision_workers():
+    with pytest.raises(SystemExit):
+        arn.parse_args(["--auto-discover", "--adaptive", "--decision-workers", "2"])
+    assert arn.parse_args(["--decision-workers", "2"]).decision_pool == "process"
+
+
+def test_reporter_drops_when_full(capsys):
+    reporter = Reporter(maxsize=1)
+    reporter.queue.put("occupe")  # file pleine tant que le thread n'a rien lu
+    accepted = [reporter.submit(lambda: "message") for _ in range(50)]
+    reporter.close()
+    assert reporter.dropped == accepted.count(False)
+    assert "occupe" in capsys.readouterr().out
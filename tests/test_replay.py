@@ -0,0 +1,77 @@
+import pytest
+
+import arn_sumo_integration as arn
+from arn_replay import ReplayBackend, ReplayError
+
+EDGE_DATA = """<meandata>
+    <interval begin="0.00" end="10.00" id="ed">
+        <edge id="NtoC" sampledSeconds="40" waitingTime="20" timeLoss="25"/>
+        <edge id="EtoC" sampledSeconds="0" waitingTime="0" timeLoss="0"/>
+    </interval>
+    <interval begin="10.00" end="20.00" id="ed">
+        <edge id="NtoC" sampledSeconds="20" waitingTime="10" timeLoss="12"/>
+        <edge id="EtoC" sampledSeconds="30" waitingTime="0" timeLoss="3"/>
+    </interval>
+</meandata>
+"""
+
+# ambulance_1: départ 2 s sur EtoC, 6 s de roulage dont 2 d'attente -> quitte EtoC à 6 s
+TRIPINFO = """<tripinfos>
+    <tripinfo id="ambulance_1" vType="emergency" depart="2.00" departLane="EtoC_0" arrival="8.00"
+              duration="6.00" waitingTime="2.00"/>
+    <tripinfo id="bus_1" vType="bus" depart="3.00" departLane="NtoC_0" arrival="19.00"
+              duration="16.00" waitingTime="10.00"/>
+</tripinfos>
+"""
+
+
+@pytest.fixture
+def replay(tmp_path):
+    (tmp_path / "edge_data.xml").write_text(EDGE_DATA)
+    (tmp_path / "tripinfo.xml").write_text(TRIPINFO)
+    return ReplayBackend(str(tmp_path / "edge_data.xml"), str(tmp_path / "tripinfo.xml"))
+
+
+def test_edge_values_follow_intervals(replay):
+    replay.simulationStep()
+    assert replay.edge.getLastStepVehicleNumber("NtoC") == 4
+    assert replay.edge.getLastStepHaltingNumber("NtoC") == 2
+    assert replay.edge.getWaitingTime("NtoC") == 20.0
+    replay.simulationStep(15.0)
+    assert replay.simulation.getTime() == 15.0
+    assert replay.edge.getLastStepVehicleNumber("EtoC") == 3
+    # Attente cumulée tant que la file ne se vide pas
+    assert replay.edge.getWaitingTime("NtoC") == 30.0
+    assert replay.edge.getWaitingTime("EtoC") == 0.0
+    with pytest.raises(ReplayError):
+        replay.edge.getWaitingTime("XtoC")
+
+
+def test_vehicle_events(replay):
+    seen = {}
+    while replay.simulation.getMinExpectedNumber() > 0:
+        replay.simulationStep()
+        seen[replay.time] = (replay.simulation.getDepartedIDList(),
+                             replay.simulation.getArrivedIDList(),
+                             replay.vehicle.getRoadID("ambulance_1"))
+    assert seen[2.0][0] == ["ambulance_1"] and seen[2.0][2] == "EtoC"
+    assert seen[5.0][2] == "EtoC" and seen[6.0][2] == ""
+    assert seen[8.0][1] == ["ambulance_1"]
+    assert replay.time == 19.0 and replay.vehicle.getTypeID("bus_1") == "bus"
+    with pytest.raises(ReplayError):
+        replay.vehicle.getTypeID("inconnu")
+
+
+def test_controller_on_replay_records_decisions(replay, tmp_path):
+    system = arn.build_default_system(replay, {"NtoC": [0], "StoC": [0], "EtoC": [2], "WtoC": [2]})
+    watcher = arn.EmergencyWatcher(system)
+    assert arn.run_simulation(system, max_steps=20, cycle_steps=5, display_every=0,
+                              watcher=watcher) == 20
+    # L'ambulance obtient le vert dès son départ (t=2), puis les cycles décident
+    assert replay.decisions[0] == (2.0, "center", 2)
+    assert watcher.preemptions == 1 and system.emergency_hold is None
+    assert len(replay.decisions) == 1 + system.cycle_count
+
+    path = tmp_path / "decisions.csv"
+    replay.save_decisions(str(path))
+    assert path.read_text().splitlines()[:2] == ["time,tls_id,phase", "2.0,center,2"]
@@ -0,0 +1,42 @@
+import pytest
+
+from arn_sumo_integration import (DecisionScheduler, Lane, TrafficLightSystem, run_scheduled,
+                                  run_simulation)
+from fakes import FakeBackend
+
+
+class Interrupted(FakeBackend):
+    """Ctrl-C pendant le pas `stop`"""
+    def __init__(self, stop: int):
+        super().__init__()
+        self.stop = stop
+
+    def simulationStep(self):
+        if self.time + 1 == self.stop:
+            raise KeyboardInterrupt
+        super().simulationStep()
+
+
+def make_system(backend):
+    lanes = [Lane(edge, edge) for edge in ("NtoC", "StoC", "EtoC", "WtoC")]
+    return TrafficLightSystem(lanes, backend=backend)
+
+
+def test_run_simulation_returns_and_keeps_step():
+    backend = FakeBackend()
+    backend.end = 25
+    system = make_system(backend)
+    assert run_simulation(system, max_steps=100, cycle_steps=10, display_every=0) == 30
+    assert system.step == 30 and system.cycle_count == 3
+
+
+def test_step_survives_interruption():
+    system = make_system(Interrupted(stop=24))
+    with pytest.raises(KeyboardInterrupt):
+        run_simulation(system, max_steps=100, cycle_steps=10, display_every=0)
+    assert system.step == 23 and system.cycle_count == 2
+
+    system = make_system(Interrupted(stop=24))
+    with pytest.raises(KeyboardInterrupt):
+        run_scheduled(system, DecisionScheduler(system), max_steps=100, display_every=0)
+    assert system.step == 23
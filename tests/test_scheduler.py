@@ -0,0 +1,47 @@
+import arn_sumo_integration as arn
+from fakes import FakeBackend
+
+
+class Traffic(FakeBackend):
+    """J0 reçoit une file à partir du pas 50, J1 reste vide"""
+    def simulationStep(self):
+        super().simulationStep()
+        if self.time == 50:
+            for i in range(4):
+                self.put("J0_a", f"veh_{i}")
+
+
+def run(unsubscribe_idle: bool):
+    backend = Traffic()
+    backend.end = 200
+    junctions = {"J0": ["J0_a", "J0_b"], "J1": ["J1_a", "J1_b", "J1_c"]}
+    phases = {"J0": {"J0_a": [0], "J0_b": [2]}, "J1": {"J1_a": [0], "J1_b": [2], "J1_c": [4]}}
+    controller = arn.NetworkController(junctions, phase_table=phases, backend=backend)
+    controller.subscribe()
+    scheduler = arn.DecisionScheduler(controller, unsubscribe_idle=unsubscribe_idle)
+    arn.run_scheduled(controller, scheduler, max_steps=200, display_every=0)
+    return backend, controller, scheduler
+
+
+def test_idle_junctions_are_unsubscribed_and_resubscribed():
+    backend, controller, scheduler = run(unsubscribe_idle=True)
+    # J0 réabonné quand sa file s'est formée, J1 resté vide et désabonné
+    assert scheduler.idle == {"J1"}
+    assert controller.systems["J0"].use_subscriptions
+    assert not controller.systems["J1"].use_subscriptions
+    assert backend.subscribed == {"J0_a", "J0_b"}
+
+    reference, _, reference_scheduler = run(unsubscribe_idle=False)
+    assert backend.pushed < reference.pushed / 3
+    # Mêmes mesures, donc mêmes décisions
+    assert backend.phases == reference.phases
+    assert scheduler.decisions == reference_scheduler.decisions
+
+
+def test_only_due_junctions_are_measured():
+    backend = FakeBackend()
+    controller = arn.NetworkController({"J0": ["a"], "J1": ["b"]}, backend=backend)
+    scheduler = arn.DecisionScheduler(controller)
+    assert scheduler.tick(1) == 2
+    calls = backend.calls["vehicles"]
+    assert scheduler.tick(2) == 0 and backend.calls["vehicles"] == calls
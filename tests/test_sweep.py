@@ -0,0 +1,67 @@
+import pytest
+
+import arn_sumo_integration as arn
+import arn_sweep
+from arn_sumo_integration import ScoreWeights
+from fakes import FakeBackend
+
+TRIPINFO = """<tripinfos>
+    <tripinfo id="veh_1" vType="car" duration="50" waitingTime="10" timeLoss="12"/>
+    <tripinfo id="ambulance_1" vType="car" duration="30" waitingTime="0" timeLoss="4"/>
+</tripinfos>
+"""
+
+
+def test_grid_and_random_configs():
+    configs = arn_sweep.grid_configs({"vehicles": [0.5, 1.0], "emergency": [50.0]}, [15, 30])
+    assert [config.run_id for config in configs] == [0, 1, 2, 3]
+    assert configs[0].weights == ScoreWeights(vehicles=0.5, emergency=50.0)
+    assert [config.cycle_steps for config in configs] == [15, 30, 15, 30]
+    assert arn_sweep.random_configs(5, [30], seed=1) == arn_sweep.random_configs(5, [30], seed=1)
+
+
+def test_parse_grid_rejects_unknown_weight():
+    assert arn_sweep._parse_grid(["bus=1,2"]) == {"bus": [1.0, 2.0]}
+    with pytest.raises(ValueError):
+        arn_sweep._parse_grid(["speed=1"])
+
+
+def test_tripinfo_kpis(tmp_path):
+    path = tmp_path / "tripinfo.xml"
+    path.write_text(TRIPINFO)
+    kpis = arn_sweep.tripinfo_kpis(str(path))
+    assert kpis["trips"] == 2 and kpis["mean_waiting_time"] == 5.0
+    assert kpis["emergency_trips"] == 1 and kpis["emergency_max_delay"] == 4.0
+
+
+class SweepBackend(FakeBackend):
+    """SUMO factice pour run_configuration: une ambulance sur WtoC dès le départ"""
+    def __init__(self):
+        super().__init__()
+        self.end = 60
+        self.closed = False
+        self.put("WtoC", "ambulance_1")
+        self.departed = ["ambulance_1"]
+
+    def start(self, cmd, label=None):
+        with open(cmd[cmd.index("--tripinfo-output") + 1], "w") as f:
+            f.write(TRIPINFO)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("preemption", [True, False])
+def test_run_configuration_preempts(tmp_path, monkeypatch, preemption):
+    backend = SweepBackend()
+    monkeypatch.setattr(arn, "load_backend", lambda name: backend)
+    monkeypatch.setattr(arn.NetworkController, "from_traci", classmethod(
+        lambda cls, traci, **kwargs: cls({"center": ["NtoC", "StoC", "EtoC", "WtoC"]},
+                                         backend=traci, **kwargs)))
+    monkeypatch.setattr(arn.NetworkController, "subscribe", lambda self: None)
+
+    config = arn_sweep.SweepConfig(0, ScoreWeights(), 30)
+    row = arn_sweep.run_configuration(config, "x.sumocfg", 60, str(tmp_path), preemption=preemption)
+    assert row["error"] == "" and backend.closed
+    assert row["steps"] == 60 and row["trips"] == 2
+    assert row["preemptions"] == (1 if preemption else 0)
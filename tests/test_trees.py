@@ -0,0 +1,195 @@
+import random
+
+import arn_sumo_integration as arn
+from arn_sumo_integration import CompactRedBlackTree, Lane, RedBlackTree, TrafficLightSystem
+
+
+def make_lanes(n: int):
+    return [Lane(f"Voie {i}", f"E{i}") for i in range(n)]
+
+
+def test_ties_keep_last_lane_in_list_order():
+    """Comme la reconstruction complète d'origine: à score égal, la dernière voie de la liste gagne"""
+    lanes = make_lanes(4)
+    tree = RedBlackTree()
+    nodes = [tree.insert(5.0, lane) for lane in lanes]
+    assert tree.find_maximum().lane is lanes[-1]
+
+    # Une voie plus ancienne rejoint l'égalité: elle ne passe pas devant
+    tree.update_key(nodes[0], 9.0)
+    tree.update_key(nodes[0], 5.0)
+    assert tree.find_maximum().lane is lanes[-1]
+    assert [node.lane for node in tree.top_k(4)] == lanes[::-1]
+
+
+def test_incremental_matches_rebuild_on_ties():
+    """Décisions identiques à un ARN reconstruit à chaque cycle, scores entiers (égalités fréquentes)"""
+    rng = random.Random(7)
+    lanes = make_lanes(6)
+    system = TrafficLightSystem(lanes, history_size=0)
+    for _ in range(200):
+        for lane in lanes:
+            lane.priority_score = float(rng.randint(0, 3))
+        system.rebuild_priority_tree()
+
+        reference = RedBlackTree()
+        for lane in lanes:
+            reference.insert(lane.priority_score, lane)
+        assert system.get_next_green_light() is reference.find_maximum().lane
+        assert system.get_top_lanes(6) == [node.lane for node in reference.top_k(6)]
+
+
+def test_clear_restarts_insertion_order():
+    lanes = make_lanes(3)
+    tree = RedBlackTree()
+    for lane in lanes:
+        tree.insert(1.0, lane)
+    tree.clear()
+    for lane in reversed(lanes):
+        tree.insert(1.0, lane)
+    assert tree.find_maximum().lane is lanes[0]
+
+
+def check_invariants(tree: RedBlackTree):
+    """Propriétés rouge-noir, tailles des sous-arbres et maximum mis en cache"""
+    nil = tree.NIL
+    assert tree.root is nil or tree.root.color == arn.Color.BLACK
+
+    def walk(node):
+        if node is nil:
+            return 1, 0, []
+        if node.color == arn.Color.RED:
+            assert node.left.color == arn.Color.BLACK and node.right.color == arn.Color.BLACK
+        for child in (node.left, node.right):
+            assert child is nil or child.parent is node
+        left_black, left_size, left_keys = walk(node.left)
+        right_black, right_size, right_keys = walk(node.right)
+        assert left_black == right_black
+        assert node.size == left_size + right_size + 1
+        black = left_black + (node.color == arn.Color.BLACK)
+        return black, node.size, left_keys + [(node.priority_score, node.order)] + right_keys
+
+    _, size, keys = walk(tree.root)
+    assert size == len(tree)
+    assert keys == sorted(keys)
+    if keys:
+        assert (tree.max_node.priority_score, tree.max_node.order) == keys[-1]
+    else:
+        assert tree.max_node is None
+
+
+def test_random_operations_keep_invariants():
+    rng = random.Random(42)
+    tree = RedBlackTree()
+    nodes = {}
+    for step in range(1500):
+        action = rng.random()
+        if action < 0.4 or not nodes:
+            lane = Lane(f"Voie {step}", f"E{step}")
+            nodes[lane.sumo_edge_id] = tree.insert(float(rng.randint(0, 20)), lane)
+        elif action < 0.8:
+            node = rng.choice(list(nodes.values()))
+            tree.update_key(node, float(rng.randint(0, 20)))
+        else:
+            node = nodes.pop(rng.choice(list(nodes)))
+            tree.delete(node)
+        if step % 25 == 0:
+            check_invariants(tree)
+    check_invariants(tree)
+
+    # top_k et rank contre un tri de référence (score puis rang d'insertion, décroissants)
+    expected = sorted(nodes.values(), key=lambda node: (node.priority_score, node.order),
+                      reverse=True)
+    assert tree.top_k(len(expected) + 5) == expected
+    assert tree.top_k(3) == expected[:3]
+    for position, node in enumerate(expected, 1):
+        assert tree.rank(node) == position
+
+
+def test_update_key_reports_changes():
+    tree = RedBlackTree()
+    node = tree.insert(3.0, Lane("Nord", "NtoC"))
+    assert not tree.update_key(node, 3.0)
+    assert tree.update_key(node, 4.0)
+    assert tree.find_maximum() is node and tree.rank(node) == 1
+
+
+def test_delete_down_to_empty():
+    tree = RedBlackTree()
+    nodes = [tree.insert(float(i % 3), lane) for i, lane in enumerate(make_lanes(10))]
+    for node in nodes:
+        tree.delete(node)
+        check_invariants(tree)
+    assert len(tree) == 0 and tree.find_maximum() is None and tree.top_k(3) == []
+
+
+def check_compact_invariants(tree: CompactRedBlackTree):
+    red = arn.Color.RED.value
+    left, right, parent, size, color = tree._left, tree._right, tree._parent, tree._size, tree._color
+    assert not tree.root or color[tree.root] != red
+
+    def walk(node):
+        if not node:
+            return 1, []
+        if color[node] == red:
+            assert color[left[node]] != red and color[right[node]] != red
+        for child in (left[node], right[node]):
+            assert not child or parent[child] == node
+        left_black, left_keys = walk(left[node])
+        right_black, right_keys = walk(right[node])
+        assert left_black == right_black
+        assert size[node] == size[left[node]] + size[right[node]] + 1
+        key = (tree._key[node], tree._order[node])
+        return left_black + (color[node] != red), left_keys + [key] + right_keys
+
+    _, keys = walk(tree.root)
+    assert len(keys) == len(tree) and keys == sorted(keys)
+
+
+def test_compact_tree_matches_red_black_tree():
+    """Même suite d'opérations sur les deux arbres: mêmes maximums, top_k et rangs"""
+    rng = random.Random(3)
+    reference, compact = RedBlackTree(), CompactRedBlackTree(capacity=4)
+    handles = {}
+    for step in range(1500):
+        action = rng.random()
+        if action < 0.4 or not handles:
+            lane = Lane(f"Voie {step}", f"E{step}")
+            score = float(rng.randint(0, 20))
+            handles[lane.sumo_edge_id] = (reference.insert(score, lane), compact.insert(score, lane))
+        elif action < 0.8:
+            node, index = rng.choice(list(handles.values()))
+            score = float(rng.randint(0, 20))
+            assert reference.update_key(node, score) == compact.update_key(index, score)
+        else:
+            node, index = handles.pop(rng.choice(list(handles)))
+            reference.delete(node)
+            compact.delete(index)
+
+        expected = reference.find_maximum()
+        maximum = compact.find_maximum()
+        assert (maximum.lane, maximum.priority_score) == (expected.lane, expected.priority_score)
+        if step % 25 == 0:
+            check_compact_invariants(compact)
+
+    check_compact_invariants(compact)
+    assert [node.lane for node in compact.top_k(10)] == [node.lane for node in reference.top_k(10)]
+    for node, index in handles.values():
+        assert compact.rank(index) == reference.rank(node)
+
+
+def test_compact_maximum_view_follows_updates():
+    tree = CompactRedBlackTree()
+    lanes = make_lanes(3)
+    indices = [tree.insert(1.0, lane) for lane in lanes]
+    view = tree.find_maximum()
+    assert view.lane is lanes[-1] and tree.find_maximum() is view  # vue mise en cache
+
+    tree.update_key(indices[-1], 7.0)
+    assert tree.find_maximum().priority_score == 7.0
+    tree.update_key(indices[0], 9.0)
+    assert tree.find_maximum().lane is lanes[0]
+    tree.delete(indices[0])
+    assert tree.find_maximum().lane is lanes[-1]
+    tree.clear()
+    assert tree.find_maximum() is None
@@ -0,0 +1,37 @@
+from arn_sumo_integration import (Lane, TrafficLightSystem, VehicleClass, VehicleClassCache,
+                                  classify_vehicle)
+from fakes import FakeBackend
+
+
+def test_empty_cache_is_shared():
+    """Un cache vide est faux (__len__): il doit quand même être partagé, pas remplacé"""
+    backend = FakeBackend()
+    cache = VehicleClassCache(backend)
+    assert len(cache) == 0
+    first = TrafficLightSystem([Lane("Nord", "NtoC")], vehicle_classes=cache, backend=backend)
+    second = TrafficLightSystem([Lane("Sud", "StoC")], vehicle_classes=cache, backend=backend)
+    assert first.vehicle_classes is cache and second.vehicle_classes is cache
+
+
+def test_type_is_read_once_and_evicted_on_arrival():
+    backend = FakeBackend()
+    backend.put("NtoC", "bus_1", "bus")
+    backend.put("NtoC", "veh_1", "car")
+    cache = VehicleClassCache(backend)
+    system = TrafficLightSystem([Lane("Nord", "NtoC")], vehicle_classes=cache, backend=backend)
+
+    system.update_traffic_data()
+    system.update_traffic_data()
+    assert backend.calls["type"] == 2
+    assert system.lanes[0].has_bus and not system.lanes[0].has_emergency
+
+    backend.arrived = ["bus_1"]
+    assert cache.evict_arrived() == ["bus_1"]
+    assert set(cache.classes) == {"veh_1"}
+
+
+def test_classify_vehicle():
+    assert classify_vehicle("ambulance_3", "car") is VehicleClass.EMERGENCY
+    assert classify_vehicle("v1", "Ambulance") is VehicleClass.EMERGENCY
+    assert classify_vehicle("v2", "city_bus") is VehicleClass.BUS
+    assert classify_vehicle("v3", "car") is VehicleClass.NORMAL